@@ -1,36 +1,90 @@
 import os
 import re
+import json
+import hashlib
+import time
 import datetime
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
-import pyodbc
-import psycopg2
+import threading
+import weakref
+from itertools import chain
 from config import SQL_SERVER_CONFIG, POSTGRES_CONFIG, DB_LIST
 from mappings import PROCEDURE_NAME_MAP, EVENT_TRIGGER_NAME_MAP
+import dbreplay
+from instrumentation import RunTimings
+from profiling import RunProfiler, PROFILE_MODES
+from progress import ProgressPublisher
+from cancellation import CancelToken, RunCancelled
+from results_store import RESULTS_DB_SUFFIX, write_results_db, results_db_path
+from fleet import FleetRollup, DATABASE_COLUMNS, FLEET_COLUMNS, entity_seconds, rollup_from_results
+from baselines import baseline_path, definition_key, load_baseline, merge_baseline, save_baseline
+from rowdiff import ROW_DIFF_SAMPLE_ROWS, diff_streams, new_counts, normalized_rows, ordered_query
+from sampling import (SAMPLE_DIFF_ROWS, SAMPLE_ROWS, SAMPLE_SKIP_TYPES, bound_text, is_full_read, lookup_batches,
+                      lookup_query, normalize_value, prefix_text, sample_query, shared_estimate, values_equal)
+from sequences import SEQUENCE_PROBE_BATCH, compare_sequence, next_value, probe_query
+from profiles import compare_estimates, compare_profile, parse_profile, profile_query, report_value, type_class
+from setdiff import DETAIL_COLUMNS, count_names, detail_rows, group_names, grouped_set_diff
+from streaming import STREAM_BATCH_ROWS, RowSpool, RowRange, SortOrderError, fetch_batches, merge_join
+from normalization import (normalize_name, normalize_fullname, normalize_index_name, normalize_index_columns,
+                           normalize_check_name, normalize_constraint_name, compact_name, strip_event_suffix,
+                           normalize_default, annotate, norm_field, public_fields)
 
-def get_sqlserver_connection():
+def get_sqlserver_connection(database=None):
     # Add support for Windows Authentication if 'windows_auth' key is True in config
+    database = database or SQL_SERVER_CONFIG['database']
     if SQL_SERVER_CONFIG.get('windows_auth', False):
         conn_str = (
             f"DRIVER={SQL_SERVER_CONFIG['driver']};"
             f"SERVER={SQL_SERVER_CONFIG['server']};"
-            f"DATABASE={SQL_SERVER_CONFIG['database']};"
+            f"DATABASE={database};"
             f"Trusted_Connection=yes;"
         )
     else:
         conn_str = (
             f"DRIVER={SQL_SERVER_CONFIG['driver']};"
             f"SERVER={SQL_SERVER_CONFIG['server']};"
-            f"DATABASE={SQL_SERVER_CONFIG['database']};"
+            f"DATABASE={database};"
             f"UID={SQL_SERVER_CONFIG['username']};"
             f"PWD={SQL_SERVER_CONFIG['password']}"
         )
-    return pyodbc.connect(conn_str)
+    def connect():
+        import pyodbc
+        return pyodbc.connect(conn_str)
+    # Record/replay mode (see dbreplay.py) wraps or replaces the live connection
+    return dbreplay.open_connection(connect, 'sql', database)
 
-def get_postgres_connection():
-    return psycopg2.connect(**POSTGRES_CONFIG)
+def get_postgres_connection(database=None):
+    params = dict(POSTGRES_CONFIG, database=database or POSTGRES_CONFIG['database'])
+    def connect():
+        import psycopg2
+        return psycopg2.connect(**params)
+    return dbreplay.open_connection(connect, 'pg', params['database'])
+
+def rollback_quietly(conn):
+    # A failed statement leaves a psycopg2 transaction aborted; roll back so the connection stays usable
+    try:
+        conn.rollback()
+    except Exception as e:
+        print(f"Could not roll back {conn.side} connection: {e}")
+
+def run_cancelled(conn, error):
+    return isinstance(error, RunCancelled) or (conn.cancel_token is not None and conn.cancel_token.cancelled)
+
+def open_connection_like(conn, timings, db):
+    # Another instrumented connection to conn's database, registered with the run's cancel token
+    connect = get_sqlserver_connection if conn.side == 'sql' else get_postgres_connection
+    extra = timings.instrument(connect(db), db, conn.side)
+    extra.cancel_token = conn.cancel_token
+    if extra.cancel_token is not None:
+        extra.cancel_token.register(extra)
+    return extra
+
+def close_extra_connection(conn):
+    if conn.cancel_token is not None:
+        conn.cancel_token.unregister(conn)
+    try:
+        conn.close()
+    except Exception as e:
+        print(f"Could not close {conn.side} connection for {conn.db}: {e}")
 
 # --- Extraction stubs (to be filled in) ---
 def extract_tables(conn, dbtype):
@@ -46,26 +100,54 @@ def extract_tables(conn, dbtype):
         """)
         return [{'schema': row[0], 'name': row[1], 'fullname': f"{row[0]}.{row[1]}", 'dbtype': 'pg'} for row in cursor.fetchall()]
 
-def extract_columns(conn, dbtype):
-    cursor = conn.cursor()
-    if dbtype == 'sql':
-        cursor.execute("""
+COLUMN_QUERIES = {
+    'sql': """
             SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_DEFAULT
             FROM INFORMATION_SCHEMA.COLUMNS
-        """)
-        return [
-            {'schema': row[0], 'table': row[1], 'name': row[2], 'datatype': row[3], 'nullable': row[4], 'default': row[5], 'fullname': f"{row[0]}.{row[1]}", 'dbtype': 'sql'}
-            for row in cursor.fetchall()
-        ]
-    else:
-        cursor.execute("""
+        """,
+    'pg': """
             SELECT table_schema, table_name, column_name, data_type, is_nullable, column_default
             FROM information_schema.columns WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
-        """)
-        return [
-            {'schema': row[0], 'table': row[1], 'name': row[2], 'datatype': row[3], 'nullable': row[4], 'default': row[5], 'fullname': f"{row[0]}.{row[1]}", 'dbtype': 'pg'}
-            for row in cursor.fetchall()
-        ]
+        """,
+}
+
+# Sort on the column match key (table, column name without underscores; see
+# column_match_key) in code point order, which is how Python compares the keys.
+# Schema breaks ties so rows sharing a key come in the same order on both sides.
+COLUMN_ORDER_BY = {
+    'sql': """
+            ORDER BY LOWER(LTRIM(RTRIM(TABLE_NAME))) COLLATE Latin1_General_BIN2,
+                     REPLACE(LOWER(LTRIM(RTRIM(COLUMN_NAME))), '_', '') COLLATE Latin1_General_BIN2,
+                     LOWER(TABLE_SCHEMA) COLLATE Latin1_General_BIN2
+        """,
+    'pg': """
+            ORDER BY lower(btrim(table_name)) COLLATE "C", replace(lower(btrim(column_name)), '_', '') COLLATE "C",
+                     lower(table_schema) COLLATE "C"
+        """,
+}
+
+def column_record(row, dbtype):
+    return {'schema': row[0], 'table': row[1], 'name': row[2], 'datatype': row[3], 'nullable': row[4], 'default': row[5], 'fullname': f"{row[0]}.{row[1]}", 'dbtype': dbtype}
+
+def extract_columns(conn, dbtype):
+    cursor = conn.cursor()
+    cursor.execute(COLUMN_QUERIES[dbtype])
+    return [column_record(row, dbtype) for row in cursor.fetchall()]
+
+def stream_columns(conn, dbtype):
+    # Annotated columns (excluded schemas dropped) in match-key order, fetched in
+    # batches; PG uses a server-side cursor so the result set stays on the server
+    cursor = conn.cursor(name='schema_validator_columns') if dbtype == 'pg' else conn.cursor()
+    try:
+        cursor.execute(COLUMN_QUERIES[dbtype] + COLUMN_ORDER_BY[dbtype])
+        for rows in fetch_batches(cursor):
+            yield from filter_excluded([column_record(row, dbtype) for row in rows])
+    finally:
+        try:
+            cursor.close()
+        except Exception as e:
+            # The statement may have been cancelled or the connection lost
+            print(f"Error closing {dbtype} column cursor: {e}")
 
 def extract_constraints(conn, dbtype):
     cursor = conn.cursor()
@@ -100,7 +182,7 @@ def extract_constraints(conn, dbtype):
             fk_cols = row[4]
             ref_table = row[7]
             ref_cols = row[8]
-            definition = f"FOREIGN KEY ({{fk_cols}}) REFERENCES {{ref_table}} ({{ref_cols}})"
+            definition = f"FOREIGN KEY ({fk_cols}) REFERENCES {ref_table} ({ref_cols})"
             constraints.append({'schema': row[0], 'table': row[1], 'name': row[2], 'type': row[3], 'definition': definition, 'fullname': f"{row[0]}.{row[1]}", 'dbtype': 'sql'})
         # Check constraints (fix: get table name from CONSTRAINT_TABLE_USAGE)
         cursor.execute("""
@@ -162,6 +244,64 @@ def extract_constraints(conn, dbtype):
             constraints.append({'schema': row[0], 'table': row[1], 'name': row[2], 'type': row[3], 'definition': definition, 'fullname': f"{row[0]}.{row[1]}", 'dbtype': 'pg'})
     return constraints
 
+# Foreign keys as structured records, one catalog row per key column in key order
+FOREIGN_KEY_QUERIES = {
+    'sql': """
+        SELECT SCHEMA_NAME(fk.schema_id), OBJECT_NAME(fk.parent_object_id), fk.name, pc.name,
+               SCHEMA_NAME(rt.schema_id), rt.name, rc.name,
+               fk.update_referential_action_desc, fk.delete_referential_action_desc
+        FROM sys.foreign_keys fk
+        JOIN sys.foreign_key_columns fkc ON fkc.constraint_object_id = fk.object_id
+        JOIN sys.columns pc ON pc.object_id = fkc.parent_object_id AND pc.column_id = fkc.parent_column_id
+        JOIN sys.objects rt ON rt.object_id = fkc.referenced_object_id
+        JOIN sys.columns rc ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+        ORDER BY fk.object_id, fkc.constraint_column_id
+    """,
+    'pg': """
+        SELECT n.nspname, c.relname, con.conname, a.attname,
+               rn.nspname, r.relname, ra.attname,
+               con.confupdtype, con.confdeltype
+        FROM pg_constraint con
+        JOIN pg_class c ON c.oid = con.conrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_class r ON r.oid = con.confrelid
+        JOIN pg_namespace rn ON rn.oid = r.relnamespace
+        CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, refattnum, ord)
+        JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+        JOIN pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.refattnum
+        WHERE con.contype = 'f' AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        ORDER BY con.oid, k.ord
+    """,
+}
+
+# pg_constraint.confupdtype/confdeltype codes; SQL Server reports e.g. 'SET_NULL'
+PG_FK_RULES = {'a': 'no action', 'r': 'restrict', 'c': 'cascade', 'n': 'set null', 'd': 'set default'}
+
+def fk_rule(value, dbtype):
+    value = (value or '').strip()
+    if dbtype == 'pg':
+        return PG_FK_RULES.get(value, value.lower())
+    return value.replace('_', ' ').lower()
+
+def extract_foreign_keys(conn, dbtype):
+    cursor = conn.cursor()
+    cursor.execute(FOREIGN_KEY_QUERIES[dbtype])
+    fks = []
+    current = None
+    for row in cursor.fetchall():
+        if current is None or (row[0], row[1], row[2]) != (current['schema'], current['table'], current['name']):
+            current = {'schema': row[0], 'table': row[1], 'name': row[2], 'columns': [],
+                       'ref_schema': row[4], 'ref_table': row[5], 'ref_columns': [],
+                       'on_update': fk_rule(row[7], dbtype), 'on_delete': fk_rule(row[8], dbtype), 'dbtype': dbtype}
+            fks.append(current)
+        current['columns'].append(row[3])
+        current['ref_columns'].append(row[6])
+    for fk in fks:
+        fk['columns'] = ','.join(fk['columns'])
+        fk['ref_columns'] = ','.join(fk['ref_columns'])
+        fk['references'] = f"{fk['ref_schema']}.{fk['ref_table']} ({fk['ref_columns']})"
+    return fks
+
 def extract_indexes(conn, dbtype):
     cursor = conn.cursor()
     indexes = []
@@ -360,76 +500,388 @@ def extract_procedures(conn, dbtype):
         """)
         return [{'schema': row[0], 'name': row[1], 'fullname': f"{row[0]}.{row[1]}", 'dbtype': 'pg'} for row in cursor.fetchall()]
 
+# Normalized definition hashes of views, procedures and functions (Definitions tab).
+# Whitespace is removed and case folded on the server, so only the hash, length
+# and parameter list of each object cross the wire; bodies are fetched separately
+# (fetch_definition_bodies) for the objects whose hash moved.
+DEFINITION_HASH_QUERIES = {
+    'sql': """
+        SELECT CASE o.type WHEN 'V' THEN 'view' WHEN 'P' THEN 'procedure' ELSE 'function' END,
+               SCHEMA_NAME(o.schema_id), o.name, o.object_id,
+               CONVERT(VARCHAR(64), HASHBYTES('SHA2_256', LOWER(
+                   REPLACE(REPLACE(REPLACE(REPLACE(m.definition, CHAR(13), ''), CHAR(10), ''), CHAR(9), ''), ' ', ''))), 2),
+               LEN(m.definition),
+               STUFF((SELECT ',' + TYPE_NAME(p.user_type_id) FROM sys.parameters p
+                      WHERE p.object_id = o.object_id AND p.parameter_id > 0
+                      ORDER BY p.parameter_id FOR XML PATH('')), 1, 1, ''),
+               (SELECT COUNT(*) FROM sys.parameters p WHERE p.object_id = o.object_id AND p.parameter_id > 0)
+        FROM sys.sql_modules m
+        JOIN sys.objects o ON o.object_id = m.object_id
+        WHERE o.type IN ('V', 'P', 'FN', 'IF', 'TF') AND o.is_ms_shipped = 0
+    """,
+    'pg': """
+        SELECT 'view', n.nspname, c.relname, c.oid,
+               md5(lower(regexp_replace(pg_get_viewdef(c.oid), '\\s+', '', 'g'))),
+               length(pg_get_viewdef(c.oid)), '', 0
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('v', 'm') AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        UNION ALL
+        SELECT CASE p.prokind WHEN 'p' THEN 'procedure' ELSE 'function' END, n.nspname, p.proname, p.oid,
+               md5(lower(regexp_replace(p.prosrc, '\\s+', '', 'g'))),
+               length(p.prosrc), pg_get_function_identity_arguments(p.oid), p.pronargs
+        FROM pg_proc p
+        JOIN pg_namespace n ON n.oid = p.pronamespace
+        WHERE p.prokind IN ('f', 'p') AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+          AND p.prorettype NOT IN ('trigger'::regtype, 'event_trigger'::regtype)
+          AND NOT EXISTS (SELECT 1 FROM pg_depend d WHERE d.objid = p.oid AND d.deptype = 'e')
+    """,
+}
+
+def extract_definition_hashes(conn, dbtype):
+    cursor = conn.cursor()
+    cursor.execute(DEFINITION_HASH_QUERIES[dbtype])
+    return [{'kind': row[0], 'schema': row[1], 'name': row[2], 'object_id': row[3], 'hash': (row[4] or '').lower(),
+             'length': row[5] or 0, 'params': row[6] or '', 'param_count': row[7] or 0,
+             'fullname': f"{row[1]}.{row[2]}", 'dbtype': dbtype} for row in cursor.fetchall()]
+
+# Optimizer statistics per column, read from the catalogs without touching table data.
+# SQL Server: statistics whose leading column is the column, with row estimates from
+# sys.dm_db_stats_properties and null rows, distinct values and bounds summed from
+# sys.dm_db_stats_histogram (SQL Server 2016 SP1 CU2 and later). PostgreSQL: pg_stats,
+# with the row estimate from pg_class.reltuples. Columns:
+# schema, table, column, type, rows, rows sampled, updated, null fraction, distinct, low, high
+COLUMN_STATS_QUERIES = {
+    'sql': """
+        SELECT s.name, t.name, c.name, TYPE_NAME(c.system_type_id), sp.rows, sp.rows_sampled, sp.last_updated,
+               CASE WHEN sp.rows > 0 THEN h.null_rows / sp.rows ELSE 0 END, h.distinct_values,
+               lo.bound, hi.bound
+        FROM sys.stats st
+        JOIN sys.tables t ON t.object_id = st.object_id AND t.is_ms_shipped = 0
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        JOIN sys.stats_columns sc ON sc.object_id = st.object_id AND sc.stats_id = st.stats_id AND sc.stats_column_id = 1
+        JOIN sys.columns c ON c.object_id = sc.object_id AND c.column_id = sc.column_id
+        CROSS APPLY sys.dm_db_stats_properties(st.object_id, st.stats_id) sp
+        CROSS APPLY (
+            SELECT SUM(CASE WHEN hh.range_high_key IS NULL THEN hh.equal_rows ELSE 0 END) AS null_rows,
+                   SUM(hh.distinct_range_rows + CASE WHEN hh.range_high_key IS NULL THEN 0 ELSE 1 END) AS distinct_values
+            FROM sys.dm_db_stats_histogram(st.object_id, st.stats_id) hh
+        ) h
+        OUTER APPLY (
+            SELECT TOP 1 CONVERT(nvarchar(200), hh.range_high_key) AS bound FROM sys.dm_db_stats_histogram(st.object_id, st.stats_id) hh
+            WHERE hh.range_high_key IS NOT NULL ORDER BY hh.step_number
+        ) lo
+        OUTER APPLY (
+            SELECT TOP 1 CONVERT(nvarchar(200), hh.range_high_key) AS bound FROM sys.dm_db_stats_histogram(st.object_id, st.stats_id) hh
+            WHERE hh.range_high_key IS NOT NULL ORDER BY hh.step_number DESC
+        ) hi
+    """,
+    'pg': """
+        SELECT s.schemaname, s.tablename, s.attname, format_type(a.atttypid, NULL), c.reltuples::bigint, NULL,
+               greatest(ut.last_analyze, ut.last_autoanalyze), s.null_frac, s.n_distinct,
+               (s.histogram_bounds::text::text[])[1],
+               (s.histogram_bounds::text::text[])[array_length(s.histogram_bounds::text::text[], 1)]
+        FROM pg_stats s
+        JOIN pg_namespace n ON n.nspname = s.schemaname
+        JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = s.tablename
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = s.attname
+        LEFT JOIN pg_stat_user_tables ut ON ut.relid = c.oid
+        WHERE s.schemaname NOT IN ('pg_catalog', 'information_schema') AND NOT s.inherited
+    """,
+}
+
+def extract_column_stats(conn, dbtype):
+    # One record per column with statistics; on SQL Server the statistic with the largest sample wins
+    cursor = conn.cursor()
+    cursor.execute(COLUMN_STATS_QUERIES[dbtype])
+    stats = {}
+    for row in cursor.fetchall():
+        rows = row[4] if row[4] is None or row[4] >= 0 else None  # reltuples is -1 before the first ANALYZE
+        distinct = row[8]
+        if dbtype == 'pg' and distinct is not None and distinct < 0:
+            # Negative n_distinct is a fraction of the rows
+            distinct = -distinct * rows if rows is not None else None
+        rec = {'schema': row[0], 'table': row[1], 'name': row[2], 'datatype': row[3], 'rows': rows, 'sampled': row[5],
+               'updated': row[6], 'null_fraction': float(row[7] or 0), 'distinct': round(distinct) if distinct is not None else None,
+               'low': row[9], 'high': row[10], 'fullname': f"{row[0]}.{row[1]}", 'dbtype': dbtype}
+        key = (row[0], row[1], row[2])
+        if key not in stats or (rec['sampled'] or 0) > (stats[key]['sampled'] or 0):
+            stats[key] = rec
+    return list(stats.values())
+
+PRIMARY_KEY_QUERIES = {
+    'sql': """
+        SELECT s.name, t.name, c.name
+        FROM sys.indexes i
+        JOIN sys.tables t ON t.object_id = i.object_id
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+        JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        WHERE i.is_primary_key = 1
+        ORDER BY s.name, t.name, ic.key_ordinal
+    """,
+    'pg': """
+        SELECT n.nspname, c.relname, a.attname
+        FROM pg_constraint con
+        JOIN pg_class c ON c.oid = con.conrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = k.attnum
+        WHERE con.contype = 'p' AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        ORDER BY n.nspname, c.relname, k.ord
+    """,
+}
+
+def extract_primary_keys(conn, dbtype):
+    # One record per table: key columns in key order
+    cursor = conn.cursor()
+    cursor.execute(PRIMARY_KEY_QUERIES[dbtype])
+    keys = {}
+    for row in cursor.fetchall():
+        rec = keys.setdefault((row[0], row[1]), {'schema': row[0], 'table': row[1], 'name': row[1], 'columns': [],
+                                                 'fullname': f"{row[0]}.{row[1]}", 'dbtype': dbtype})
+        rec['columns'].append(row[2])
+    return list(keys.values())
+
+# Row estimates from the catalogs (no table scan): heap or clustered index rows, reltuples
+ROW_ESTIMATE_QUERIES = {
+    'sql': """
+        SELECT s.name, t.name, SUM(p.rows)
+        FROM sys.partitions p
+        JOIN sys.tables t ON t.object_id = p.object_id
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        WHERE p.index_id IN (0, 1)
+        GROUP BY s.name, t.name
+    """,
+    'pg': """
+        SELECT n.nspname, c.relname, c.reltuples::bigint
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p') AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+    """,
+}
+
+def extract_row_estimates(conn, dbtype):
+    # {(schema, table) normalized: estimated rows}; None where PostgreSQL has not analyzed the table yet
+    cursor = conn.cursor()
+    cursor.execute(ROW_ESTIMATE_QUERIES[dbtype])
+    return {(normalize_name(row[0]), normalize_name(row[1])): (row[2] if row[2] is not None and row[2] >= 0 else None)
+            for row in cursor.fetchall()}
+
+# Identity columns (SQL Server) and sequence-fed columns (PostgreSQL: serial and identity
+# columns, as pg_get_serial_sequence finds them, plus nextval() defaults). Columns:
+# schema, table, column, type, sequence, start, increment, last value
+SEQUENCE_QUERIES = {
+    'sql': """
+        SELECT s.name, t.name, c.name, TYPE_NAME(c.system_type_id), NULL,
+               CONVERT(decimal(38, 0), ic.seed_value), CONVERT(decimal(38, 0), ic.increment_value),
+               CONVERT(decimal(38, 0), ic.last_value)
+        FROM sys.identity_columns ic
+        JOIN sys.tables t ON t.object_id = ic.object_id AND t.is_ms_shipped = 0
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    """,
+    'pg': r"""
+        WITH links AS (
+            SELECT d.refobjid AS table_oid, d.refobjsubid AS attnum, d.objid AS seq_oid
+            FROM pg_depend d
+            WHERE d.classid = 'pg_class'::regclass AND d.refclassid = 'pg_class'::regclass
+              AND d.deptype IN ('a', 'i') AND d.refobjsubid > 0
+            UNION
+            SELECT ad.adrelid, ad.adnum, to_regclass(substring(pg_get_expr(ad.adbin, ad.adrelid) FROM 'nextval\(''([^'']+)'''))::oid
+            FROM pg_attrdef ad
+            WHERE pg_get_expr(ad.adbin, ad.adrelid) LIKE 'nextval(%'
+        )
+        SELECT n.nspname, c.relname, a.attname, format_type(a.atttypid, NULL),
+               quote_ident(sn.nspname) || '.' || quote_ident(sc.relname),
+               ps.start_value, ps.increment_by, ps.last_value
+        FROM links l
+        JOIN pg_class sc ON sc.oid = l.seq_oid AND sc.relkind = 'S'
+        JOIN pg_namespace sn ON sn.oid = sc.relnamespace
+        JOIN pg_class c ON c.oid = l.table_oid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = l.attnum
+        LEFT JOIN pg_sequences ps ON ps.schemaname = sn.nspname AND ps.sequencename = sc.relname
+        WHERE n.nspname NOT IN ('pg_catalog', 'information_schema')
+    """,
+}
+
+def extract_sequences(conn, dbtype):
+    cursor = conn.cursor()
+    cursor.execute(SEQUENCE_QUERIES[dbtype])
+    def number(value):
+        return int(value) if value is not None else None
+    return [{'schema': row[0], 'table': row[1], 'name': row[2], 'datatype': row[3], 'sequence': row[4] or '',
+             'start_value': number(row[5]), 'increment': number(row[6]), 'last_value': number(row[7]),
+             'fullname': f"{row[0]}.{row[1]}", 'dbtype': dbtype} for row in cursor.fetchall()]
+
+# Object ids per body query (ids are integers from the catalogs, so they are inlined)
+DEFINITION_BODY_BATCH = 200
+
+def fetch_definition_bodies(conn, dbtype, records):
+    # {object_id: definition} for the given records only
+    cursor = conn.cursor()
+    bodies = {}
+    ids = sorted({int(rec['object_id']) for rec in records})
+    for start in range(0, len(ids), DEFINITION_BODY_BATCH):
+        id_list = ','.join(str(i) for i in ids[start:start + DEFINITION_BODY_BATCH])
+        if dbtype == 'sql':
+            cursor.execute(f"SELECT m.object_id, m.definition FROM sys.sql_modules m WHERE m.object_id IN ({id_list})")
+        else:
+            cursor.execute(f"""
+                SELECT c.oid, pg_get_viewdef(c.oid) FROM pg_class c WHERE c.oid IN ({id_list}) AND c.relkind IN ('v', 'm')
+                UNION ALL
+                SELECT p.oid, p.prosrc FROM pg_proc p WHERE p.oid IN ({id_list})
+            """)
+        bodies.update((int(row[0]), row[1]) for row in cursor.fetchall())
+    return bodies
+
+# DataCounts: COUNT(*) statements run at once per server, each worker on its own connection
+# (the run's connection when this is 1). Partitioned tables are counted one partition per statement.
+COUNT_WORKERS = 4
+
+# Partitions to count separately, per partitioned table. SQL Server: partitions of the heap or
+# clustered index, addressed with $PARTITION on the partitioning column. PostgreSQL: the leaf
+# partitions of each top-level partitioned table, which information_schema also lists as base tables.
+PARTITION_QUERIES = {
+    'sql': """
+        SELECT s.name, t.name, pf.name, c.name, p.partition_number
+        FROM sys.tables t
+        JOIN sys.schemas s ON s.schema_id = t.schema_id
+        JOIN sys.indexes i ON i.object_id = t.object_id AND i.index_id IN (0, 1)
+        JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+        JOIN sys.partition_functions pf ON pf.function_id = ps.function_id
+        JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id AND ic.partition_ordinal = 1
+        JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        JOIN sys.partitions p ON p.object_id = t.object_id AND p.index_id = i.index_id
+        ORDER BY s.name, t.name, p.partition_number
+    """,
+    'pg': """
+        WITH RECURSIVE tree AS (
+            SELECT c.oid AS root, c.oid AS relid FROM pg_class c WHERE c.relkind = 'p' AND NOT c.relispartition
+            UNION ALL
+            SELECT tree.root, i.inhrelid FROM tree JOIN pg_inherits i ON i.inhparent = tree.relid
+        )
+        SELECT rn.nspname, r.relname, pn.nspname, p.relname, p.relkind
+        FROM tree
+        JOIN pg_class r ON r.oid = tree.root
+        JOIN pg_namespace rn ON rn.oid = r.relnamespace
+        JOIN pg_class p ON p.oid = tree.relid AND p.oid <> tree.root
+        JOIN pg_namespace pn ON pn.oid = p.relnamespace
+        ORDER BY rn.nspname, r.relname, pn.nspname, p.relname
+    """,
+}
+
+def count_statements(conn, dbtype, tables):
+    # {(schema, table): [COUNT statements whose results add up to the table's count]} for the
+    # top-level tables; PG partitions are left out, their rows count towards the partitioned table
+    cursor = conn.cursor()
+    try:
+        cursor.execute(PARTITION_QUERIES[dbtype])
+        rows = cursor.fetchall()
+    except Exception as e:
+        if run_cancelled(conn, e):
+            raise
+        # Without the partition catalog every table is counted whole, as before
+        print(f"Could not read {dbtype} partitions, counting tables whole: {e}")
+        rollback_quietly(conn)
+        rows = []
+    partitions, children = {}, set()
+    for row in rows:
+        if dbtype == 'sql':
+            partitions.setdefault((row[0], row[1]), []).append(
+                f"SELECT COUNT(*) FROM [{row[0]}].[{row[1]}] WHERE $PARTITION.[{row[2]}]([{row[3]}]) = {int(row[4])}")
+        else:
+            children.add((row[2], row[3]))
+            if row[4] in ('r', 'f'):  # leaf partitions hold the rows
+                partitions.setdefault((row[0], row[1]), []).append(f'SELECT COUNT(*) FROM "{row[2]}"."{row[3]}"')
+    statements = {}
+    for schema, table in tables:
+        if (schema, table) in children:
+            continue
+        single = f"SELECT COUNT(*) FROM [{schema}].[{table}]" if dbtype == 'sql' else f'SELECT COUNT(*) FROM "{schema}"."{table}"'
+        statements[(schema, table)] = partitions.get((schema, table), [single])
+    return statements
+
+def run_count_statements(conn, statements):
+    # {statement: count, or '' when it failed}, COUNT_WORKERS at a time
+    def count(worker_conn, cursor, statement):
+        try:
+            cursor.execute(statement)
+            return cursor.fetchone()[0]
+        except Exception as e:
+            if run_cancelled(worker_conn, e):
+                raise
+            rollback_quietly(worker_conn)
+            return ''
+    if COUNT_WORKERS <= 1 or len(statements) <= 1:
+        cursor = conn.cursor()
+        return {statement: count(conn, cursor, statement) for statement in statements}
+    timings, entity = conn.timings, conn.timings.current_entity()
+    local = threading.local()
+    opened = []
+    opened_lock = threading.Lock()
+    shared_cursor, shared_lock, fallback = conn.cursor(), threading.Lock(), []
+    def worker(statement):
+        with timings.entity(entity):
+            if not hasattr(local, 'conn'):
+                try:
+                    local.conn = open_connection_like(conn, timings, conn.db)
+                except Exception as e:
+                    if run_cancelled(conn, e):
+                        raise
+                    # No connection to spare (max_connections, login limits): this worker counts
+                    # on the run's connection, one statement at a time
+                    with opened_lock:
+                        if not fallback:
+                            print(f"Could not open another {conn.side} connection for counting, using the run's connection: {e}")
+                        fallback.append(e)
+                    local.conn = None
+                else:
+                    local.cursor = local.conn.cursor()
+                    with opened_lock:
+                        opened.append(local.conn)
+            if local.conn is None:
+                with shared_lock:
+                    return statement, count(conn, shared_cursor, statement)
+            return statement, count(local.conn, local.cursor, statement)
+    from concurrent.futures import ThreadPoolExecutor
+    try:
+        with ThreadPoolExecutor(max_workers=COUNT_WORKERS, thread_name_prefix=f"count-{conn.side}") as pool:
+            return dict(pool.map(worker, statements))
+    finally:
+        for extra in opened:
+            close_extra_connection(extra)
+
 def extract_table_counts(conn, dbtype):
     cursor = conn.cursor()
     if dbtype == 'sql':
         cursor.execute("""
             SELECT TABLE_SCHEMA, TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE'
         """)
-        tables = cursor.fetchall()
-        counts = []
-        for row in tables:
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM [{row[0]}].[{row[1]}]")
-                cnt = cursor.fetchone()[0]
-            except:
-                cnt = ''
-            counts.append({'schema': row[0], 'name': row[1], 'fullname': f"{row[0]}.{row[1]}", 'count': cnt, 'dbtype': 'sql'})
-        return counts
     else:
         cursor.execute("""
             SELECT table_schema, table_name FROM information_schema.tables WHERE table_type = 'BASE TABLE' AND table_schema NOT IN ('pg_catalog', 'information_schema')
         """)
-        tables = cursor.fetchall()
-        counts = []
-        for row in tables:
-            try:
-                cursor.execute(f'SELECT COUNT(*) FROM "{row[0]}"."{row[1]}"')
-                cnt = cursor.fetchone()[0]
-            except:
-                cnt = ''
-            counts.append({'schema': row[0], 'name': row[1], 'fullname': f"{row[0]}.{row[1]}", 'count': cnt, 'dbtype': 'pg'})
-        return counts
-
-def normalize_name(name):
-    return (name or '').strip().lower()
-
-def normalize_fullname(schema, name):
-    return f"{normalize_name(schema)}.{normalize_name(name)}"
-
-def normalize_index_name(name):
-    # Remove common prefixes, underscores, and lowercase
-    name = (name or '').lower()
-    name = re.sub(r'^(ix_|idxn|idx|pk_|pk__|uq_|uq__|ak_|ak__|unique_)', '', name)
-    name = name.replace('_', '')
-    return name
-
-def normalize_index_columns(columns):
-    # Normalize and sort columns for comparison
-    if not columns:
-        return []
-    return sorted([c.strip().lower() for c in columns.split(',') if c.strip()])
-
-def normalize_check_name(name):
-    # For Postgres, strip trailing _<digits> for check constraints
-    if name is None:
-        return ''
-    return re.sub(r'_[0-9]+$', '', name.lower())
-
-def normalize_constraint_name(name):
-    # Lowercase, remove prefixes (chk_, ck_, etc.), and strip trailing _digits
-    if not name:
-        return ''
-    name = name.lower()
-    name = re.sub(r'^(chk_|ck_|df_|default_)+', '', name)
-    name = re.sub(r'_[0-9]+$', '', name)
-    return name
+    tables = [(row[0], row[1]) for row in cursor.fetchall()]
+    statements = count_statements(conn, dbtype, tables)
+    partitioned = sum(1 for parts in statements.values() if len(parts) > 1)
+    total = sum(len(parts) for parts in statements.values())
+    print(f"Counting {len(statements)} {dbtype} tables ({partitioned} partitioned) with {total} COUNT statements...")
+    results = run_count_statements(conn, [s for parts in statements.values() for s in parts])
+    counts = []
+    for (schema, table), parts in statements.items():
+        values = [results[s] for s in parts]
+        # A table whose partitions could not all be counted has no count, like a table that failed
+        cnt = '' if any(v == '' for v in values) else sum(values)
+        counts.append({'schema': schema, 'name': table, 'fullname': f"{schema}.{table}", 'count': cnt, 'dbtype': dbtype})
+    return counts
 
 # Exclude schemas before processing
 EXCLUDED_SCHEMAS = {'aws_sqlserver_ext', 'aws_sqlserver_ext_data'}
 
 def filter_excluded(entities):
-    return [e for e in entities if normalize_name(e.get('schema','')) not in EXCLUDED_SCHEMAS]
+    # Normalized forms are computed here, once per extracted record (see normalization.py)
+    return [e for e in annotate(entities) if e['_schema'] not in EXCLUDED_SCHEMAS]
 
 SQL_TO_PG_TYPE_MAP = {
     'int': ['integer', 'int4'],
@@ -455,6 +907,7 @@ SQL_TO_PG_TYPE_MAP = {
     'money': ['numeric', 'decimal'],
     'smallmoney': ['numeric', 'decimal'],
     'uniqueidentifier': ['uuid'],
+    'datetimeoffset': ['timestamp with time zone', 'timestamptz'],
     'xml': ['xml', 'text'],
     'varbinary': ['bytea'],
     'binary': ['bytea'],
@@ -474,6 +927,24 @@ def are_types_compatible(sql_type, pg_type):
         return pg_type in SQL_TO_PG_TYPE_MAP[sql_type]
     return False
 
+def normalize_nullable(value):
+    return (value or '').strip().upper()
+
+def column_differences(sql, pg):
+    # Reason for a matched column whose type, nullability or default (normalize_default) differ;
+    # '' when they agree. Defaults drawing from a sequence (nextval) belong to identity
+    # columns and are checked on the Sequences tab instead.
+    reasons = []
+    if not are_types_compatible(sql.get('datatype'), pg.get('datatype')):
+        reasons.append(f"Type differs: {sql.get('datatype')} vs {pg.get('datatype')}")
+    if normalize_nullable(sql.get('nullable')) != normalize_nullable(pg.get('nullable')):
+        reasons.append(f"Nullable differs: {sql.get('nullable')} vs {pg.get('nullable')}")
+    sql_default = normalize_default(sql.get('default'), sql.get('datatype'))
+    pg_default = normalize_default(pg.get('default'), pg.get('datatype'))
+    if sql_default != pg_default and not pg_default.startswith('nextval('):
+        reasons.append(f"Default differs: {sql.get('default') or 'none'} vs {pg.get('default') or 'none'}")
+    return '; '.join(reasons)
+
 def are_index_names_equivalent(sql_idx, pg_idx, table):
     sql_idx = sql_idx or ''
     pg_idx = pg_idx or ''
@@ -569,14 +1040,14 @@ def robust_index_match(sql_indexes, pg_indexes):
     matches = {}
     used_pg = set()
     for sql_idx in sql_indexes:
-        sql_table = normalize_name(sql_idx.get('table',''))
-        sql_name = normalize_name(sql_idx.get('name',''))
+        sql_table = norm_field(sql_idx, 'table')
+        sql_name = norm_field(sql_idx, 'name')
         best_pg = None
         for pg_idx in pg_indexes:
             if id(pg_idx) in used_pg:
                 continue
-            pg_table = normalize_name(pg_idx.get('table',''))
-            pg_name = normalize_name(pg_idx.get('name',''))
+            pg_table = norm_field(pg_idx, 'table')
+            pg_name = norm_field(pg_idx, 'name')
             # Table must match
             if sql_table != pg_table:
                 continue
@@ -599,14 +1070,14 @@ def robust_trigger_match(sql_triggers, pg_triggers):
     matches = {}
     used_pg = set()
     for sql_tr in sql_triggers:
-        sql_table = normalize_name(sql_tr.get('table',''))
-        sql_name = normalize_name(sql_tr.get('name',''))
+        sql_table = norm_field(sql_tr, 'table')
+        sql_name = norm_field(sql_tr, 'name')
         best_pg = None
         for pg_tr in pg_triggers:
             if id(pg_tr) in used_pg:
                 continue
-            pg_table = normalize_name(pg_tr.get('table',''))
-            pg_name = normalize_name(pg_tr.get('name',''))
+            pg_table = norm_field(pg_tr, 'table')
+            pg_name = norm_field(pg_tr, 'name')
             if sql_table != pg_table:
                 continue
             # Contains/robust match
@@ -628,13 +1099,14 @@ def match_by_keys(sql_list, pg_list, keys, extra_matchers=None):
     """Match PG records to SQL records by keys, with optional extra matchers for fuzzy logic."""
     matches = {}
     used_pg = set()
+    pg_keys = [tuple(norm_field(pg, k) for k in keys) for pg in pg_list]
     for sql in sql_list:
-        sql_key = tuple(normalize_name(sql.get(k, '')) for k in keys)
+        sql_key = tuple(norm_field(sql, k) for k in keys)
         best_pg = None
         for i, pg in enumerate(pg_list):
             if i in used_pg:
                 continue
-            pg_key = tuple(normalize_name(pg.get(k, '')) for k in keys)
+            pg_key = pg_keys[i]
             if sql_key == pg_key:
                 best_pg = i
                 break
@@ -651,89 +1123,157 @@ def match_by_keys(sql_list, pg_list, keys, extra_matchers=None):
             used_pg.add(best_pg)
     return matches
 
-def parse_fk_details(definition):
-    # Try to extract local columns and referenced table/columns from FK definition string
-    # Works for both SQL and PG definition formats
-    if not definition:
-        return [], '', []
-    # Example: FOREIGN KEY (col1, col2) REFERENCES ref_table (ref_col1, ref_col2)
-    m = re.search(r'FOREIGN KEY \(([^)]+)\) REFERENCES ([^ (]+) \(([^)]+)\)', definition, re.IGNORECASE)
-    if m:
-        local_cols = [c.strip().lower() for c in m.group(1).split(',')]
-        ref_table = m.group(2).strip().lower()
-        ref_cols = [c.strip().lower() for c in m.group(3).split(',')]
-        return local_cols, ref_table, ref_cols
-    # Try PG style: REFERENCES ref_table(col)
-    m = re.search(r'REFERENCES ([^ (]+)\(([^)]+)\)', definition, re.IGNORECASE)
-    if m:
-        ref_table = m.group(1).strip().lower()
-        ref_cols = [c.strip().lower() for c in m.group(2).split(',')]
-        # Try to get local columns (may not be present)
-        m2 = re.search(r'FOREIGN KEY \(([^)]+)\)', definition, re.IGNORECASE)
-        if m2:
-            local_cols = [c.strip().lower() for c in m2.group(1).split(',')]
+# Rules that behave the same for a migrated key: SQL Server has no RESTRICT, and
+# PostgreSQL's RESTRICT only differs from NO ACTION in when the check runs
+FK_RULE_EQUIVALENTS = {'restrict': 'no action'}
+
+def fk_column_key(columns):
+    # Column list normalized like the Columns tab (lowercase, underscores removed), order kept
+    return tuple(normalize_name(c).replace('_', '') for c in columns.split(','))
+
+def fk_parts(fk):
+    # Structural identity of a foreign key: (table, columns), (referenced table, columns), (update, delete rules)
+    return (
+        (norm_field(fk, 'schema'), norm_field(fk, 'table'), fk_column_key(fk['columns'])),
+        (normalize_name(fk['ref_schema']), normalize_name(fk['ref_table']), fk_column_key(fk['ref_columns'])),
+        tuple(FK_RULE_EQUIVALENTS.get(fk[r], fk[r]) for r in ('on_update', 'on_delete')),
+    )
+
+def fk_signature(parts):
+    # Short stable hash of fk_parts(); equal on both servers for structurally identical keys
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+def fk_differences(sql, pg):
+    # Reason text for two keys on the same table that are not structurally identical
+    sql_parts, pg_parts = sql['_fk_parts'], pg['_fk_parts']
+    reasons = []
+    if sql_parts[0][2] != pg_parts[0][2]:
+        reasons.append(f"Columns differ: {sql['columns']} vs {pg['columns']}")
+    if sql_parts[1] != pg_parts[1]:
+        reasons.append(f"References differ: {sql['references']} vs {pg['references']}")
+    for i, rule in enumerate(('on_update', 'on_delete')):
+        if sql_parts[2][i] != pg_parts[2][i]:
+            reasons.append(f"{rule.replace('_', ' ').upper()} differs: {sql[rule]} vs {pg[rule]}")
+    return '; '.join(reasons)
+
+def match_foreign_keys(sql_fks, pg_fks):
+    # [(sql, pg, reason)] with None for an unmatched side. Keys match on their hashed
+    # signature first (whatever they are called), then on table and columns, then on
+    # table and name; the last two report what differs.
+    for fk in chain(sql_fks, pg_fks):
+        fk['_fk_parts'] = fk_parts(fk)
+        fk['_signature'] = fk_signature(fk['_fk_parts'])
+    pairs = []
+    unmatched_pg = list(pg_fks)
+    unmatched_sql = list(sql_fks)
+    for key, describe in (
+        (lambda fk: fk['_signature'], lambda sql, pg: '' if sql['_name'] == pg['_name'] else 'Renamed'),
+        (lambda fk: fk['_fk_parts'][0], fk_differences),
+        (lambda fk: (fk['_schema'], fk['_table'], fk['_name']), fk_differences),
+    ):
+        pg_index = {}
+        for pg in unmatched_pg:
+            pg_index.setdefault(key(pg), []).append(pg)
+        left = []
+        for sql in unmatched_sql:
+            candidates = pg_index.get(key(sql))
+            if candidates:
+                pg = candidates.pop(0)
+                pg['_matched'] = True
+                pairs.append((sql, pg, describe(sql, pg)))
+            else:
+                left.append(sql)
+        unmatched_sql = left
+        unmatched_pg = [pg for pg in unmatched_pg if not pg.pop('_matched', False)]
+    pairs.extend((sql, None, '') for sql in unmatched_sql)
+    pairs.extend((None, pg, '') for pg in unmatched_pg)
+    return pairs
+
+# Also compare matched columns' datatype (through SQL_TO_PG_TYPE_MAP), nullability and
+# default (see normalize_default); a column that differs is a MISMATCH with a Reason.
+# Off by default, where matched columns are MATCHED on their names alone.
+COMPARE_COLUMN_ATTRIBUTES = False
+
+# Compare the Columns tab as a sorted merge of two server-ordered streams written
+# into a disk-backed row spool (streaming.py), for catalogs too large to hold in
+# memory. Rows come out in match-key order instead of SQL Server order; statuses
+# and counts are the same. Reports are then written with a write-only workbook.
+STREAM_COLUMN_COMPARE = False
+
+def column_match_key(row):
+    # Table and column name, normalized; underscores removed for robust matching
+    return (norm_field(row, 'table'), norm_field(row, 'name').replace('_', ''))
+
+def match_columns(sql_list, pg_list):
+    # ({sql index: pg index}, {sql index: attribute differences}); when a key repeats on
+    # one side its last row is the one matched
+    sql_keys = {column_match_key(sql): i for i, sql in enumerate(sql_list)}
+    pg_keys = {column_match_key(pg): i for i, pg in enumerate(pg_list)}
+    matches = {i: pg_keys[key] for key, i in sql_keys.items() if key in pg_keys}
+    reasons = {}
+    if COMPARE_COLUMN_ATTRIBUTES:
+        reasons = {i: column_differences(sql_list[i], pg_list[j]) for i, j in matches.items()}
+    return matches, reasons
+
+def column_fields():
+    # fields(row, prefix, skip) -> [(field, prefixed field)]; worked out once per distinct record layout, not per row
+    layouts = {}
+    def fields(row, prefix, skip):
+        layout = (prefix,) + tuple(row)
+        if layout not in layouts:
+            layouts[layout] = [(k, prefix + k) for k in sorted(public_fields(row, skip))]
+        return layouts[layout]
+    return fields
+
+def column_row(sql, pg, fields, reason=''):
+    # Compare row for a matched pair, or for one side only (the other is None); reason holds
+    # the attribute differences of a matched pair (COMPARE_COLUMN_ATTRIBUTES)
+    row = {}
+    if sql is not None:
+        row.update({out: sql[k] for k, out in fields(sql, 'SQL_', 'PG_')})
+    if pg is not None:
+        row.update({out: pg[k] for k, out in fields(pg, 'PG_', 'SQL_')})
+    if sql is not None and pg is not None:
+        # Matched keys already compare equal on the normalized, underscore-free column name
+        row['Status'] = 'MISMATCH' if reason else 'MATCHED'
+    else:
+        row['Status'] = 'MISSING in PG' if sql is not None else 'EXTRA in PG'
+    if COMPARE_COLUMN_ATTRIBUTES:
+        row['Reason'] = reason
+    return row
+
+def compare_columns(sql_list, pg_list):
+    matches, reasons = match_columns(sql_list, pg_list)
+    fields = column_fields()
+    results = []
+    matched_pg = set()
+    for i, sql in enumerate(sql_list):
+        pg_idx = matches.get(i)
+        if pg_idx is not None:
+            matched_pg.add(pg_idx)
+            results.append(column_row(sql, pg_list[pg_idx], fields, reasons.get(i, '')))
         else:
-            local_cols = []
-        return local_cols, ref_table, ref_cols
-    return [], '', []
+            results.append(column_row(sql, None, fields))
+    # Add unmatched PG
+    for i, pg in enumerate(pg_list):
+        if i not in matched_pg:
+            results.append(column_row(None, pg, fields))
+    return results
+
+def merge_compare_columns(sql_records, pg_records):
+    # compare_columns over inputs sorted by column_match_key: yields compare rows in key order
+    fields = column_fields()
+    for sql, pg in merge_join(sql_records, pg_records, column_match_key):
+        reason = column_differences(sql, pg) if COMPARE_COLUMN_ATTRIBUTES and sql is not None and pg is not None else ''
+        yield column_row(sql, pg, fields, reason)
 
 def compare_entities(sql_list, pg_list, entity_type):
     results = []
     matched_pg = set()
     # Entity-specific matching logic
     if entity_type == 'column':
-        # Robust column matching: normalize table and column names, and types
-        def norm_col(row):
-            # Use table name and column name, normalize underscores and case
-            tbl = normalize_name(row.get('table',''))
-            col = normalize_name(row.get('name',''))
-            # Remove underscores for robust matching
-            col_nounder = col.replace('_','')
-            return (tbl, col_nounder)
-        sql_keys = {norm_col(sql): i for i, sql in enumerate(sql_list)}
-        pg_keys = {norm_col(pg): i for i, pg in enumerate(pg_list)}
-        all_keys = set(sql_keys.keys()) | set(pg_keys.keys())
-        matches = {}
-        used_pg = set()
-        for key in all_keys:
-            sql_idx = sql_keys.get(key)
-            pg_idx = pg_keys.get(key)
-            if sql_idx is not None and pg_idx is not None:
-                matches[sql_idx] = pg_idx
-                used_pg.add(pg_idx)
-        results = []
-        matched_pg = set()
-        for i, sql in enumerate(sql_list):
-            row = {}
-            sql_keys_list = sorted([k for k in sql.keys() if not k.startswith('PG_') and k != 'Status'])
-            for k in sql_keys_list:
-                row['SQL_' + k] = sql[k]
-            pg_idx = matches.get(i)
-            if pg_idx is not None:
-                pg = pg_list[pg_idx]
-                matched_pg.add(pg_idx)
-                for k in sorted([k for k in pg.keys() if not k.startswith('SQL_') and k != 'Status']):
-                    row['PG_' + k] = pg[k]
-                # Status logic: compare normalized names and types
-                sql_col = normalize_name(sql.get('name','')).replace('_','')
-                pg_col = normalize_name(pg.get('name','')).replace('_','')
-                if sql_col == pg_col:
-                    row['Status'] = 'MATCHED'
-                else:
-                    row['Status'] = 'MISMATCH: Name variant'
-            else:
-                row['Status'] = 'MISSING in PG'
-            results.append(row)
-        # Add unmatched PG
-        for i, pg in enumerate(pg_list):
-            if i not in matched_pg:
-                row = {}
-                for k in sorted([k for k in pg.keys() if not k.startswith('SQL_') and k != 'Status']):
-                    row['PG_' + k] = pg[k]
-                row['Status'] = 'EXTRA in PG'
-                results.append(row)
-        return results
-    elif entity_type == 'table':
+        return compare_columns(sql_list, pg_list)
+    if entity_type == 'table':
         # ...existing code...
         matches = match_by_keys(sql_list, pg_list, ['name'])
     elif entity_type == 'index':
@@ -748,13 +1288,13 @@ def compare_entities(sql_list, pg_list, entity_type):
     # SQL-first, row-by-row
     for idx, sql in enumerate(sql_list):
         row = {}
-        sql_keys = sorted([k for k in sql.keys() if not k.startswith('PG_') and k != 'Status'])
+        sql_keys = sorted(public_fields(sql, 'PG_'))
         for k in sql_keys:
             row[f'SQL_{k}'] = sql.get(k, '')
         pg_idx = matches.get(idx) if entity_type == 'column' else matches.get(id(sql))
         if pg_idx is not None:
             pg = pg_list[pg_idx]
-            pg_keys = sorted([k for k in pg.keys() if not k.startswith('SQL_') and k != 'Status'])
+            pg_keys = sorted(public_fields(pg, 'SQL_'))
             for k in pg_keys:
                 row[f'PG_{k}'] = pg.get(k, '')
             matched_pg.add(pg_idx)
@@ -767,108 +1307,140 @@ def compare_entities(sql_list, pg_list, entity_type):
     for i, pg in enumerate(pg_list):
         if i not in matched_pg:
             row = {}
-            pg_keys = sorted([k for k in pg.keys() if not k.startswith('SQL_') and k != 'Status'])
+            pg_keys = sorted(public_fields(pg, 'SQL_'))
             for k in pg_keys:
                 row[f'PG_{k}'] = pg.get(k, '')
             row['Status'] = 'EXTRA in PG'
             results.append(row)
     return results
 
-def highlight_mismatches(ws):
-    status_col = None
-    for idx, cell in enumerate(ws[1], 1):
-        if str(cell.value).strip().lower() == 'status':
-            status_col = idx
-            break
-    if not status_col:
+def highlight_mismatches(ws, status_col, last_col, last_row):
+    # Row colouring as two conditional-formatting rules on the data range (fixed cost
+    # however many rows): grey for extra in PG, yellow for mismatches and missing objects.
+    # SEARCH is case-insensitive like the Status checks it replaces; the grey rule stops
+    # evaluation so a row gets one colour.
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import PatternFill
+    if last_row < 2:
         return
+    cell_range = f"A2:{last_col}{last_row}"
+    status = f"${status_col}2"
     yellow_fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
     grey_fill = PatternFill(start_color='A9A9A9', end_color='A9A9A9', fill_type='solid')  # Dim grey
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row):
-        status = str(row[status_col-1].value or '').lower()
-        if 'extra in pg' in status:
-            for cell in row:
-                cell.fill = grey_fill
-        elif any(x in status for x in ['mismatch', 'missing']):
-            for cell in row:
-                cell.fill = yellow_fill
+    ws.conditional_formatting.add(cell_range, FormulaRule(
+        formula=[f'ISNUMBER(SEARCH("extra in pg",{status}))'], fill=grey_fill, stopIfTrue=True))
+    ws.conditional_formatting.add(cell_range, FormulaRule(
+        formula=[f'OR(ISNUMBER(SEARCH("mismatch",{status})),ISNUMBER(SEARCH("missing",{status})))'], fill=yellow_fill))
 
-def write_entity_sheet(wb, sheet_name, compare_rows, columns):
-    ws = wb.create_sheet(sheet_name)
+def order_columns(columns):
     # Reorder columns: SQL_* first, then PG_*, then Difference (if present), then Status
     sql_cols = [c for c in columns if c.startswith('SQL_')]
     pg_cols = [c for c in columns if c.startswith('PG_')]
     diff_cols = [c for c in columns if c == 'Difference']
     other_cols = [c for c in columns if c not in sql_cols + pg_cols + diff_cols + ['Status']]
-    out_columns = sql_cols + pg_cols + diff_cols + other_cols + ['Status']
-    ws.append(out_columns)
-    for row in compare_rows:
-        ws.append([row.get(col, '') for col in out_columns])
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-    if ws.max_row > 1:
-        base_table_name = f"Tbl_{sheet_name.replace(' ', '_')}"
-        table_name = base_table_name
-        existing_table_names = set()
-        for sheet in wb.worksheets:
-            existing_table_names.update(sheet.tables.keys())
-        i = 1
-        while table_name in existing_table_names:
-            table_name = f"{base_table_name}_{i}"
-            i += 1
-        table = Table(displayName=table_name, ref=f"A1:{get_column_letter(len(out_columns))}{ws.max_row}")
-        style = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-        table.tableStyleInfo = style
+    return sql_cols + pg_cols + diff_cols + other_cols + ['Status']
+
+# Sheets are written in one pass of appended rows, styled as they are appended and
+# never read back, so the same code fills a regular workbook and a write-only
+# (streaming) one.
+def styled_cell(ws, value, **styles):
+    from openpyxl.cell import WriteOnlyCell
+    cell = WriteOnlyCell(ws, value)
+    for name, style in styles.items():
+        setattr(cell, name, style)
+    return cell
+
+def column_widths(rows, ncols):
+    # Width per column: longest value + 2, capped at 50
+    lengths = [0] * ncols
+    for row in rows:
+        for i, value in enumerate(row):
+            if value:
+                lengths[i] = max(lengths[i], len(str(value)))
+    return [min(n + 2, 50) for n in lengths]
+
+def set_column_widths(ws, widths):
+    # Must run before rows are appended on a write-only sheet
+    from openpyxl.utils import get_column_letter
+    for i, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+def add_sheet_table(wb, ws, base_table_name, ref, header):
+    import warnings
+    from openpyxl.worksheet.filters import AutoFilter
+    from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+    table_name = base_table_name
+    existing_table_names = set()
+    for sheet in wb.worksheets:
+        existing_table_names.update(sheet.tables.keys())
+    i = 1
+    while table_name in existing_table_names:
+        table_name = f"{base_table_name}_{i}"
+        i += 1
+    table = Table(displayName=table_name, ref=ref)
+    # Filter and column names up front: a write-only sheet cannot be read back for its header row
+    table.autoFilter = AutoFilter(ref=ref)
+    table.tableColumns = [TableColumn(id=i, name=str(name)) for i, name in enumerate(header, 1)]
+    style = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)
+    table.tableStyleInfo = style
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # openpyxl warns about table columns on every write-only sheet
         ws.add_table(table)
-    for col in ws.columns:
-        max_length = max(len(str(cell.value)) if cell.value else 0 for cell in col)
-        ws.column_dimensions[get_column_letter(col[0].column)].width = min(max_length+2, 50)
-    highlight_mismatches(ws)
 
-def write_overview_sheet(wb, summary_counts, entity_details=None, db_name=None, server=None, report_date=None):
-    from openpyxl.styles import PatternFill, Alignment, Font
-    ws = wb.create_sheet('Overview', 0)
-    # Title row
-    title = f"{db_name or ''} - SCHEMA VALIDATION REPORT"
-    ws.merge_cells('A1:F1')
-    ws['A1'] = title
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal='center')
-    # Server/date row
-    ws.merge_cells('A2:C2')
-    ws.merge_cells('D2:F2')
-    ws['A2'] = f"Server : {server or ''}"
-    ws['A2'].font = Font(bold=True)
-    ws['A2'].alignment = Alignment(horizontal='left')
-    ws['D2'] = f"DATE: {report_date or ''}"
-    ws['D2'].font = Font(bold=True)
-    ws['D2'].alignment = Alignment(horizontal='right')
-    # Header row
-    ws.append(['Entity', 'SQL Count', 'PG Count', 'Difference', 'Status', 'Reason'])
+def write_entity_sheet(wb, sheet_name, compare_rows, columns):
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    ws = wb.create_sheet(sheet_name)
+    out_columns = order_columns(columns)
+    def values():
+        for row in compare_rows:
+            yield [row.get(col, '') for col in out_columns]
+    # compare_rows may be a RowSpool; it is read twice (widths, then rows) rather than held in memory
+    set_column_widths(ws, column_widths(chain([out_columns], values()), len(out_columns)))
+    ws.append([styled_cell(ws, col, font=Font(bold=True)) for col in out_columns])
+    nrows = 0
+    for row_values in values():
+        ws.append(row_values)
+        nrows += 1
+    last_col = get_column_letter(len(out_columns))
+    if nrows:
+        add_sheet_table(wb, ws, f"Tbl_{sheet_name.replace(' ', '_')}", f"A1:{last_col}{nrows + 1}", out_columns)
+    highlight_mismatches(ws, get_column_letter(out_columns.index('Status') + 1), last_col, nrows + 1)
+
+def sheet_rows_from_workbook(wb):
+    # {sheet_name: [row dicts keyed by header]} for callers that only have a workbook
+    sheet_rows = {}
+    for ws in wb.worksheets:
+        header = [str(cell.value).strip() for cell in ws[1]]
+        sheet_rows[ws.title] = [dict(zip(header, (c.value for c in row))) for row in ws.iter_rows(min_row=2, max_row=ws.max_row)]
+    return sheet_rows
+
+def build_overview_rows(summary_counts, sheet_rows):
+    # One [Entity, SQL Count, PG Count, Difference, Status, Reason] row per entity,
+    # computed from the compare rows of each entity's sheet
+    def column_values(rows, name):
+        for row in rows:
+            for key, value in row.items():
+                if str(key).strip().lower() == name:
+                    yield value
+                    break
+    overview_rows = []
     datacounts_totals = None
     # Precompute total SQL/PG counts for DataCounts entity
-    if 'DataCounts' in wb.sheetnames:
-        dc_ws = wb['DataCounts']
+    if 'DataCounts' in sheet_rows and sheet_rows['DataCounts']:
         sql_total = 0
         pg_total = 0
-        # Find column indices
-        sql_idx = pg_idx = None
-        for idx, cell in enumerate(dc_ws[1], 1):
-            if str(cell.value).strip().lower() == 'sql_count':
-                sql_idx = idx
-            if str(cell.value).strip().lower() == 'pg_count':
-                pg_idx = idx
-        if sql_idx and pg_idx:
-            for row in dc_ws.iter_rows(min_row=2, max_row=dc_ws.max_row):
-                try:
-                    sql_total += int(row[sql_idx-1].value or 0)
-                except Exception:
-                    pass
-                try:
-                    pg_total += int(row[pg_idx-1].value or 0)
-                except Exception:
-                    pass
-            datacounts_totals = (sql_total, pg_total)
+        for value in column_values(sheet_rows['DataCounts'], 'sql_count'):
+            try:
+                sql_total += int(value or 0)
+            except Exception:
+                pass
+        for value in column_values(sheet_rows['DataCounts'], 'pg_count'):
+            try:
+                pg_total += int(value or 0)
+            except Exception:
+                pass
+        datacounts_totals = (sql_total, pg_total)
     for entity, counts in summary_counts.items():
         # For DataCounts, use the sum of SQL_count and PG_count from the DataCounts tab
         if entity == 'DataCounts' and datacounts_totals:
@@ -880,404 +1452,588 @@ def write_overview_sheet(wb, summary_counts, entity_details=None, db_name=None,
         diff = sql_count - pg_count
         status = 'Passed'
         reason_parts = []
-        mismatch_rows = []
-        missing_rows = []
-        extra_rows = []
-        # Scan the actual sheet for this entity, if it exists
-        sheet_name = entity
-        if sheet_name in wb.sheetnames:
-            entity_ws = wb[sheet_name]
-            # Find the Status column index
-            status_col_idx = None
-            for idx, cell in enumerate(entity_ws[1], 1):
-                if str(cell.value).strip().lower() == 'status':
-                    status_col_idx = idx
-                    break
-            if status_col_idx:
-                for row in entity_ws.iter_rows(min_row=2, max_row=entity_ws.max_row):
-                    status_val = str(row[status_col_idx-1].value or '').upper()
-                    if 'MISMATCH' in status_val:
-                        mismatch_rows.append(row)
-                    if 'MISSING IN PG' in status_val:
-                        missing_rows.append(row)
-                    if 'EXTRA IN PG' in status_val:
-                        extra_rows.append(row)
+        mismatch_rows = 0
+        missing_rows = 0
+        extra_rows = 0
+        # Scan the Status values of this entity's sheet, if it exists
+        for value in column_values(sheet_rows.get(entity, []), 'status'):
+            status_val = str(value or '').upper()
+            if 'MISMATCH' in status_val:
+                mismatch_rows += 1
+            if 'MISSING IN PG' in status_val:
+                missing_rows += 1
+            if 'EXTRA IN PG' in status_val:
+                extra_rows += 1
         # Status logic: only fail if MISMATCH or MISSING IN PG present (any variant)
         if mismatch_rows or missing_rows:
             status = 'Failed'
         else:
             status = 'Passed'
         # Reason logic
-        show_diff_missing = diff > 0 and (not missing_rows or diff != len(missing_rows))
+        show_diff_missing = diff > 0 and (not missing_rows or diff != missing_rows)
         if show_diff_missing:
             reason_parts.append(f"{diff} missing in PG")
-        elif diff > 0 and missing_rows and diff == len(missing_rows):
+        elif diff > 0 and missing_rows and diff == missing_rows:
             # Only show one
-            reason_parts.append(f"{len(missing_rows)} missing in PG")
+            reason_parts.append(f"{missing_rows} missing in PG")
         elif diff < 0:
             reason_parts.append(f"{abs(diff)} extra in PG")
-        if missing_rows and not (diff > 0 and diff == len(missing_rows)):
-            reason_parts.append(f"{len(missing_rows)} missing in PG")
+        if missing_rows and not (diff > 0 and diff == missing_rows):
+            reason_parts.append(f"{missing_rows} missing in PG")
         if mismatch_rows:
-            reason_parts.append(f"{len(mismatch_rows)} mismatches")
+            reason_parts.append(f"{mismatch_rows} mismatches")
         if extra_rows and not (mismatch_rows or missing_rows):
-            reason_parts.append(f"{len(extra_rows)} extra in PG")
+            reason_parts.append(f"{extra_rows} extra in PG")
         if not reason_parts:
             reason = 'All matched'
         else:
             reason = '; '.join(reason_parts)
-        ws.append([entity, sql_count, pg_count, diff, status, reason])
-    for cell in ws[3]:
-        cell.font = Font(bold=True)
-    # Color Status column: green for Passed, red for Failed
-    status_col_idx = None
-    for idx, cell in enumerate(ws[3], 1):
-        if str(cell.value).strip().lower() == 'status':
-            status_col_idx = idx
-            break
-    if status_col_idx:
-        for row in ws.iter_rows(min_row=4, max_row=ws.max_row):
-            status_val = str(row[status_col_idx-1].value or '').strip().lower()
-            if status_val == 'passed':
-                row[status_col_idx-1].fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')  # Green
-            elif status_val == 'failed':
-                row[status_col_idx-1].fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')  # Red
-    if ws.max_row > 1:
-        base_table_name = 'Tbl_Overview'
-        table_name = base_table_name
-        existing_table_names = set()
-        for sheet in wb.worksheets:
-            existing_table_names.update(sheet.tables.keys())
-        i = 1
-        while table_name in existing_table_names:
-            table_name = f"{base_table_name}_{i}"
-            i += 1
-        table = Table(displayName=table_name, ref=f"A3:F{ws.max_row}")
-        style = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False, showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-        table.tableStyleInfo = style
-        ws.add_table(table)
-    for col in ws.columns:
-        max_length = max(len(str(cell.value)) if cell.value else 0 for cell in col)
-        ws.column_dimensions[get_column_letter(col[0].column)].width = min(max_length+2, 50)
+        overview_rows.append([entity, sql_count, pg_count, diff, status, reason])
+    return overview_rows
 
-# --- Main ---
-def main():
-    # Use DB_LIST from config.py for database list
-    db_list = DB_LIST
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    reports_dir = os.path.join(script_dir, 'SchemaValidationReports')
-    os.makedirs(reports_dir, exist_ok=True)
-    for db in db_list:
-        print(f"\n=== Processing database: {db} ===")
-        SQL_SERVER_CONFIG['database'] = db
-        POSTGRES_CONFIG['database'] = db
-        print("Connecting to SQL Server and PostgreSQL...")
-        sql_conn = get_sqlserver_connection()
-        pg_conn = get_postgres_connection()
-        wb = openpyxl.Workbook()
+OVERVIEW_COLUMNS = ['Entity', 'SQL Count', 'PG Count', 'Difference', 'Status', 'Reason']
+
+REPORT_PARTS_COLUMNS = ['Entity', 'Part', 'Rows', 'Open']
+
+def merge_range(ws, cell_range):
+    # A write-only sheet has no merge_cells(); its ranges are just recorded
+    if hasattr(ws, 'merge_cells'):
+        ws.merge_cells(cell_range)
+    else:
+        ws.merged_cells.add(cell_range)
+
+def hyperlink_formula(target, text):
+    # Link cell that works on write-only sheets too: '#Sheet!A1' inside the workbook, or a relative file path
+    return '=HYPERLINK("{}","{}")'.format(target.replace('"', '""'), text.replace('"', '""'))
+
+def write_overview_sheet(wb, summary_counts, entity_details=None, db_name=None, server=None, report_date=None, overview_rows=None, report_parts=None):
+    from openpyxl.formatting.rule import CellIsRule
+    from openpyxl.styles import PatternFill, Alignment, Font
+    from openpyxl.utils import get_column_letter
+    if overview_rows is None:
+        overview_rows = build_overview_rows(summary_counts, sheet_rows_from_workbook(wb))
+    ws = wb.create_sheet('Overview', 0)
+    title = f"{db_name or ''} - SCHEMA VALIDATION REPORT"
+    server_text = f"Server : {server or ''}"
+    date_text = f"DATE: {report_date or ''}"
+    # report_parts: [(entity, part, rows, link target, link text)] for entities split by write_xlsx_report
+    report_parts = report_parts or []
+    parts_rows = [REPORT_PARTS_COLUMNS] + [[entity, part, rows, text] for entity, part, rows, _, text in report_parts] if report_parts else []
+    set_column_widths(ws, column_widths(chain([[title], [server_text, None, None, date_text], OVERVIEW_COLUMNS], overview_rows, parts_rows), len(OVERVIEW_COLUMNS)))
+    # Title row
+    ws.append([styled_cell(ws, title, font=Font(bold=True, size=14), alignment=Alignment(horizontal='center'))])
+    # Server/date row
+    ws.append([styled_cell(ws, server_text, font=Font(bold=True), alignment=Alignment(horizontal='left')), None, None,
+               styled_cell(ws, date_text, font=Font(bold=True), alignment=Alignment(horizontal='right'))])
+    merge_range(ws, 'A1:F1')
+    merge_range(ws, 'A2:C2')
+    merge_range(ws, 'D2:F2')
+    # Header row
+    ws.append([styled_cell(ws, col, font=Font(bold=True)) for col in OVERVIEW_COLUMNS])
+    for overview_row in overview_rows:
+        ws.append(list(overview_row))
+    # Color Status column: green for Passed, red for Failed (conditional formatting, one rule each)
+    if overview_rows:
+        status_col = get_column_letter(OVERVIEW_COLUMNS.index('Status') + 1)
+        status_range = f"{status_col}4:{status_col}{len(overview_rows) + 3}"
+        ws.conditional_formatting.add(status_range, CellIsRule(operator='equal', formula=['"Passed"'],
+            fill=PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')))  # Green
+        ws.conditional_formatting.add(status_range, CellIsRule(operator='equal', formula=['"Failed"'],
+            fill=PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')))  # Red
+    add_sheet_table(wb, ws, 'Tbl_Overview', f"A3:F{len(overview_rows) + 3}", OVERVIEW_COLUMNS)
+    if report_parts:
+        # Where the rows of each split entity are, below the summary table
+        ws.append([])
+        ws.append([styled_cell(ws, col, font=Font(bold=True)) for col in REPORT_PARTS_COLUMNS])
+        link_font = Font(color='0563C1', underline='single')
+        for entity, part, rows, target, text in report_parts:
+            ws.append([entity, part, rows, styled_cell(ws, hyperlink_formula(target, text), font=link_font)])
+
+TIMINGS_COLUMNS = ['Entity', 'Phase', 'Seconds', 'Rows', 'Rows Fetched', 'Round Trips', 'Peak RSS (MB)']
+
+def timings_rows(phases):
+    return [[p['entity'], p['phase'], p['seconds'], p.get('rows'), p.get('rows_fetched'), p.get('round_trips'), p.get('peak_rss_mb')] for p in phases]
+
+def write_timings_sheet(wb, phases):
+    from openpyxl.styles import Font
+    # Per-phase timings for this database, placed right after the Overview
+    ws = wb.create_sheet('Timings', 1 if 'Overview' in wb.sheetnames else None)
+    rows = timings_rows(phases)
+    set_column_widths(ws, column_widths(chain([TIMINGS_COLUMNS], rows), len(TIMINGS_COLUMNS)))
+    ws.append([styled_cell(ws, col, font=Font(bold=True)) for col in TIMINGS_COLUMNS])
+    for timings_row in rows:
+        ws.append(timings_row)
+
+# --- Report writers (xlsx, csv, json) ---
+OUTPUT_FORMATS = ('xlsx', 'csv', 'json')
+
+def report_base_name(server, db):
+    now_file = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+    return f'{server}_{db}_Schema_Validation_{now_file}'
+
+# Excel opens at most 1,048,576 rows per sheet; entities with more compare rows than
+# MAX_SHEET_ROWS are split, and the Overview links to every part. Lower it to keep
+# sheets quick to open.
+MAX_SHEET_ROWS = 1000000
+
+# How oversized entities are split: 'sheets' (numbered sheets in the report:
+# "Columns 1", "Columns 2", ...) or 'schemas' (one workbook per schema in a
+# <report>_Parts folder next to the report, each sheet still capped at MAX_SHEET_ROWS)
+SPLIT_LARGE_ENTITIES = 'sheets'
+
+REPORT_PARTS_SUFFIX = '_Parts'
+
+def report_parts_dir(report_path):
+    return os.path.splitext(report_path)[0] + REPORT_PARTS_SUFFIX
+
+def new_workbook(write_only=False):
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=write_only)
+    if not write_only:
         wb.remove(wb.active)
-        summary_counts = {}
-        entity_order = [
-            ('Tables', 'table', extract_tables),
-            ('Columns', 'column', extract_columns),
-            # Constraints and Checks will be handled separately
-            ('Indexes', 'index', extract_indexes),
-            ('Triggers', 'trigger', extract_triggers),
-            ('EventTriggers', 'eventtrigger', extract_event_triggers),
-            ('Views', 'view', extract_views),
-            ('Functions', 'function', extract_functions),  # Ensure Functions is present
-            ('Types', 'type', extract_types),
-            ('Procedures', 'procedure', extract_procedures),
-            ('DataCounts', 'datacounts', extract_table_counts),
-        ]
-        # --- Extract constraints and split into PK/FK/DEFAULT and CHECK ---
+    return wb
+
+def sheet_parts(sheet, compare_rows):
+    # [(sheet name, rows)]: the rows as they are, or MAX_SHEET_ROWS-row slices on "<sheet> 1", "<sheet> 2", ...
+    total = len(compare_rows)
+    if total <= MAX_SHEET_ROWS:
+        return [(sheet, compare_rows)]
+    return [(f"{sheet} {n}", RowRange(compare_rows, start, min(start + MAX_SHEET_ROWS, total)))
+            for n, start in enumerate(range(0, total, MAX_SHEET_ROWS), 1)]
+
+def rows_by_schema(compare_rows):
+    # [(schema, rows)] sorted by schema (SQL side, else PG side); spooled rows are re-spooled per schema
+    groups = {}
+    for row in compare_rows:
+        schema = str(row.get('SQL_schema') or row.get('PG_schema') or '')
+        if schema not in groups:
+            groups[schema] = RowSpool() if isinstance(compare_rows, RowSpool) else []
+        groups[schema].append(row)
+    return sorted(groups.items(), key=lambda item: item[0].lower())
+
+def write_schema_workbooks(parts_dir, sheet, compare_rows, out_columns):
+    # One workbook per schema for an oversized entity; returns its Overview part entries
+    os.makedirs(parts_dir, exist_ok=True)
+    parts = []
+    used_names = set()
+    for schema, schema_rows in rows_by_schema(compare_rows):
+        base_name = f"{sheet}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', schema) or 'no_schema'}"
+        name, i = base_name, 1
+        while name.lower() in used_names:  # Names that only differ in case or punctuation
+            i += 1
+            name = f"{base_name}_{i}"
+        used_names.add(name.lower())
+        file_name = name + '.xlsx'
+        spooled = isinstance(schema_rows, RowSpool)
+        wb = new_workbook(write_only=spooled)
+        for part_sheet, part_rows in sheet_parts(sheet, schema_rows):
+            write_entity_sheet(wb, part_sheet, part_rows, out_columns)
+        print(f"Saving {sheet} rows for schema {schema or '(none)'}: {file_name}")
+        wb.save(os.path.join(parts_dir, file_name))
+        parts.append((sheet, schema or '(no schema)', len(schema_rows),
+                      os.path.join(os.path.basename(parts_dir), file_name), file_name))
+        if spooled:
+            schema_rows.close()
+    return parts
+
+def write_xlsx_report(result, overview_rows, file_path, timings, timings_sheet=False):
+    db = result['db']
+    # Spooled (streamed) compare rows go to a write-only workbook, which streams each sheet to disk
+    streaming = any(isinstance(compare_rows, RowSpool) for _, compare_rows, _ in result['sheets'])
+    wb = new_workbook(write_only=streaming)
+    report_parts = []
+    for sheet, compare_rows, out_columns in result['sheets']:
+        with timings.phase(db, sheet, 'write') as rec:
+            print(f"Writing {sheet} tab to Excel...")
+            if len(compare_rows) > MAX_SHEET_ROWS and SPLIT_LARGE_ENTITIES == 'schemas':
+                report_parts.extend(write_schema_workbooks(report_parts_dir(file_path), sheet, compare_rows, out_columns))
+            else:
+                parts = sheet_parts(sheet, compare_rows)
+                for part_sheet, part_rows in parts:
+                    write_entity_sheet(wb, part_sheet, part_rows, out_columns)
+                if len(parts) > 1:
+                    report_parts.extend((sheet, part_sheet, len(part_rows), f"#'{part_sheet}'!A1", part_sheet)
+                                        for part_sheet, part_rows in parts)
+            rec['rows'] = len(compare_rows)
+    with timings.phase(db, 'Overview', 'write'):
+        print("Writing Overview tab to Excel...")
+        # Pass db, server, and date to write_overview_sheet
+        now = datetime.datetime.now().strftime('%d-%m-%Y')
+        write_overview_sheet(wb, result['summary_counts'], {}, db_name=db, server=result['server'], report_date=now,
+                             overview_rows=overview_rows, report_parts=report_parts)
+    if timings_sheet:
+        # Save time is not known yet when the sheet is written; it is in the JSON run log
+        write_timings_sheet(wb, timings.phases_for(db))
+    with timings.phase(db, 'Workbook', 'save'):
+        print(f"Saving Excel file: {file_path}")
+        wb.save(file_path)
+
+def write_csv_report(result, overview_rows, folder, timings, timings_sheet=False):
+    # One CSV per sheet inside a folder named like the xlsx report
+    import csv
+    db = result['db']
+    os.makedirs(folder, exist_ok=True)
+    def write(name, header, rows):
+        with open(os.path.join(folder, f"{name.replace(' ', '_')}.csv"), 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    for sheet, compare_rows, out_columns in result['sheets']:
+        with timings.phase(db, sheet, 'write') as rec:
+            out_columns = order_columns(out_columns)
+            write(sheet, out_columns, ([row.get(col, '') for col in out_columns] for row in compare_rows))
+            rec['rows'] = len(compare_rows)
+    with timings.phase(db, 'Overview', 'write'):
+        write('Overview', OVERVIEW_COLUMNS, overview_rows)
+    if timings_sheet:
+        write('Timings', TIMINGS_COLUMNS, timings_rows(timings.phases_for(db)))
+
+def write_json_report(result, overview_rows, file_path, timings, timings_sheet=False):
+    import json
+    db = result['db']
+    report = {
+        'database': db,
+        'server': result['server'],
+        'date': datetime.datetime.now().strftime('%d-%m-%Y'),
+        'overview': [dict(zip(OVERVIEW_COLUMNS, r)) for r in overview_rows],
+        'sheets': {},
+    }
+    for sheet, compare_rows, out_columns in result['sheets']:
+        with timings.phase(db, sheet, 'write') as rec:
+            out_columns = order_columns(out_columns)
+            report['sheets'][sheet] = [{col: row.get(col, '') for col in out_columns} for row in compare_rows]
+            rec['rows'] = len(compare_rows)
+    if timings_sheet:
+        report['timings'] = timings.phases_for(db)
+    with timings.phase(db, 'Report', 'save'):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1, default=str)
+
+# Output format -> (writer, file extension; '' means a folder)
+REPORT_WRITERS = {
+    'xlsx': (write_xlsx_report, '.xlsx'),
+    'csv': (write_csv_report, ''),
+    'json': (write_json_report, '.json'),
+}
+
+# --- Tab builders ---
+# Each builder extracts from both sides, compares, and returns
+# ([(sheet_name, compare_rows, out_columns), ...], summary_counts).
+# Catalog lists shared by several tabs of a database (base tables, columns), per connection.
+# validate_database() drops them when the database is done.
+_catalogs = weakref.WeakKeyDictionary()
+_catalogs_lock = threading.Lock()
+
+def catalog(conn, name, load):
+    with _catalogs_lock:
+        value = _catalogs.get(conn, {}).get(name)
+    if value is None:
+        value = load()
+        with _catalogs_lock:
+            _catalogs.setdefault(conn, {})[name] = value
+    return value
+
+def forget_catalogs(conn):
+    with _catalogs_lock:
+        _catalogs.pop(conn, None)
+
+def base_table_keys(conn, dbtype):
+    # Base tables (schema, table), extracted once and shared by the table-wise tabs
+    return catalog(conn, 'base_tables', lambda: set((t['_schema'], t['_name']) for t in annotate(extract_tables(conn, dbtype))))
+
+def column_catalog(conn, dbtype):
+    # Column catalog of the Columns tab, reused by ColumnProfiles
+    return catalog(conn, 'columns', lambda: extract_columns(conn, dbtype))
+
+# Add a per-object "<sheet> Detail" sheet (matched / missing / extra names per table)
+# next to the table-wise Constraints, Indexes and Triggers tabs
+TABLEWISE_DETAIL_SHEETS = False
+
+def tablewise_sheets(sheet, compare_rows, out_columns, diffs):
+    # The table-wise sheet, plus its per-object detail sheet when enabled
+    sheets = [(sheet, compare_rows, out_columns)]
+    if TABLEWISE_DETAIL_SHEETS:
+        sheets.append((f"{sheet} Detail", list(detail_rows(diffs)), DETAIL_COLUMNS))
+    return sheets
+
+def tablewise_row(diff, label):
+    # Per-table summary columns shared by the table-wise tabs
+    schema, table = diff['key']
+    return {
+        'sql_schema': schema,
+        'sql_tablename': table,
+        f'sql_{label}': ','.join(diff['sql_names']),
+        f'sql_{label}_count': len(diff['sql_names']),
+        'pg_schema': schema,  # Same key for both sides, so a table missing in PG still shows where
+        'pg_tablename': table,
+        f'pg_{label}': ','.join(diff['pg_names']),
+        f'pg_{label}_count': len(diff['pg_names']),
+    }
+
+def tablewise_reason(diff):
+    # Names left unmatched on either side; equal counts with different names are still a difference
+    reason_parts = []
+    if diff['missing']:
+        reason_parts.append(f"Missing in PG: {','.join(diff['missing'])}")
+    if diff['extra']:
+        reason_parts.append(f"Extra in PG: {','.join(diff['extra'])}")
+    return ' | '.join(reason_parts)
+
+def constraint_match_key(name, kinds):
+    # A table has one primary key whatever it is called; other constraints match on the normalized name
+    if 'primary key' in kinds:
+        return '#primary key'
+    if 'default' in kinds and name.lower().endswith('_default'):
+        name = name[:-len('_default')]  # Suffix added to PG default names below, dropped before trailing digits are
+    return normalize_constraint_name(name)
+
+def build_constraints_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # --- New Table-wise Constraints Tab (All constraints, schema/table/constraint names/counts) ---
+    with timings.phase(db, sheet, 'extract'):
         print(f"\n[Step] Extracting Constraints and Checks...")
         sql_constraints_all = filter_excluded(extract_constraints(sql_conn, 'sql'))
         pg_constraints_all = filter_excluded(extract_constraints(pg_conn, 'pg'))
-        # Split
-        def is_check(c):
-            return normalize_name(c.get('type','')) == 'check'
-        def is_pk_fk_default(c):
-            t = normalize_name(c.get('type',''))
-            return t in ('primary key', 'foreign key', 'default')
-        sql_checks = [c for c in sql_constraints_all if is_check(c)]
-        pg_checks = [c for c in pg_constraints_all if is_check(c)]
-        sql_constraints = [c for c in sql_constraints_all if is_pk_fk_default(c)]
-        pg_constraints = [c for c in pg_constraints_all if is_pk_fk_default(c)]
-        # --- Constraints Tab (PK, FK, CHECK, DEFAULT) ---
-        # [Old logic commented out for reference]
-        # print(f"Comparing Constraints (PK, FK, DEFAULT)...")
-        # compare_rows = compare_entities(sql_constraints, pg_constraints, 'constraint')
-        # summary_counts['Constraints'] = {'sql': len(sql_constraints), 'pg': len(pg_constraints)}
-        # all_fields = set()
-        # for row in compare_rows:
-        #     all_fields.update(row.keys())
-        # out_columns = [c for c in sorted(all_fields) if c != 'Status'] + ['Status']
-        # print(f"Writing Constraints tab to Excel...")
-        # write_entity_sheet(wb, 'Constraints', compare_rows, out_columns)
-        # --- CHECKS Tab ---
-        # print(f"Comparing CHECKS...")
-        # compare_rows = compare_entities(sql_checks, pg_checks, 'constraint')
-        # summary_counts['CHECKS'] = {'sql': len(sql_checks), 'pg': len(pg_checks)}
-        # all_fields = set()
-        # for row in compare_rows:
-        #     all_fields.update(row.keys())
-        # out_columns = [c for c in sorted(all_fields) if c != 'Status'] + ['Status']
-        # print(f"Writing CHECKS tab to Excel...")
-        # write_entity_sheet(wb, 'CHECKS', compare_rows, out_columns)
-
-        # --- New Table-wise Constraints Tab (All constraints, schema/table/constraint names/counts) ---
-        print(f"Building new table-wise Constraints tab... [NEW LOGIC v2025-09-16]")
         # Get set of base tables (schema, table) for filtering
-        sql_base_tables = set((normalize_name(t['schema']), normalize_name(t['name'])) for t in extract_tables(sql_conn, 'sql'))
-        pg_base_tables = set((normalize_name(t['schema']), normalize_name(t['name'])) for t in extract_tables(pg_conn, 'pg'))
-        def group_constraints_flat(constraints, allowed_tables, dbtype=None):
-            grouped = {}
-            # Use sets for unique constraint names per type
-            type_sets = {}
-            for c in constraints:
-                schema = normalize_name(c.get('schema',''))
-                table = normalize_name(c.get('table',''))
-                key = (schema, table)
-                if key not in allowed_tables:
-                    continue  # Only include base tables
-                name = c.get('name','')
-                ctype = normalize_name(c.get('type',''))
-                # For PG default constraints, append _default for clarity
-                if dbtype == 'pg' and ctype == 'default':
-                    name = f"{name}_default"
-                if key not in grouped:
-                    grouped[key] = []
-                grouped[key].append(name)
-                # Use sets for unique constraint names per type
-                if key not in type_sets:
-                    type_sets[key] = {'fk': set(), 'pk': set(), 'check': set(), 'default': set()}
-                if ctype == 'foreign key':
-                    type_sets[key]['fk'].add(name)
-                elif ctype == 'primary key':
-                    type_sets[key]['pk'].add(name)
-                elif ctype == 'check':
-                    type_sets[key]['check'].add(name)
-                elif ctype == 'default':
-                    type_sets[key]['default'].add(name)
-            # Convert sets to counts for output
-            type_counts = {k: {t: len(v[t]) for t in v} for k, v in type_sets.items()}
-            return grouped, type_counts
-        sql_grouped, sql_type_counts = group_constraints_flat(sql_constraints_all, sql_base_tables, dbtype='sql')
-        pg_grouped, pg_type_counts = group_constraints_flat(pg_constraints_all, pg_base_tables, dbtype='pg')
-        all_keys = set(sql_grouped.keys()) | set(pg_grouped.keys())
+        sql_base_tables = base_table_keys(sql_conn, 'sql')
+        pg_base_tables = base_table_keys(pg_conn, 'pg')
+    with timings.phase(db, sheet, 'compare') as rec:
+        print(f"Building new table-wise Constraints tab... [NEW LOGIC v2025-09-16]")
+        kind = lambda c: c['_type']
+        sql_grouped = group_names(sql_constraints_all, sql_base_tables, kind_of=kind)
+        # For PG default constraints, append _default for clarity
+        pg_name = lambda c: f"{c.get('name', '')}_default" if c['_type'] == 'default' else c.get('name', '')
+        pg_grouped = group_names(pg_constraints_all, pg_base_tables, name_of=pg_name, kind_of=kind)
+        diffs = list(grouped_set_diff(sql_grouped, pg_grouped, constraint_match_key))
         compare_rows = []
-        for key in sorted(all_keys):
-            sql_schema, sql_table = key
-            sql_constraints = sql_grouped.get(key, [])
-            pg_constraints = pg_grouped.get(key, [])
-            # Deduplicate and sort constraint names
-            sql_constraints_unique = sorted(set(sql_constraints))
-            pg_constraints_unique = sorted(set(pg_constraints))
-            # Get type counts for Reason
-            sql_types = sql_type_counts.get(key, {'fk':0, 'pk':0, 'check':0, 'default':0})
-            pg_types = pg_type_counts.get(key, {'fk':0, 'pk':0, 'check':0, 'default':0})
-            reason_parts = []
-            for label, typename in [('FK', 'fk'), ('PK', 'pk'), ('Check', 'check'), ('Default', 'default')]:
-                diff = sql_types[typename] - pg_types[typename]
-                if diff > 0:
-                    plural = '' if diff == 1 else 's'
-                    reason_parts.append(f"{diff} {label}{plural} is missing")
-            reason = ' | '.join(reason_parts)
-            row = {
-                'sql_schema': sql_schema,
-                'sql_tablename': sql_table,
-                'sql_constraints': ','.join(sql_constraints_unique),
-                'sql_constraints_count': len(sql_constraints_unique),
-                'pg_schema': sql_schema,  # Use same key for both, fallback to sql_schema if missing in PG
-                'pg_tablename': sql_table,
-                'pg_constraints': ','.join(pg_constraints_unique),
-                'pg_constraints_count': len(pg_constraints_unique),
-                'constraints_logic_version': 'v2025-09-16',  # Marker for new logic
-                'Reason': reason
-            }
-            row['Status'] = 'MATCHED' if row['sql_constraints_count'] == row['pg_constraints_count'] else 'MISMATCH'
+        for diff in diffs:
+            row = tablewise_row(diff, 'constraints')
+            row['constraints_logic_version'] = 'v2025-09-16'  # Marker for new logic
+            row['Reason'] = tablewise_reason(diff)
+            row['Status'] = 'MATCHED' if not diff['missing'] and not diff['extra'] else 'MISMATCH'
             compare_rows.append(row)
-        out_columns = [
-            'sql_schema', 'sql_tablename', 'sql_constraints', 'sql_constraints_count',
-            'pg_schema', 'pg_tablename', 'pg_constraints', 'pg_constraints_count',
-            'constraints_logic_version',
-            'Reason',
-            'Status'
-        ]
-        print(f"Writing new Constraints tab to Excel... [NEW LOGIC v2025-09-16]")
-        write_entity_sheet(wb, 'Constraints', compare_rows, out_columns)
-        # Calculate total unique constraints for overview
-        total_sql_constraints = sum(len(set(sql_grouped.get(key, []))) for key in sql_grouped)
-        total_pg_constraints = sum(len(set(pg_grouped.get(key, []))) for key in pg_grouped)
-        summary_counts['Constraints'] = {'sql': total_sql_constraints, 'pg': total_pg_constraints}
-        # --- New Table-wise Indexes Tab (All indexes, schema/table/index names/counts) ---
-        print(f"Building new table-wise Indexes tab... [NEW LOGIC v2025-09-16]")
+        rec['rows'] = len(compare_rows)
+    out_columns = [
+        'sql_schema', 'sql_tablename', 'sql_constraints', 'sql_constraints_count',
+        'pg_schema', 'pg_tablename', 'pg_constraints', 'pg_constraints_count',
+        'constraints_logic_version',
+        'Reason',
+        'Status'
+    ]
+    return tablewise_sheets(sheet, compare_rows, out_columns, diffs), {sheet: {'sql': count_names(sql_grouped), 'pg': count_names(pg_grouped)}}
+
+FOREIGN_KEY_FIELDS = ['schema', 'table', 'name', 'columns', 'references', 'on_update', 'on_delete']
+
+def build_foreign_keys_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Foreign keys matched on structure (hashed signature), so renamed keys still match
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting Foreign Keys...")
+        sql_fks = annotate(filter_excluded(extractor(sql_conn, 'sql')))
+        pg_fks = annotate(filter_excluded(extractor(pg_conn, 'pg')))
+    with timings.phase(db, sheet, 'compare') as rec:
+        print(f"Matching Foreign Keys by signature...")
+        compare_rows = []
+        for sql, pg, reason in match_foreign_keys(sql_fks, pg_fks):
+            row = {}
+            for prefix, fk in (('SQL_', sql), ('PG_', pg)):
+                for field in FOREIGN_KEY_FIELDS:
+                    row[prefix + field] = fk[field] if fk is not None else ''
+            row['signature'] = (sql or pg)['_signature']
+            if sql is None:
+                row['Status'] = 'EXTRA in PG'
+            elif pg is None:
+                row['Status'] = 'MISSING in PG'
+            else:
+                row['Status'] = 'MATCHED' if sql['_signature'] == pg['_signature'] else 'MISMATCH'
+            row['Reason'] = reason
+            compare_rows.append(row)
+        rec['rows'] = len(compare_rows)
+    out_columns = ['SQL_' + f for f in FOREIGN_KEY_FIELDS] + ['PG_' + f for f in FOREIGN_KEY_FIELDS] + ['signature', 'Reason', 'Status']
+    return [(sheet, compare_rows, out_columns)], {sheet: {'sql': len(sql_fks), 'pg': len(pg_fks)}}
+
+# Definitions tab: baselines live in this folder (default: SchemaValidationBaselines next to this script)
+DEFINITION_BASELINE_DIR = None
+
+# Replace changed hashes in the baseline after reporting them (otherwise they are reported until it is deleted)
+UPDATE_DEFINITION_BASELINE = False
+
+# Characters of a fetched body kept in the report (an Excel cell holds 32,767)
+DEFINITION_BODY_CHARS = 32000
+
+DEFINITION_FIELDS = ['schema', 'name', 'kind', 'params', 'length', 'hash']
+
+def definition_baseline_dir():
+    return DEFINITION_BASELINE_DIR or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SchemaValidationBaselines')
+
+def definition_match_key(rec):
+    # Schema and name; SQL procedures follow PROCEDURE_NAME_MAP (a procedure often becomes a PG function)
+    name = rec['_name']
+    if rec['dbtype'] == 'sql' and rec['kind'] == 'procedure' and PROCEDURE_NAME_MAP.get(rec['name']):
+        name = normalize_name(PROCEDURE_NAME_MAP[rec['name']][0])
+    return (rec['_schema'], name)
+
+def build_definitions_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Views, procedures and functions by server-side definition hash. Hashes of the two
+    # servers are not comparable (T-SQL vs PL/pgSQL), so each side is compared with its
+    # own baseline, and parameter counts are compared across sides.
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting definition hashes...")
+        sql_defs = annotate(filter_excluded(extractor(sql_conn, 'sql')))
+        pg_defs = annotate(filter_excluded(extractor(pg_conn, 'pg')))
+    path = baseline_path(definition_baseline_dir(), SQL_SERVER_CONFIG['server'], db)
+    baseline = load_baseline(path)
+    drifted = {'sql': [], 'pg': []}
+    for side, defs in (('sql', sql_defs), ('pg', pg_defs)):
+        for d in defs:
+            entry = baseline[side].get(definition_key(d))
+            d['_baseline'] = entry
+            if entry is not None and entry['hash'] != d['hash']:
+                drifted[side].append(d)
+    with timings.phase(db, sheet, 'extract') as rec:
+        # Bodies only for the objects whose hash moved since the baseline
+        bodies = {side: fetch_definition_bodies(conn, side, drifted[side]) if drifted[side] else {}
+                  for side, conn in (('sql', sql_conn), ('pg', pg_conn))}
+        rec['rows'] = len(drifted['sql']) + len(drifted['pg'])
+    with timings.phase(db, sheet, 'compare') as rec:
+        print(f"Comparing definition hashes ({len(drifted['sql'])} SQL / {len(drifted['pg'])} PG changed since baseline)...")
+        pg_index = {}
+        for pg in pg_defs:
+            pg_index.setdefault(definition_match_key(pg), []).append(pg)
+        pairs = []
+        for sql in sql_defs:
+            candidates = pg_index.get(definition_match_key(sql))
+            pairs.append((sql, candidates.pop(0) if candidates else None))
+        pairs.extend((None, pg) for candidates in pg_index.values() for pg in candidates)
+        compare_rows = []
+        for sql, pg in pairs:
+            row = {}
+            reasons = []
+            changed = False
+            for prefix, side, d in (('SQL_', 'sql', sql), ('PG_', 'pg', pg)):
+                for field in DEFINITION_FIELDS:
+                    row[prefix + field] = d[field] if d is not None else ''
+                row[prefix + 'definition'] = ''
+                if d is None:
+                    continue
+                entry = d['_baseline']
+                if entry is None:
+                    reasons.append(f"{prefix[:-1]} baseline recorded")
+                elif entry['hash'] != d['hash']:
+                    reasons.append(f"{prefix[:-1]} definition changed since baseline (length {entry['length']} -> {d['length']})")
+                    row[prefix + 'definition'] = (bodies[side].get(int(d['object_id'])) or '')[:DEFINITION_BODY_CHARS]
+                    changed = True
+            if sql is not None and pg is not None and sql['param_count'] != pg['param_count']:
+                reasons.insert(0, f"Parameter count differs: {sql['param_count']} vs {pg['param_count']}")
+                changed = True
+            if sql is None:
+                row['Status'] = 'EXTRA in PG'
+            elif pg is None:
+                row['Status'] = 'MISSING in PG'
+            else:
+                row['Status'] = 'MISMATCH' if changed else 'MATCHED'
+            row['Reason'] = '; '.join(reasons) or 'Unchanged since baseline'
+            compare_rows.append(row)
+        rec['rows'] = len(compare_rows)
+    added = [merge_baseline(baseline, side, defs, UPDATE_DEFINITION_BASELINE) for side, defs in (('sql', sql_defs), ('pg', pg_defs))]
+    if any(added):
+        save_baseline(path, baseline, SQL_SERVER_CONFIG['server'], db)
+        print(f"Definition baseline updated: {path}")
+    out_columns = (['SQL_' + f for f in DEFINITION_FIELDS] + ['PG_' + f for f in DEFINITION_FIELDS] +
+                   ['SQL_definition', 'PG_definition', 'Reason', 'Status'])
+    return [(sheet, compare_rows, out_columns)], {sheet: {'sql': len(sql_defs), 'pg': len(pg_defs)}}
+
+def index_names_related(sql_key, pg_key):
+    # Truncated or decorated index names: one normalized name contains the other
+    return bool(sql_key and pg_key) and (sql_key in pg_key or pg_key in sql_key)
+
+def build_indexes_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # --- New Table-wise Indexes Tab (All indexes, schema/table/index names/counts) ---
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting Indexes...")
         # Get set of base tables (schema, table) for filtering
-        sql_base_tables = set((normalize_name(t['schema']), normalize_name(t['name'])) for t in extract_tables(sql_conn, 'sql'))
-        pg_base_tables = set((normalize_name(t['schema']), normalize_name(t['name'])) for t in extract_tables(pg_conn, 'pg'))
-        def group_indexes_flat(indexes, allowed_tables):
-            grouped = {}
-            index_defs = {}
-            for idx in indexes:
-                schema = normalize_name(idx.get('schema',''))
-                table = normalize_name(idx.get('table',''))
-                key = (schema, table)
-                if key not in allowed_tables:
-                    continue  # Only include base tables
-                name = idx.get('name','')
-                columns = idx.get('columns','')
-                if key not in grouped:
-                    grouped[key] = []
-                    index_defs[key] = {}
-                grouped[key].append(name)
-                index_defs[key][name] = columns
-            return grouped, index_defs
+        sql_base_tables = base_table_keys(sql_conn, 'sql')
+        pg_base_tables = base_table_keys(pg_conn, 'pg')
         sql_indexes_all = filter_excluded(extract_indexes(sql_conn, 'sql'))
         pg_indexes_all = filter_excluded(extract_indexes(pg_conn, 'pg'))
-        sql_grouped_idx, sql_index_defs = group_indexes_flat(sql_indexes_all, sql_base_tables)
-        pg_grouped_idx, pg_index_defs = group_indexes_flat(pg_indexes_all, pg_base_tables)
-        all_idx_keys = set(sql_grouped_idx.keys()) | set(pg_grouped_idx.keys())
+    with timings.phase(db, sheet, 'compare') as rec:
+        print(f"Building new table-wise Indexes tab... [NEW LOGIC v2025-09-16]")
+        sql_grouped = group_names(sql_indexes_all, sql_base_tables)
+        pg_grouped = group_names(pg_indexes_all, pg_base_tables)
+        diffs = list(grouped_set_diff(sql_grouped, pg_grouped, lambda name, kinds: normalize_index_name(name), index_names_related))
         index_compare_rows = []
-        for key in sorted(all_idx_keys):
-            sql_schema, sql_table = key
-            sql_indexes = sql_grouped_idx.get(key, [])
-            pg_indexes = pg_grouped_idx.get(key, [])
-            # Deduplicate and sort index names
-            sql_indexes_unique = sorted(set(sql_indexes))
-            pg_indexes_unique = sorted(set(pg_indexes))
-            row = {
-                'sql_schema': sql_schema,
-                'sql_tablename': sql_table,
-                'sql_indexes': ','.join(sql_indexes_unique),
-                'sql_indexes_count': len(sql_indexes_unique),
-                'pg_schema': sql_schema,
-                'pg_tablename': sql_table,
-                'pg_indexes': ','.join(pg_indexes_unique),
-                'pg_indexes_count': len(pg_indexes_unique),
-            }
+        for diff in diffs:
+            row = tablewise_row(diff, 'indexes')
+            row['Reason'] = tablewise_reason(diff)
             # Status logic: if SQL count is 0 and PG count > 0, mark as EXTRA in PG
             if row['sql_indexes_count'] == 0 and row['pg_indexes_count'] > 0:
                 row['Status'] = 'EXTRA in PG'
+            elif not diff['missing'] and not diff['extra']:
+                row['Status'] = 'MATCHED'
             else:
-                row['Status'] = 'MATCHED' if row['sql_indexes_count'] == row['pg_indexes_count'] else 'MISMATCH'
+                row['Status'] = 'MISMATCH'
             index_compare_rows.append(row)
-        out_columns = [
-            'sql_schema', 'sql_tablename', 'sql_indexes', 'sql_indexes_count',
-            'pg_schema', 'pg_tablename', 'pg_indexes', 'pg_indexes_count',
-            'Reason',
-            'Status'
-        ]
-        print(f"Writing new Indexes tab to Excel... [NEW LOGIC v2025-09-16]")
-        write_entity_sheet(wb, 'Indexes', index_compare_rows, out_columns)
-        # Calculate total unique indexes for overview
-        total_sql_indexes = sum(len(set(sql_grouped_idx.get(key, []))) for key in sql_grouped_idx)
-        total_pg_indexes = sum(len(set(pg_grouped_idx.get(key, []))) for key in pg_grouped_idx)
-        summary_counts['Indexes'] = {'sql': total_sql_indexes, 'pg': total_pg_indexes}
-        # --- New Table-wise Triggers Tab (All triggers, schema/table/trigger names/counts) ---
-        print(f"Building new table-wise Triggers tab... [NEW LOGIC v2025-09-16]")
+        rec['rows'] = len(index_compare_rows)
+    out_columns = [
+        'sql_schema', 'sql_tablename', 'sql_indexes', 'sql_indexes_count',
+        'pg_schema', 'pg_tablename', 'pg_indexes', 'pg_indexes_count',
+        'Reason',
+        'Status'
+    ]
+    return tablewise_sheets(sheet, index_compare_rows, out_columns, diffs), {sheet: {'sql': count_names(sql_grouped), 'pg': count_names(pg_grouped)}}
+
+def trigger_match_key(name, kinds):
+    # Lowercase without underscores, then drop _insert/_update/_delete suffixes (memoized)
+    return strip_event_suffix(compact_name(name))
+
+def trigger_names_related(sql_key, pg_key):
+    # Robust matching: consider prefix match for truncation
+    return sql_key.startswith(pg_key) or pg_key.startswith(sql_key)
+
+def build_triggers_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # --- New Table-wise Triggers Tab (All triggers, schema/table/trigger names/counts) ---
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting Triggers...")
         # Get set of base tables (schema, table) for filtering
-        sql_base_tables = set((normalize_name(t['schema']), normalize_name(t['name'])) for t in extract_tables(sql_conn, 'sql'))
-        pg_base_tables = set((normalize_name(t['schema']), normalize_name(t['name'])) for t in extract_tables(pg_conn, 'pg'))
-        def group_triggers_flat(triggers, allowed_tables):
-            grouped = {}
-            for tr in triggers:
-                schema = normalize_name(tr.get('schema',''))
-                table = normalize_name(tr.get('table',''))
-                key = (schema, table)
-                # Fix: If allowed_tables is empty, allow all; else, check membership
-                if allowed_tables and key not in allowed_tables:
-                    continue  # Only include base tables if specified
-                name = tr.get('name','')
-                if key not in grouped:
-                    grouped[key] = []
-                # Fix: Always append, do not deduplicate here (deduplication is done later)
-                grouped[key].append(name)
-            return grouped
+        sql_base_tables = base_table_keys(sql_conn, 'sql')
+        pg_base_tables = base_table_keys(pg_conn, 'pg')
         sql_triggers_all = filter_excluded(extract_triggers(sql_conn, 'sql'))
         pg_triggers_all = filter_excluded(extract_triggers(pg_conn, 'pg'))
-        sql_grouped_tr = group_triggers_flat(sql_triggers_all, sql_base_tables)
-        pg_grouped_tr = group_triggers_flat(pg_triggers_all, pg_base_tables)
-        all_tr_keys = set(sql_grouped_tr.keys()) | set(pg_grouped_tr.keys())
+    with timings.phase(db, sheet, 'compare') as rec:
+        print(f"Building new table-wise Triggers tab... [NEW LOGIC v2025-09-16]")
+        # If a side has no base tables, allow all of its triggers
+        sql_grouped = group_names(sql_triggers_all, sql_base_tables or None)
+        pg_grouped = group_names(pg_triggers_all, pg_base_tables or None)
+        diffs = list(grouped_set_diff(sql_grouped, pg_grouped, trigger_match_key, trigger_names_related))
         trigger_compare_rows = []
-        def strip_pg_event_suffix(name):
-            # Remove _insert, _update, _delete suffixes for robust matching
-            return re.sub(r'_(insert|update|delete)$', '', name, flags=re.IGNORECASE)
-        def norm_trigger_name(name):
-            # Lowercase, remove underscores for robust matching
-            return (name or '').replace('_','').lower()
-        for key in sorted(all_tr_keys):
-            sql_schema, sql_table = key
-            sql_triggers = sql_grouped_tr.get(key, [])
-            pg_triggers = pg_grouped_tr.get(key, [])
-            sql_triggers_unique = sorted(set(sql_triggers))
-            pg_triggers_unique = sorted(set(pg_triggers))
-            sql_norm = [norm_trigger_name(t) for t in sql_triggers_unique]
-            pg_norm = [norm_trigger_name(t) for t in pg_triggers_unique]
-            sql_bases = [strip_pg_event_suffix(s) for s in sql_norm]
-            pg_bases = [strip_pg_event_suffix(p) for p in pg_norm]
-            # Robust matching: consider prefix match for truncation
-            missing_pg = []
-            for i, s in enumerate(sql_bases):
-                found = False
-                for p in pg_bases:
-                    if s == p or s.startswith(p) or p.startswith(s):
-                        found = True
-                        break
-                if not found:
-                    missing_pg.append(sql_triggers_unique[i])
-            extra_pg = []
-            for j, p in enumerate(pg_bases):
-                found = False
-                for s in sql_bases:
-                    if s == p or s.startswith(p) or p.startswith(s):
-                        found = True
-                        break
-                if not found:
-                    extra_pg.append(pg_triggers_unique[j])
-            row = {
-                'sql_schema': sql_schema,
-                'sql_tablename': sql_table,
-                'sql_triggers': ','.join(sql_triggers_unique),
-                'sql_triggers_count': len(sql_triggers_unique),
-                'pg_schema': sql_schema,
-                'pg_tablename': sql_table,
-                'pg_triggers': ','.join(pg_triggers_unique),
-                'pg_triggers_count': len(pg_triggers_unique),
-            }
-            reason_parts = []
-            if len(missing_pg) > 0:
-                plural = '' if len(missing_pg) == 1 else 's'
-                reason_parts.append(f"Missing in PG: {','.join(missing_pg)}")
-            if len(extra_pg) > 0:
-                plural = '' if len(extra_pg) == 1 else 's'
-                reason_parts.append(f"Extra in PG: {','.join(extra_pg)}")
+        for diff in diffs:
+            row = tablewise_row(diff, 'triggers')
+            row['Reason'] = tablewise_reason(diff)
             # Status logic: MATCHED if all SQL bases in PG and all PG bases in SQL
             if row['sql_triggers_count'] == 0 and row['pg_triggers_count'] > 0:
                 row['Status'] = 'EXTRA in PG'
-            elif not missing_pg and not extra_pg:
+            elif not diff['missing'] and not diff['extra']:
                 row['Status'] = 'MATCHED'
             else:
                 row['Status'] = 'MISMATCH'
             trigger_compare_rows.append(row)
-        out_columns = [
-            'sql_schema', 'sql_tablename', 'sql_triggers', 'sql_triggers_count',
-            'pg_schema', 'pg_tablename', 'pg_triggers', 'pg_triggers_count',
-            'Reason',
-            'Status'
-        ]
-        print(f"Writing new Triggers tab to Excel... [NEW LOGIC v2025-09-16]")
-        write_entity_sheet(wb, 'Triggers', trigger_compare_rows, out_columns)
-        # Calculate total unique triggers for overview
-        total_sql_triggers = sum(len(set(sql_grouped_tr.get(key, []))) for key in sql_grouped_tr)
-        total_pg_triggers = sum(len(set(pg_grouped_tr.get(key, []))) for key in pg_grouped_tr)
-        summary_counts['Triggers'] = {'sql': total_sql_triggers, 'pg': total_pg_triggers}
-        # --- Improved EventTriggers Tab with name mapping ---
+        rec['rows'] = len(trigger_compare_rows)
+    out_columns = [
+        'sql_schema', 'sql_tablename', 'sql_triggers', 'sql_triggers_count',
+        'pg_schema', 'pg_tablename', 'pg_triggers', 'pg_triggers_count',
+        'Reason',
+        'Status'
+    ]
+    return tablewise_sheets(sheet, trigger_compare_rows, out_columns, diffs), {sheet: {'sql': count_names(sql_grouped), 'pg': count_names(pg_grouped)}}
+
+def build_event_triggers_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # --- Improved EventTriggers Tab with name mapping ---
+    with timings.phase(db, sheet, 'extract'):
         print(f"\n[Step] Extracting EventTriggers with mapping...")
         sql_event_triggers = filter_excluded(extract_event_triggers(sql_conn, 'sql'))
         pg_event_triggers = filter_excluded(extract_event_triggers(pg_conn, 'pg'))
+    with timings.phase(db, sheet, 'compare') as rec:
         sql_names = [et['name'] for et in sql_event_triggers]
         pg_names = [et['name'] for et in pg_event_triggers]
+        pg_norm = [et['_name'] for et in pg_event_triggers]
         pg_types = [et.get('event_type', et.get('type', '')) for et in pg_event_triggers]  # dynamic event type
         matched_pg = set()
         compare_rows = []
@@ -1288,8 +2044,9 @@ def main():
             found_pg = []
             found_pg_types = []
             for mapped_pg in mapped_pg_names:
+                mapped_norm = normalize_name(mapped_pg)
                 for i, pg_name in enumerate(pg_names):
-                    if normalize_name(pg_name) == normalize_name(mapped_pg):
+                    if pg_norm[i] == mapped_norm:
                         found_pg.append(pg_name)
                         found_pg_types.append(pg_types[i] or 'event_trigger')
                         matched_pg.add(i)
@@ -1303,7 +2060,7 @@ def main():
                 # Fallback to normalized name matching
                 found = False
                 for i, pg_name in enumerate(pg_names):
-                    if normalize_name(sql_name) == normalize_name(pg_name):
+                    if sql_et['_name'] == pg_norm[i]:
                         row = {"SQL_name": sql_name, "SQL_event_type": sql_type, "PG_name": pg_name, "PG_event_type": pg_types[i] or 'event_trigger', "Status": "MATCHED", "Reason": "Direct name match"}
                         matched_pg.add(i)
                         found = True
@@ -1312,28 +2069,28 @@ def main():
                     row = {"SQL_name": sql_name, "SQL_event_type": sql_type, "PG_name": '', "PG_event_type": '', "Status": "MISSING in PG", "Reason": "No matching event trigger in PG"}
             compare_rows.append(row)
         # Add unmatched PG event triggers
+        all_mapped = {normalize_name(x) for mapped_list in EVENT_TRIGGER_NAME_MAP.values() for x in mapped_list}
         for i, pg_name in enumerate(pg_names):
             if i not in matched_pg:
                 # Check if this PG name is in any mapped list
-                mapped = False
-                for mapped_list in EVENT_TRIGGER_NAME_MAP.values():
-                    if normalize_name(pg_name) in [normalize_name(x) for x in mapped_list]:
-                        mapped = True
-                        break
+                mapped = pg_norm[i] in all_mapped
                 if not mapped:
                     row = {"SQL_name": '', "SQL_event_type": '', "PG_name": pg_name, "PG_event_type": pg_types[i] or 'event_trigger', "Status": "EXTRA in PG", "Reason": "Extra event trigger in PG"}
                     compare_rows.append(row)
-        out_columns = ["SQL_name", "SQL_event_type", "PG_name", "PG_event_type", "Status", "Reason"]
-        print(f"Writing EventTriggers tab to Excel... [IMPROVED LOGIC]")
-        write_entity_sheet(wb, "EventTriggers", compare_rows, out_columns)
-        summary_counts["EventTriggers"] = {"sql": len(sql_event_triggers), "pg": len(pg_event_triggers)}
-        # --- End Improved EventTriggers Tab ---
-        # --- Improved Procedures Tab with mapping and robust row alignment (EventTriggers logic) ---
+        rec['rows'] = len(compare_rows)
+    out_columns = ["SQL_name", "SQL_event_type", "PG_name", "PG_event_type", "Status", "Reason"]
+    return [(sheet, compare_rows, out_columns)], {sheet: {"sql": len(sql_event_triggers), "pg": len(pg_event_triggers)}}
+
+def build_procedures_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # --- Improved Procedures Tab with mapping and robust row alignment (EventTriggers logic) ---
+    with timings.phase(db, sheet, 'extract'):
         print(f"\n[Step] Extracting Procedures with mapping...")
         sql_procs = filter_excluded(extract_procedures(sql_conn, 'sql'))
         pg_procs = filter_excluded(extract_procedures(pg_conn, 'pg'))
+    with timings.phase(db, sheet, 'compare') as rec:
         sql_proc_names = [p['name'] for p in sql_procs]
         pg_proc_names = [p['name'] for p in pg_procs]
+        pg_proc_norm = [p['_name'] for p in pg_procs]
         matched_pg = set()
         compare_rows = []
         for sql_proc in sql_procs:
@@ -1341,8 +2098,9 @@ def main():
             mapped_pg_names = PROCEDURE_NAME_MAP.get(sql_name, [])
             found_pg = []
             for mapped_pg in mapped_pg_names:
+                mapped_norm = normalize_name(mapped_pg)
                 for i, pg_name in enumerate(pg_proc_names):
-                    if normalize_name(pg_name) == normalize_name(mapped_pg):
+                    if pg_proc_norm[i] == mapped_norm:
                         found_pg.append(pg_name)
                         matched_pg.add(i)
             if mapped_pg_names and found_pg:
@@ -1352,7 +2110,7 @@ def main():
             else:
                 found = False
                 for i, pg_name in enumerate(pg_proc_names):
-                    if normalize_name(sql_name) == normalize_name(pg_name):
+                    if sql_proc['_name'] == pg_proc_norm[i]:
                         row = {"SQL_name": sql_name, "PG_name": pg_name, "Status": "MATCHED", "Reason": "Direct name match"}
                         matched_pg.add(i)
                         found = True
@@ -1360,190 +2118,196 @@ def main():
                 if not found:
                     row = {"SQL_name": sql_name, "PG_name": '', "Status": "MISSING in PG", "Reason": "No matching procedure in PG"}
             compare_rows.append(row)
+        all_mapped = {normalize_name(x) for mapped_list in PROCEDURE_NAME_MAP.values() for x in mapped_list}
         for i, pg_name in enumerate(pg_proc_names):
             if i not in matched_pg:
-                mapped = False
-                for mapped_list in PROCEDURE_NAME_MAP.values():
-                    if normalize_name(pg_name) in [normalize_name(x) for x in mapped_list]:
-                        mapped = True
-                        break
+                mapped = pg_proc_norm[i] in all_mapped
                 if not mapped:
                     row = {"SQL_name": '', "PG_name": pg_name, "Status": "EXTRA in PG", "Reason": "Extra procedure in PG"}
                     compare_rows.append(row)
-        out_columns = ["SQL_name", "PG_name", "Status", "Reason"]
-        print(f"Writing Procedures tab to Excel... [IMPROVED LOGIC]")
-        write_entity_sheet(wb, "Procedures", compare_rows, out_columns)
-        summary_counts["Procedures"] = {"sql": len(sql_procs), "pg": len(pg_procs)}
-        # Remove Procedures1 sheet if it exists (Excel may auto-create it if duplicate names)
-        if 'Procedures1' in wb.sheetnames:
-            std = wb['Procedures1']
-            wb.remove(std)
-        # --- Rest of the tabs ---
-        entity_details = {}  # Collect details for overview
-        for sheet, entity_type, extractor in entity_order:
-            print(f"\n[Step] Extracting {sheet}...")
-            if sheet in ('Constraints', 'CHECKS', 'Indexes', 'Triggers', 'EventTriggers', 'Procedures'):
-                continue  # Already handled or handled specially
-            if sheet == 'Types':
-                print("Comparing Types with robust/fuzzy matching and SQL/PG columns...")
-                sql_types = extract_types(sql_conn, 'sql')
-                pg_types = extract_types(pg_conn, 'pg')
-                def norm_type_name(name):
-                    return (name or '').replace('_', '').lower()
-                matched_pg = set()
-                compare_rows = []
-                for sql in sql_types:
-                    sql_name = norm_type_name(sql['type_name'])
-                    sql_kind = sql.get('type_kind', '')
-                    best_pg = None
-                    for i, pg in enumerate(pg_types):
-                        if i in matched_pg:
-                            continue
-                        pg_name = norm_type_name(pg['type_name'])
-                        if sql_name == pg_name or sql_name in pg_name or pg_name in sql_name:
-                            best_pg = i
-                            break
-                    row = {
-                        'SQL_schema': sql['schema'],
-                        'SQL_type_name': sql['type_name'],
-                        'SQL_type_kind': sql_kind,
-                    }
-                    if best_pg is not None:
-                        pg = pg_types[best_pg]
-                        row['PG_schema'] = pg['schema']
-                        row['PG_type_name'] = pg['type_name']
-                        row['PG_type_kind'] = pg.get('type_kind', '')
-                        row['Reason'] = ''
-                        row['Status'] = 'MATCHED'
-                        matched_pg.add(best_pg)
-                    else:
-                        row['PG_schema'] = ''
-                        row['PG_type_name'] = ''
-                        row['PG_type_kind'] = ''
-                        row['Reason'] = 'Missing in PG'
-                        row['Status'] = 'MISSING in PG'
-                    compare_rows.append(row)
-                # Add unmatched PG types
-                for i, pg in enumerate(pg_types):
-                    if i not in matched_pg:
-                        row = {
-                            'SQL_schema': '',
-                            'SQL_type_name': '',
-                            'SQL_type_kind': '',
-                            'PG_schema': pg['schema'],
-                            'PG_type_name': pg['type_name'],
-                            'PG_type_kind': pg.get('type_kind', ''),
-                            'Reason': 'Extra in PG',
-                            'Status': 'EXTRA in PG'
-                        }
-                        compare_rows.append(row)
-                out_columns = ['SQL_schema', 'SQL_type_name', 'SQL_type_kind', 'PG_schema', 'PG_type_name', 'PG_type_kind', 'Reason', 'Status']
-                print("Writing Types tab to Excel... [ROBUST LOGIC]")
-                write_entity_sheet(wb, 'Types', compare_rows, out_columns)
-                summary_counts['Types'] = {'sql': len(sql_types), 'pg': len(pg_types)}
-                continue
-            if sheet == 'DataCounts':
-                continue  # Improved logic below
-            if sheet == 'Functions':
-                # --- Functions Tab: Only normal functions (exclude trigger functions) ---
-                print(f"Building Functions tab (excluding trigger functions)...")
-                sql_functions_all = filter_excluded(extract_functions(sql_conn, 'sql'))
-                pg_functions_all = filter_excluded(extract_functions(pg_conn, 'pg'))
-                sql_normal_functions = [f for f in sql_functions_all if f.get('function_type', 'normal') == 'normal']
-                pg_normal_functions = [f for f in pg_functions_all if f.get('function_type', 'normal') == 'normal']
-                compare_rows = compare_entities(sql_normal_functions, pg_normal_functions, 'function')
-                # Additional schema name mismatch check and status/Reason logic
-                for row in compare_rows:
-                    sql_name = row.get('SQL_name') or row.get('SQL_name', '')
-                    pg_name = row.get('PG_name') or row.get('PG_name', '')
-                    sql_schema = row.get('SQL_schema', '')
-                    pg_schema = row.get('PG_schema', '')
-                    status = row.get('Status', '')
-                    # If matched and schema also matches, set Status to 'MATCHED' and Reason to ''
-                    if sql_name and pg_name and normalize_name(sql_name) == normalize_name(pg_name):
-                        if sql_schema and pg_schema and normalize_name(sql_schema) != normalize_name(pg_schema):
-                            row['Status'] = 'MISMATCH'
-                            row['Reason'] = 'Schema name mismatch'
-                        elif status.startswith('MATCHED'):
-                            row['Status'] = 'MATCHED'
-                            row['Reason'] = ''
-                    elif status.startswith('MATCHED'):
-                        row['Status'] = 'MATCHED'
-                        row['Reason'] = ''
-                    elif status.startswith('MISMATCH') and not row.get('Reason'):
-                        row['Reason'] = 'Name mismatch'
-                    elif status.startswith('MISSING') and not row.get('Reason'):
-                        row['Reason'] = 'Missing in PG'
-                    elif status.startswith('EXTRA') and not row.get('Reason'):
-                        row['Reason'] = 'Extra in PG'
-                all_fields = set()
-                for row in compare_rows:
-                    all_fields.update(row.keys())
-                out_columns = [c for c in sorted(all_fields) if c not in ('Status','Reason')] + ['Reason','Status']
-                write_entity_sheet(wb, 'Functions', compare_rows, out_columns)
-                summary_counts['Functions'] = {'sql': len(sql_normal_functions), 'pg': len(pg_normal_functions)}
-
-                # --- Trigger Functions Tab: Only trigger functions from dbo, meta, public schemas ---
-                print(f"Building Trigger Functions tab (trigger functions from dbo/meta/public)...")
-                allowed_schemas = {'dbo', 'meta', 'public'}
-                def is_allowed_schema(f):
-                    return normalize_name(f.get('schema','')) in allowed_schemas
-                sql_trigger_functions = [f for f in sql_functions_all if f.get('function_type', 'normal') == 'trigger' and is_allowed_schema(f)]
-                pg_trigger_functions = [f for f in pg_functions_all if f.get('function_type', 'normal') == 'trigger' and is_allowed_schema(f)]
-                compare_rows = compare_entities(sql_trigger_functions, pg_trigger_functions, 'function')
-                # Additional schema name mismatch check and status/Reason logic
-                for row in compare_rows:
-                    sql_name = row.get('SQL_name') or row.get('SQL_name', '')
-                    pg_name = row.get('PG_name') or row.get('PG_name', '')
-                    sql_schema = row.get('SQL_schema', '')
-                    pg_schema = row.get('PG_schema', '')
-                    status = row.get('Status', '')
-                    if sql_name and pg_name and normalize_name(sql_name) == normalize_name(pg_name):
-                        if sql_schema and pg_schema and normalize_name(sql_schema) != normalize_name(pg_schema):
-                            row['Status'] = 'MISMATCH'
-                            row['Reason'] = 'Schema name mismatch'
-                        elif status.startswith('MATCHED'):
-                            row['Status'] = 'MATCHED'
-                            row['Reason'] = ''
-                    elif status.startswith('MATCHED'):
-                        row['Status'] = 'MATCHED'
-                        row['Reason'] = ''
-                    elif status.startswith('MISMATCH') and not row.get('Reason'):
-                        row['Reason'] = 'Name mismatch'
-                    elif status.startswith('MISSING') and not row.get('Reason'):
-                        row['Reason'] = 'Missing in PG'
-                    elif status.startswith('EXTRA') and not row.get('Reason'):
-                        row['Reason'] = 'Extra in PG'
-                all_fields = set()
-                for row in compare_rows:
-                    all_fields.update(row.keys())
-                out_columns = [c for c in sorted(all_fields) if c not in ('Status','Reason')] + ['Reason','Status']
-                write_entity_sheet(wb, 'Trigger Functions', compare_rows, out_columns)
-                summary_counts['Trigger Functions'] = {'sql': len(sql_trigger_functions), 'pg': len(pg_trigger_functions)}
-                continue
-            print(f"Extracting {sheet}...")
-            sql_data = filter_excluded(extractor(sql_conn, 'sql')) if sheet != 'EventTriggers' else []
-            pg_data = filter_excluded(extractor(pg_conn, 'pg'))
-            print(f"Comparing {sheet}...")
-            compare_rows = compare_entities(sql_data, pg_data, entity_type)
-            summary_counts[sheet] = {
-                'sql': len(sql_data) if sheet != 'EventTriggers' else 0,
-                'pg': len(pg_data)
+        rec['rows'] = len(compare_rows)
+    out_columns = ["SQL_name", "PG_name", "Status", "Reason"]
+    return [(sheet, compare_rows, out_columns)], {sheet: {"sql": len(sql_procs), "pg": len(pg_procs)}}
+
+def build_entity_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Generic tab: extract with the entity's extractor and compare with compare_entities
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting {sheet}...")
+        sql_data = filter_excluded(extractor(sql_conn, 'sql'))
+        pg_data = filter_excluded(extractor(pg_conn, 'pg'))
+    with timings.phase(db, sheet, 'compare') as rec:
+        print(f"Comparing {sheet}...")
+        compare_rows = compare_entities(sql_data, pg_data, entity_type)
+        all_fields = set()
+        for row in compare_rows:
+            all_fields.update(row.keys())
+        out_columns = [c for c in sorted(all_fields) if c not in ('Reason', 'Status')] + sorted(all_fields & {'Reason'}) + ['Status']
+        rec['rows'] = len(compare_rows)
+    return [(sheet, compare_rows, out_columns)], {sheet: {'sql': len(sql_data), 'pg': len(pg_data)}}
+
+def build_columns_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Columns: in memory like any other tab, or as a streaming sorted merge (STREAM_COLUMN_COMPARE)
+    if not STREAM_COLUMN_COMPARE:
+        return build_entity_tab(sheet, entity_type, column_catalog, sql_conn, pg_conn, timings, db)
+    counts = {'sql': 0, 'pg': 0}
+    def counted(records, side):
+        for rec in records:
+            counts[side] += 1
+            yield rec
+    compare_rows = RowSpool()
+    all_fields = set()
+    sql_stream = stream_columns(sql_conn, 'sql')
+    pg_stream = stream_columns(pg_conn, 'pg')
+    # Extraction and comparison are interleaved, so they are timed as one phase
+    with timings.phase(db, sheet, 'compare') as rec:
+        print(f"\n[Step] Extracting and comparing {sheet} (sorted merge)...")
+        try:
+            for row in merge_compare_columns(counted(sql_stream, 'sql'), counted(pg_stream, 'pg')):
+                all_fields.update(row)
+                compare_rows.append(row)
+        except SortOrderError as e:
+            print(f"{e}; comparing {sheet} in memory instead.")
+            compare_rows.close()
+            compare_rows = None
+        finally:
+            sql_stream.close()
+            pg_stream.close()
+        if compare_rows is not None:
+            rec['rows'] = len(compare_rows)
+    if compare_rows is None:
+        return build_entity_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db)
+    out_columns = [c for c in sorted(all_fields) if c not in ('Reason', 'Status')] + sorted(all_fields & {'Reason'}) + ['Status']
+    return [(sheet, compare_rows, out_columns)], {sheet: counts}
+
+def finalize_function_rows(compare_rows):
+    # Additional schema name mismatch check and status/Reason logic
+    for row in compare_rows:
+        sql_name = row.get('SQL_name') or row.get('SQL_name', '')
+        pg_name = row.get('PG_name') or row.get('PG_name', '')
+        sql_schema = row.get('SQL_schema', '')
+        pg_schema = row.get('PG_schema', '')
+        status = row.get('Status', '')
+        # If matched and schema also matches, set Status to 'MATCHED' and Reason to ''
+        if sql_name and pg_name and normalize_name(sql_name) == normalize_name(pg_name):
+            if sql_schema and pg_schema and normalize_name(sql_schema) != normalize_name(pg_schema):
+                row['Status'] = 'MISMATCH'
+                row['Reason'] = 'Schema name mismatch'
+            elif status.startswith('MATCHED'):
+                row['Status'] = 'MATCHED'
+                row['Reason'] = ''
+        elif status.startswith('MATCHED'):
+            row['Status'] = 'MATCHED'
+            row['Reason'] = ''
+        elif status.startswith('MISMATCH') and not row.get('Reason'):
+            row['Reason'] = 'Name mismatch'
+        elif status.startswith('MISSING') and not row.get('Reason'):
+            row['Reason'] = 'Missing in PG'
+        elif status.startswith('EXTRA') and not row.get('Reason'):
+            row['Reason'] = 'Extra in PG'
+    all_fields = set()
+    for row in compare_rows:
+        all_fields.update(row.keys())
+    return [c for c in sorted(all_fields) if c not in ('Status','Reason')] + ['Reason','Status']
+
+def build_functions_tabs(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting {sheet}...")
+        sql_functions_all = filter_excluded(extract_functions(sql_conn, 'sql'))
+        pg_functions_all = filter_excluded(extract_functions(pg_conn, 'pg'))
+    with timings.phase(db, sheet, 'compare') as rec:
+        # --- Functions Tab: Only normal functions (exclude trigger functions) ---
+        print(f"Building Functions tab (excluding trigger functions)...")
+        sql_normal_functions = [f for f in sql_functions_all if f.get('function_type', 'normal') == 'normal']
+        pg_normal_functions = [f for f in pg_functions_all if f.get('function_type', 'normal') == 'normal']
+        compare_rows = compare_entities(sql_normal_functions, pg_normal_functions, 'function')
+        out_columns = finalize_function_rows(compare_rows)
+        # --- Trigger Functions Tab: Only trigger functions from dbo, meta, public schemas ---
+        print(f"Building Trigger Functions tab (trigger functions from dbo/meta/public)...")
+        allowed_schemas = {'dbo', 'meta', 'public'}
+        def is_allowed_schema(f):
+            return f['_schema'] in allowed_schemas
+        sql_trigger_functions = [f for f in sql_functions_all if f.get('function_type', 'normal') == 'trigger' and is_allowed_schema(f)]
+        pg_trigger_functions = [f for f in pg_functions_all if f.get('function_type', 'normal') == 'trigger' and is_allowed_schema(f)]
+        trigger_compare_rows = compare_entities(sql_trigger_functions, pg_trigger_functions, 'function')
+        trigger_out_columns = finalize_function_rows(trigger_compare_rows)
+        rec['rows'] = len(compare_rows) + len(trigger_compare_rows)
+    sheets = [
+        ('Functions', compare_rows, out_columns),
+        ('Trigger Functions', trigger_compare_rows, trigger_out_columns),
+    ]
+    summary_counts = {
+        'Functions': {'sql': len(sql_normal_functions), 'pg': len(pg_normal_functions)},
+        'Trigger Functions': {'sql': len(sql_trigger_functions), 'pg': len(pg_trigger_functions)},
+    }
+    return sheets, summary_counts
+
+def build_types_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting {sheet}...")
+        sql_types = annotate(extract_types(sql_conn, 'sql'), name_field='type_name')
+        pg_types = annotate(extract_types(pg_conn, 'pg'), name_field='type_name')
+    with timings.phase(db, sheet, 'compare') as rec:
+        print("Comparing Types with robust/fuzzy matching and SQL/PG columns...")
+        matched_pg = set()
+        compare_rows = []
+        for sql in sql_types:
+            sql_name = sql['_compact']
+            sql_kind = sql.get('type_kind', '')
+            best_pg = None
+            for i, pg in enumerate(pg_types):
+                if i in matched_pg:
+                    continue
+                pg_name = pg['_compact']
+                if sql_name == pg_name or sql_name in pg_name or pg_name in sql_name:
+                    best_pg = i
+                    break
+            row = {
+                'SQL_schema': sql['schema'],
+                'SQL_type_name': sql['type_name'],
+                'SQL_type_kind': sql_kind,
             }
-            all_fields = set()
-            for row in compare_rows:
-                all_fields.update(row.keys())
-            out_columns = [c for c in sorted(all_fields) if c != 'Status'] + ['Status']
-            print(f" Writing {sheet} tab to Excel...")
-            write_entity_sheet(wb, sheet, compare_rows, out_columns)
-        # --- Improved DataCounts Tab ---
+            if best_pg is not None:
+                pg = pg_types[best_pg]
+                row['PG_schema'] = pg['schema']
+                row['PG_type_name'] = pg['type_name']
+                row['PG_type_kind'] = pg.get('type_kind', '')
+                row['Reason'] = ''
+                row['Status'] = 'MATCHED'
+                matched_pg.add(best_pg)
+            else:
+                row['PG_schema'] = ''
+                row['PG_type_name'] = ''
+                row['PG_type_kind'] = ''
+                row['Reason'] = 'Missing in PG'
+                row['Status'] = 'MISSING in PG'
+            compare_rows.append(row)
+        # Add unmatched PG types
+        for i, pg in enumerate(pg_types):
+            if i not in matched_pg:
+                row = {
+                    'SQL_schema': '',
+                    'SQL_type_name': '',
+                    'SQL_type_kind': '',
+                    'PG_schema': pg['schema'],
+                    'PG_type_name': pg['type_name'],
+                    'PG_type_kind': pg.get('type_kind', ''),
+                    'Reason': 'Extra in PG',
+                    'Status': 'EXTRA in PG'
+                }
+                compare_rows.append(row)
+        rec['rows'] = len(compare_rows)
+    out_columns = ['SQL_schema', 'SQL_type_name', 'SQL_type_kind', 'PG_schema', 'PG_type_name', 'PG_type_kind', 'Reason', 'Status']
+    return [(sheet, compare_rows, out_columns)], {sheet: {'sql': len(sql_types), 'pg': len(pg_types)}}
+
+def build_datacounts_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # --- Improved DataCounts Tab ---
+    with timings.phase(db, sheet, 'extract'):
         print(f"\n[Step] Extracting DataCounts with schema/table/percentage match...")
         sql_counts = filter_excluded(extract_table_counts(sql_conn, 'sql'))
         pg_counts = filter_excluded(extract_table_counts(pg_conn, 'pg'))
-        def norm_schema_table(row):
-            return (normalize_name(row.get('schema','')), normalize_name(row.get('name','')))
-        sql_lookup = {norm_schema_table(row): row for row in sql_counts}
-        pg_lookup = {norm_schema_table(row): row for row in pg_counts}
+    with timings.phase(db, sheet, 'compare') as rec:
+        sql_lookup = {(row['_schema'], row['_name']): row for row in sql_counts}
+        pg_lookup = {(row['_schema'], row['_name']): row for row in pg_counts}
         all_keys = set(sql_lookup.keys()) | set(pg_lookup.keys())
         compare_rows = []
         for key in sorted(all_keys):
@@ -1570,24 +2334,900 @@ def main():
                     percent = int((min(sql_count, pg_count) / max(sql_count, pg_count)) * 100)
                 row['Status'] = f"MISMATCH: {percent}% match (SQL: {sql_count}, PG: {pg_count})"
             compare_rows.append(row)
-        out_columns = ['SQL_schema', 'SQL_table', 'PG_schema', 'PG_table', 'SQL_count', 'PG_count', 'Status']
-        print(f"Writing DataCounts tab to Excel... [IMPROVED LOGIC]")
-        if 'DataCounts' in wb.sheetnames:
-            std = wb['DataCounts']
-            wb.remove(std)
-        write_entity_sheet(wb, 'DataCounts', compare_rows, out_columns)
-        summary_counts['DataCounts'] = {'sql': len(sql_counts), 'pg': len(pg_counts)}
-        # --- Overview Tab (already handled in the original code) ---
-        print("Writing Overview tab to Excel...")
-        # Pass db, server, and date to write_overview_sheet
-        now = datetime.datetime.now().strftime('%d-%m-%Y')
-        write_overview_sheet(wb, summary_counts, entity_details, db_name=db, server=SQL_SERVER_CONFIG['server'], report_date=now)
-        now_file = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
-        server = SQL_SERVER_CONFIG['server']
-        filename = f'{server}_{db}_Schema_Validation_{now_file}.xlsx'
-        file_path = os.path.join(reports_dir, filename)
-        print(f"Saving Excel file: {file_path}")
+        rec['rows'] = len(compare_rows)
+    out_columns = ['SQL_schema', 'SQL_table', 'PG_schema', 'PG_table', 'SQL_count', 'PG_count', 'Status']
+    return [(sheet, compare_rows, out_columns)], {sheet: {'sql': len(sql_counts), 'pg': len(pg_counts)}}
+
+COLUMN_STATS_FIELDS = ['column', 'type', 'rows', 'null_fraction', 'distinct', 'low', 'high', 'updated']
+
+def build_column_stats_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Optimizer statistics estimates compared per column (see profiles.compare_estimates); no table data is read
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting column statistics...")
+        # Tables missing on one side are reported by the Tables tab
+        tables = base_table_keys(sql_conn, 'sql') & base_table_keys(pg_conn, 'pg')
+        sql_stats = [s for s in filter_excluded(extractor(sql_conn, 'sql')) if (s['_schema'], s['_table']) in tables]
+        pg_stats = [s for s in filter_excluded(extractor(pg_conn, 'pg')) if (s['_schema'], s['_table']) in tables]
+    with timings.phase(db, sheet, 'compare') as rec:
+        def match_key(s):
+            return (s['_schema'], s['_table'], s['_name'].replace('_', ''))
+        pg_index = {match_key(s): s for s in pg_stats}
+        pairs = [(s, pg_index.pop(match_key(s), None)) for s in sql_stats]
+        pairs.extend((None, s) for s in pg_index.values())
+        pairs.sort(key=lambda pair: match_key(pair[0] or pair[1]))
+        compare_rows = []
+        for sql, pg in pairs:
+            row = {'schema': (sql or pg)['schema'], 'table': (sql or pg)['table']}
+            for prefix, s in (('SQL_', sql), ('PG_', pg)):
+                for field in COLUMN_STATS_FIELDS:
+                    value = '' if s is None else s[{'column': 'name', 'type': 'datatype'}.get(field, field)]
+                    row[prefix + field] = round(value, 4) if field == 'null_fraction' and value != '' else ('' if value is None else value)
+            if pg is None:
+                row['Status'], row['Reason'] = 'NO STATS in PG', 'No PostgreSQL statistics for this column (run ANALYZE)'
+            elif sql is None:
+                row['Status'], row['Reason'] = 'NO STATS in SQL', 'No SQL Server statistics lead with this column'
+            else:
+                row['Status'], row['Reason'] = compare_estimates(type_class(sql['datatype'], 'sql'), sql, pg)
+            compare_rows.append(row)
+        rec['rows'] = len(compare_rows)
+    out_columns = ['schema', 'table'] + ['SQL_' + f for f in COLUMN_STATS_FIELDS] + ['PG_' + f for f in COLUMN_STATS_FIELDS] + ['Reason', 'Status']
+    return [(sheet, compare_rows, out_columns)], {sheet: {'sql': len(sql_stats), 'pg': len(pg_stats)}}
+
+# ColumnProfiles tab: tables profiled at once per server. Each worker opens its own
+# connection to each server, so keep this within what the logins allow.
+PROFILE_WORKERS = 4
+
+def profile_plan(sql_cols, pg_cols, sql_tables, pg_tables):
+    # [(sql table, pg table, [(sql column, pg column)])] for base tables on both sides,
+    # columns matched like the Columns tab (lowercase, underscores removed)
+    def by_table(cols, tables):
+        groups = {}
+        for c in cols:
+            key = (c['_schema'], c['_table'])
+            if key in tables:
+                groups.setdefault(key, {})[c['_name'].replace('_', '')] = c
+        return groups
+    sql_groups, pg_groups = by_table(sql_cols, sql_tables), by_table(pg_cols, pg_tables)
+    plan = []
+    for key in sorted(set(sql_groups) & set(pg_groups)):
+        sql_group, pg_group = sql_groups[key], pg_groups[key]
+        pairs = [(sql, pg_group[name]) for name, sql in sql_group.items() if name in pg_group]
+        if pairs:
+            plan.append((pairs[0][0], pairs[0][1], pairs))
+    return plan
+
+def build_column_profiles_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Exact per-column profiles (nulls, distinct, min/max; see profiles.py), one aggregate query per table and server
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Reading column catalog for profiles...")
+        plan = profile_plan(filter_excluded(column_catalog(sql_conn, 'sql')), filter_excluded(column_catalog(pg_conn, 'pg')),
+                            base_table_keys(sql_conn, 'sql'), base_table_keys(pg_conn, 'pg'))
+    local = threading.local()
+    opened = []
+    opened_lock = threading.Lock()
+    def connection(side):
+        main_conn = sql_conn if side == 'sql' else pg_conn
+        if PROFILE_WORKERS <= 1:
+            return main_conn
+        conns = local.__dict__.setdefault('conns', {})
+        if side not in conns:
+            conns[side] = open_connection_like(main_conn, timings, db)
+            with opened_lock:
+                opened.append(conns[side])
+        return conns[side]
+    def profile(side, table, columns):
+        # (row count, stats) or the error message of the profile query
+        with timings.entity(sheet):
+            try:
+                cursor = connection(side).cursor()
+                cursor.execute(profile_query(table['schema'], table['table'], columns, side))
+                return parse_profile(cursor.fetchone(), columns)
+            except Exception as e:
+                if run_cancelled(sql_conn, e):
+                    raise
+                # Only roll back a connection that exists: the failure may be opening one
+                if PROFILE_WORKERS <= 1 or side in getattr(local, 'conns', {}):
+                    rollback_quietly(connection(side))
+                return str(e)
+    with timings.phase(db, sheet, 'extract') as rec:
+        print(f"Profiling {len(plan)} tables ({PROFILE_WORKERS} at a time)...")
+        tasks = []
+        for sql_table, pg_table, pairs in plan:
+            sql_spec = [(sql['name'], type_class(sql['datatype'], 'sql')) for sql, _ in pairs]
+            pg_spec = [(pg['name'], type_class(pg['datatype'], 'pg')) for _, pg in pairs]
+            tasks.append((('sql', sql_table, sql_spec), ('pg', pg_table, pg_spec)))
+        try:
+            if PROFILE_WORKERS <= 1:
+                results = [(profile(*sql_task), profile(*pg_task)) for sql_task, pg_task in tasks]
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix='profile') as pool:
+                    futures = [(pool.submit(profile, *sql_task), pool.submit(profile, *pg_task)) for sql_task, pg_task in tasks]
+                    results = [(f_sql.result(), f_pg.result()) for f_sql, f_pg in futures]
+        finally:
+            for conn in opened:
+                close_extra_connection(conn)
+        rec['rows'] = len(tasks)
+    with timings.phase(db, sheet, 'compare') as rec:
+        compare_rows = []
+        for (sql_table, pg_table, pairs), (sql_result, pg_result) in zip(plan, results):
+            for sql, pg in pairs:
+                cls = type_class(sql['datatype'], 'sql')
+                row = {'SQL_schema': sql['schema'], 'SQL_table': sql['table'], 'SQL_column': sql['name'], 'SQL_type': sql['datatype'],
+                       'PG_schema': pg['schema'], 'PG_table': pg['table'], 'PG_column': pg['name'], 'PG_type': pg['datatype']}
+                if isinstance(sql_result, str) or isinstance(pg_result, str):
+                    errors = [f"{side} profile failed: {r}" for side, r in (('SQL', sql_result), ('PG', pg_result)) if isinstance(r, str)]
+                    row.update(Status='MISMATCH', Reason='; '.join(errors))
+                    compare_rows.append(row)
+                    continue
+                (sql_rows, sql_stats), (pg_rows, pg_stats) = sql_result, pg_result
+                s, p = sql_stats[sql['name']], pg_stats[pg['name']]
+                row.update({'SQL_rows': sql_rows, 'PG_rows': pg_rows, 'SQL_nulls': s['nulls'], 'PG_nulls': p['nulls'],
+                            'SQL_distinct': s.get('distinct', ''), 'PG_distinct': p.get('distinct', ''),
+                            'SQL_min': report_value(s.get('min')), 'PG_min': report_value(p.get('min')),
+                            'SQL_max': report_value(s.get('max')), 'PG_max': report_value(p.get('max'))})
+                row['Status'], row['Reason'] = compare_profile(cls, sql_rows, s, pg_rows, p)
+                compare_rows.append(row)
+        rec['rows'] = len(compare_rows)
+    out_columns = ['SQL_schema', 'SQL_table', 'SQL_column', 'SQL_type', 'PG_schema', 'PG_table', 'PG_column', 'PG_type',
+                   'SQL_rows', 'PG_rows', 'SQL_nulls', 'PG_nulls', 'SQL_distinct', 'PG_distinct',
+                   'SQL_min', 'PG_min', 'SQL_max', 'PG_max', 'Reason', 'Status']
+    return [(sheet, compare_rows, out_columns)], {sheet: {'sql': len(compare_rows), 'pg': len(compare_rows)}}
+
+SAMPLE_FIELDS = ['schema', 'table', 'key_columns', 'est_rows', 'sampled', 'missing_in_pg', 'extra_in_pg',
+                 'mismatched_rows', 'mismatched_columns', 'Reason', 'Status']
+SAMPLE_DETAIL_FIELDS = ['schema', 'table', 'key', 'column', 'SQL_value', 'PG_value', 'Status']
+
+def fetch_sample_rows(cursor, classes, key_positions):
+    # {normalized key: (raw key, normalized row)}
+    rows = {}
+    for row in cursor.fetchall():
+        values = tuple(normalize_value(v, cls) for v, cls in zip(row, classes))
+        rows[tuple(values[i] for i in key_positions)] = (tuple(row[i] for i in key_positions), values)
+    return rows
+
+def lookup_sample_rows(conn, side, table, columns, key_columns, raw_keys, classes, key_positions):
+    cursor = conn.cursor()
+    rows = {}
+    for batch in lookup_batches(raw_keys, len(key_columns)):
+        cursor.execute(lookup_query(table['schema'], table['table'], columns, key_columns, len(batch), side),
+                       [value for key in batch for value in key])
+        rows.update(fetch_sample_rows(cursor, classes, key_positions))
+    return rows
+
+def sample_table(sql_conn, pg_conn, sql_table, pg_table, pairs, key_positions, est_rows, side_rows):
+    # (rows of the SQL sample and of its lookups, same for PG) for one table; est_rows is the
+    # shared estimate, side_rows each server's own ({'sql': rows, 'pg': rows})
+    classes = [type_class(sql['datatype'], 'sql') for sql, _ in pairs]
+    sides = {'sql': (sql_conn, sql_table, [sql['name'] for sql, _ in pairs]),
+             'pg': (pg_conn, pg_table, [pg['name'] for _, pg in pairs])}
+    found = {}
+    for side, (conn, table, columns) in sides.items():
+        key_columns = [columns[i] for i in key_positions]
+        cursor = conn.cursor()
+        cursor.execute(sample_query(table['schema'], table['table'], columns, key_columns, side, est_rows, side_rows[side]))
+        found[side] = fetch_sample_rows(cursor, classes, key_positions)
+    sampled = {side: set(rows) for side, rows in found.items()}
+    for side, other in (('sql', 'pg'), ('pg', 'sql')):
+        conn, table, columns = sides[side]
+        wanted = [found[other][key][0] for key in sampled[other] - sampled[side]]
+        if wanted:
+            found[side].update(lookup_sample_rows(conn, side, table, columns, [columns[i] for i in key_positions],
+                                                  wanted, classes, key_positions))
+    return classes, sampled, found
+
+def keyed_table_plan(sql_conn, pg_conn, primary_keys):
+    # [(sql table, pg table, column pairs, key columns, key positions)] for base tables on both sides.
+    # primary_keys: annotated extract_primary_keys records of SQL Server. Column pairs leave out
+    # SAMPLE_SKIP_TYPES; key positions index the pairs, None when the key is missing or not matched in PG.
+    tables = base_table_keys(sql_conn, 'sql') & base_table_keys(pg_conn, 'pg')
+    keys = {(k['_schema'], k['_table']): k['columns'] for k in primary_keys}
+    plan = []
+    for sql_table, pg_table, pairs in profile_plan(filter_excluded(column_catalog(sql_conn, 'sql')),
+                                                   filter_excluded(column_catalog(pg_conn, 'pg')), tables, tables):
+        pairs = [(sql, pg) for sql, pg in pairs if sql['datatype'].lower() not in SAMPLE_SKIP_TYPES]
+        names = [sql['name'] for sql, _ in pairs]
+        key_columns = keys.get((sql_table['_schema'], sql_table['_table']), [])
+        positions = [names.index(c) for c in key_columns] if key_columns and all(c in names for c in key_columns) else None
+        plan.append((sql_table, pg_table, pairs, key_columns, positions))
+    return plan
+
+def unkeyed_reason(key_columns):
+    return 'No primary key' if not key_columns else 'Key columns not matched in PG'
+
+def difference_detail(table, key_columns, key, column, sql_value, pg_value, status):
+    # One row of a DataSample/RowDiff Detail sheet
+    return {'schema': table['schema'], 'table': table['table'], 'key': ', '.join(f"{c}={v}" for c, v in zip(key_columns, key)),
+            'column': column, 'SQL_value': report_value(sql_value), 'PG_value': report_value(pg_value), 'Status': status}
+
+def mismatched_columns_text(columns):
+    return ', '.join(f"{c} ({count})" for c, count in sorted(columns.items()) if count)
+
+def build_data_sample_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Sampled row comparison for tables with a primary key (see sampling.py)
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Reading keys and columns for sampling...")
+        plan = keyed_table_plan(sql_conn, pg_conn, filter_excluded(extractor(sql_conn, 'sql')))
+        estimates = {'sql': extract_row_estimates(sql_conn, 'sql'), 'pg': extract_row_estimates(pg_conn, 'pg')}
+    compare_rows, detail = [], []
+    with timings.phase(db, sheet, 'extract') as rec:
+        print(f"Sampling up to {SAMPLE_ROWS} rows per side from {len(plan)} tables...")
+        for sql_table, pg_table, pairs, key_columns, key_positions in plan:
+            side_rows = {'sql': estimates['sql'].get((sql_table['_schema'], sql_table['_table'])),
+                         'pg': estimates['pg'].get((pg_table['_schema'], pg_table['_table']))}
+            est_rows = shared_estimate(side_rows['sql'], side_rows['pg'])
+            row = {'schema': sql_table['schema'], 'table': sql_table['table'], 'key_columns': ','.join(key_columns),
+                   'est_rows': '' if est_rows is None else est_rows}
+            compare_rows.append(row)
+            if key_positions is None:
+                row['Status'], row['Reason'] = 'SKIPPED', unkeyed_reason(key_columns)
+                continue
+            names = [sql['name'] for sql, _ in pairs]
+            try:
+                classes, sampled, found = sample_table(sql_conn, pg_conn, sql_table, pg_table, pairs, key_positions, est_rows, side_rows)
+            except Exception as e:
+                if run_cancelled(sql_conn, e):
+                    raise
+                rollback_quietly(pg_conn)
+                row['Status'], row['Reason'] = 'MISMATCH', f"Sampling failed: {e}"
+                continue
+            missing = sorted((k for k in sampled['sql'] if k not in found['pg']), key=repr)
+            extra = sorted((k for k in sampled['pg'] if k not in found['sql']), key=repr)
+            mismatched, columns = 0, {}
+            diffs = []
+            for k in sorted(set(found['sql']) & set(found['pg']), key=repr):
+                sql_values, pg_values = found['sql'][k][1], found['pg'][k][1]
+                differing = [i for i, cls in enumerate(classes) if not values_equal(cls, sql_values[i], pg_values[i])]
+                if differing:
+                    mismatched += 1
+                    for i in differing:
+                        columns[names[i]] = columns.get(names[i], 0) + 1
+                        diffs.append((k, names[i], sql_values[i], pg_values[i], 'MISMATCH'))
+            diffs = ([(k, '', None, None, 'MISSING in PG') for k in missing] + [(k, '', None, None, 'EXTRA in PG') for k in extra] + diffs)
+            detail.extend(difference_detail(sql_table, key_columns, *d) for d in diffs[:SAMPLE_DIFF_ROWS])
+            n = len(sampled['sql'] | sampled['pg'])
+            differing_rows = len(missing) + len(extra) + mismatched
+            if not is_full_read(est_rows):
+                reason = bound_text(n, differing_rows, max(est_rows, n))
+            elif max(len(sampled['sql']), len(sampled['pg'])) < SAMPLE_ROWS:
+                reason = bound_text(n, differing_rows, n)  # a small table read in key order was compared whole
+            else:
+                reason = prefix_text(n, differing_rows)  # the estimate was missing or stale
+            row.update({'sampled': n, 'missing_in_pg': len(missing), 'extra_in_pg': len(extra), 'mismatched_rows': mismatched,
+                        'mismatched_columns': mismatched_columns_text(columns),
+                        'Reason': reason,
+                        'Status': 'MISMATCH' if differing_rows else 'MATCHED'})
+        rec['rows'] = len(compare_rows)
+    sheets = [(sheet, compare_rows, SAMPLE_FIELDS)]
+    if detail:
+        sheets.append((f"{sheet} Detail", detail, SAMPLE_DETAIL_FIELDS))
+    sampled_tables = sum(1 for row in compare_rows if row['Status'] != 'SKIPPED')
+    return sheets, {sheet: {'sql': sampled_tables, 'pg': sampled_tables}}
+
+# RowDiff tab: 'schema.table' names (SQL Server side) to diff row by row; set with
+# SchemaValidatorCLI.py --row-diff. Each table reads both servers in full.
+ROW_DIFF_TABLES = []
+
+# Tables diffed at once; each one reads on its own pair of connections
+ROW_DIFF_WORKERS = 2
+
+ROW_DIFF_FIELDS = ['schema', 'table', 'key_columns', 'sql_rows', 'pg_rows', 'matched_rows', 'missing_in_pg', 'extra_in_pg',
+                   'mismatched_rows', 'mismatched_columns', 'seconds', 'Reason', 'Status']
+
+def row_diff_table(sql_conn, pg_conn, sql_table, pg_table, pairs, key_columns, key_positions):
+    # (counts, capped detail rows) for one table, streamed in key order on both sides
+    classes = [type_class(sql['datatype'], 'sql') for sql, _ in pairs]
+    names = [sql['name'] for sql, _ in pairs]
+    sql_cursor = sql_conn.cursor()
+    pg_cursor = pg_conn.cursor(name='schema_validator_rowdiff')
+    try:
+        sql_cursor.execute(ordered_query(sql_table['schema'], sql_table['table'], names, key_positions, classes, 'sql'))
+        pg_cursor.execute(ordered_query(pg_table['schema'], pg_table['table'], [pg['name'] for _, pg in pairs],
+                                        key_positions, classes, 'pg'))
+        counts = new_counts(names)
+        detail = []
+        token = sql_conn.cancel_token
+        for n, diff in enumerate(diff_streams(normalized_rows(sql_cursor, classes, key_positions),
+                                              normalized_rows(pg_cursor, classes, key_positions), names, classes, counts)):
+            if len(detail) < ROW_DIFF_SAMPLE_ROWS:
+                detail.append(difference_detail(sql_table, key_columns, *diff))
+            if token is not None and n % STREAM_BATCH_ROWS == 0:
+                token.check()
+        return counts, detail
+    finally:
+        for cursor in (sql_cursor, pg_cursor):
+            try:
+                cursor.close()
+            except Exception as e:
+                print(f"Error closing row diff cursor: {e}")
+
+def build_row_diff_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # Exact row-level diff of the ROW_DIFF_TABLES (see rowdiff.py), ROW_DIFF_WORKERS tables at a time
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Reading keys and columns for row diff...")
+        # 'schema.table', or a bare table name for that table in any schema
+        wanted = {normalize_name(name) for name in ROW_DIFF_TABLES}
+        plan = [t for t in keyed_table_plan(sql_conn, pg_conn, filter_excluded(extractor(sql_conn, 'sql')))
+                if {f"{t[0]['_schema']}.{t[0]['_table']}", t[0]['_table']} & wanted]
+        found = {name for t in plan for name in (f"{t[0]['_schema']}.{t[0]['_table']}", t[0]['_table'])}
+        unknown = sorted(name for name in ROW_DIFF_TABLES if normalize_name(name) not in found)
+    if not ROW_DIFF_TABLES:
+        print("No tables to diff: set ROW_DIFF_TABLES or pass --row-diff.")
+    def diff_table(sql_table, pg_table, pairs, key_columns, key_positions):
+        # Runs on a worker thread with its own connections (the run's connections when ROW_DIFF_WORKERS is 1)
+        with timings.entity(sheet):
+            started = time.perf_counter()
+            conns, opened = [], []
+            try:
+                # Opened one at a time, so a failure on the second side still closes the first
+                for conn in (sql_conn, pg_conn):
+                    if ROW_DIFF_WORKERS <= 1:
+                        conns.append(conn)
+                    else:
+                        conns.append(open_connection_like(conn, timings, db))
+                        opened.append(conns[-1])
+                counts, detail = row_diff_table(conns[0], conns[1], sql_table, pg_table, pairs, key_columns, key_positions)
+                return counts, detail, time.perf_counter() - started
+            except Exception as e:
+                if run_cancelled(sql_conn, e):
+                    raise
+                if len(conns) > 1:
+                    rollback_quietly(conns[1])
+                reason = f"Rows not in the same key order on both servers: {e}" if isinstance(e, SortOrderError) else str(e)
+                return reason, [], time.perf_counter() - started
+            finally:
+                for conn in opened:
+                    close_extra_connection(conn)
+    compare_rows, detail = [], []
+    with timings.phase(db, sheet, 'compare') as rec:
+        keyed = [t for t in plan if t[4] is not None]
+        print(f"Diffing {len(keyed)} tables row by row ({ROW_DIFF_WORKERS} at a time)...")
+        if ROW_DIFF_WORKERS <= 1:
+            results = [diff_table(*t) for t in keyed]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=ROW_DIFF_WORKERS, thread_name_prefix='rowdiff') as pool:
+                results = [f.result() for f in [pool.submit(diff_table, *t) for t in keyed]]
+        results = iter(results)
+        for sql_table, pg_table, pairs, key_columns, key_positions in plan:
+            row = {'schema': sql_table['schema'], 'table': sql_table['table'], 'key_columns': ','.join(key_columns)}
+            compare_rows.append(row)
+            if key_positions is None:
+                row['Status'], row['Reason'] = 'SKIPPED', unkeyed_reason(key_columns)
+                continue
+            counts, table_detail, seconds = next(results)
+            row['seconds'] = round(seconds, 2)
+            if isinstance(counts, str):
+                row['Status'], row['Reason'] = 'MISMATCH', f"Row diff failed: {counts}"
+                continue
+            detail.extend(table_detail)
+            differing = counts['missing'] + counts['extra'] + counts['mismatched']
+            row.update({'sql_rows': counts['sql_rows'], 'pg_rows': counts['pg_rows'], 'matched_rows': counts['matched'],
+                        'missing_in_pg': counts['missing'], 'extra_in_pg': counts['extra'], 'mismatched_rows': counts['mismatched'],
+                        'mismatched_columns': mismatched_columns_text(counts['columns']),
+                        'Reason': (f"{differing} differing rows" + (f" (first {ROW_DIFF_SAMPLE_ROWS} differences listed)"
+                                                                 if len(table_detail) >= ROW_DIFF_SAMPLE_ROWS else ''))
+                                  if differing else 'All rows match',
+                        'Status': 'MISMATCH' if differing else 'MATCHED'})
+        for name in unknown:
+            compare_rows.append({'schema': '', 'table': name, 'Status': 'SKIPPED', 'Reason': 'Not a table present on both servers'})
+        rec['rows'] = len(compare_rows)
+    sheets = [(sheet, compare_rows, ROW_DIFF_FIELDS)]
+    if detail:
+        sheets.append((f"{sheet} Detail", detail, SAMPLE_DETAIL_FIELDS))
+    diffed = sum(1 for row in compare_rows if row['Status'] != 'SKIPPED')
+    return sheets, {sheet: {'sql': diffed, 'pg': diffed}}
+
+SEQUENCE_FIELDS = ['schema', 'table', 'column', 'SQL_type', 'SQL_increment', 'SQL_last_value', 'PG_sequence', 'PG_type',
+                   'PG_increment', 'PG_last_value', 'PG_next_value', 'PG_max_key', 'Reason', 'Status']
+
+def probe_max_keys(conn, dbtype, targets):
+    # {target: highest key or the probe's error}; a failing batch is retried one table at a time
+    cursor = conn.cursor()
+    found = {}
+    def probe(probes):
+        try:
+            cursor.execute(probe_query(probes, dbtype))
+            found.update((t, int(v) if v is not None else None) for t, v in zip(probes, cursor.fetchone()))
+            return True
+        except Exception as e:
+            if run_cancelled(conn, e):
+                raise
+            rollback_quietly(conn)
+            if len(probes) == 1:
+                found[probes[0]] = e
+            return False
+    for start in range(0, len(targets), SEQUENCE_PROBE_BATCH):
+        batch = targets[start:start + SEQUENCE_PROBE_BATCH]
+        if not probe(batch) and len(batch) > 1:
+            for target in batch:
+                probe([target])
+    return found
+
+def build_sequences_tab(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db):
+    # PG sequences against the highest key of the columns they feed and the SQL Server identities (see sequences.py)
+    with timings.phase(db, sheet, 'extract'):
+        print(f"\n[Step] Extracting identities and sequences...")
+        # Tables missing on one side are reported by the Tables tab
+        tables = base_table_keys(sql_conn, 'sql') & base_table_keys(pg_conn, 'pg')
+        sql_ids = [r for r in filter_excluded(extractor(sql_conn, 'sql')) if (r['_schema'], r['_table']) in tables]
+        pg_seqs = [r for r in filter_excluded(extractor(pg_conn, 'pg')) if (r['_schema'], r['_table']) in tables]
+    with timings.phase(db, sheet, 'extract') as rec:
+        targets = [(seq['schema'], seq['table'], seq['name'], (seq['increment'] or 1) < 0) for seq in pg_seqs]
+        print(f"Reading the highest key of {len(targets)} sequence-fed columns...")
+        max_keys = probe_max_keys(pg_conn, 'pg', targets)
+        rec['rows'] = len(targets)
+    with timings.phase(db, sheet, 'compare') as rec:
+        def match_key(r):
+            return (r['_schema'], r['_table'], r['_name'].replace('_', ''))
+        pg_index = {}
+        for seq, target in zip(pg_seqs, targets):
+            pg_index.setdefault(match_key(seq), (seq, max_keys.get(target)))
+        pairs = [(sql, pg_index.pop(match_key(sql), (None, None))) for sql in sql_ids]
+        pairs.extend((None, found) for found in pg_index.values())
+        pairs.sort(key=lambda pair: match_key(pair[0] or pair[1][0]))
+        compare_rows = []
+        for sql, (seq, max_key) in pairs:
+            base = sql or seq
+            row = {'schema': base['schema'], 'table': base['table'], 'column': base['name']}
+            if sql is not None:
+                row.update({'SQL_type': sql['datatype'], 'SQL_increment': sql['increment'],
+                            'SQL_last_value': '' if sql['last_value'] is None else sql['last_value']})
+            if seq is None:
+                row['Status'], row['Reason'] = 'MISSING in PG', 'No sequence or identity feeds this column in PostgreSQL'
+                compare_rows.append(row)
+                continue
+            row.update({'PG_sequence': seq['sequence'], 'PG_type': seq['datatype'], 'PG_increment': seq['increment'],
+                        'PG_last_value': '' if seq['last_value'] is None else seq['last_value']})
+            if isinstance(max_key, Exception):
+                row['Status'], row['Reason'] = 'MISMATCH', f"Highest key not readable: {max_key}"
+                compare_rows.append(row)
+                continue
+            row['PG_max_key'] = '' if max_key is None else max_key
+            if seq['increment'] is not None and (seq['last_value'] is not None or seq['start_value'] is not None):
+                row['PG_next_value'] = next_value(seq)
+            status, reason = compare_sequence(sql, seq, max_key)
+            if sql is None and status == 'MATCHED':
+                status, reason = 'EXTRA in PG', f"No identity in SQL Server; {reason}"
+            row['Status'], row['Reason'] = status, reason
+            compare_rows.append(row)
+        rec['rows'] = len(compare_rows)
+    return [(sheet, compare_rows, SEQUENCE_FIELDS)], {sheet: {'sql': len(sql_ids), 'pg': len(pg_seqs)}}
+
+# Tabs in workbook order: (sheet, entity_type, extractor, builder)
+ENTITY_ORDER = [
+    ('Constraints', 'constraint', extract_constraints, build_constraints_tab),
+    ('ForeignKeys', 'foreignkey', extract_foreign_keys, build_foreign_keys_tab),
+    ('Indexes', 'index', extract_indexes, build_indexes_tab),
+    ('Triggers', 'trigger', extract_triggers, build_triggers_tab),
+    ('EventTriggers', 'eventtrigger', extract_event_triggers, build_event_triggers_tab),
+    ('Procedures', 'procedure', extract_procedures, build_procedures_tab),
+    ('Tables', 'table', extract_tables, build_entity_tab),
+    ('Columns', 'column', extract_columns, build_columns_tab),
+    ('Views', 'view', extract_views, build_entity_tab),
+    ('Functions', 'function', extract_functions, build_functions_tabs),  # Also builds Trigger Functions
+    ('Types', 'type', extract_types, build_types_tab),
+    ('DataCounts', 'datacounts', extract_table_counts, build_datacounts_tab),
+    ('Definitions', 'definition', extract_definition_hashes, build_definitions_tab),
+    ('ColumnStats', 'columnstat', extract_column_stats, build_column_stats_tab),
+    ('ColumnProfiles', 'columnprofile', extract_columns, build_column_profiles_tab),
+    ('DataSample', 'datasample', extract_primary_keys, build_data_sample_tab),
+    ('RowDiff', 'rowdiff', extract_primary_keys, build_row_diff_tab),
+    ('Sequences', 'sequence', extract_sequences, build_sequences_tab),
+]
+
+# Tabs that only run when named in entities (CLI --entities) or listed in DEFAULT_OPT_IN_ENTITIES
+OPT_IN_ENTITIES = {'ForeignKeys', 'Definitions', 'ColumnProfiles', 'ColumnStats', 'DataSample', 'RowDiff', 'Sequences'}
+DEFAULT_OPT_IN_ENTITIES = []
+
+# Write a "Timings" sheet (per-phase wall time, rows, round trips, peak RSS) into each report
+WRITE_TIMINGS_SHEET = False
+
+# Write a compact SQLite sidecar of the compare rows next to each report for the in-app results viewer
+WRITE_RESULTS_DB = True
+
+class ValidationFailed(Exception):
+    # Raised by main() after all databases ran when one or more of them failed
+    def __init__(self, failures, reports, cancelled=()):
+        self.failures = failures  # {db: error message}
+        self.reports = reports    # {db: report path} for the databases that succeeded
+        self.cancelled = list(cancelled)  # databases stopped or never started because the run was cancelled
+        parts = [f"{db}: {err}" for db, err in failures.items()]
+        if self.cancelled:
+            parts.append('cancelled: ' + ', '.join(self.cancelled))
+        super().__init__('Validation failed for ' + ', '.join(parts))
+
+def apply_config(sql_server_config=None, postgres_config=None, db_list=None):
+    # Update the connection settings in place (the UI and CLI load config files at run time)
+    if sql_server_config is not None:
+        SQL_SERVER_CONFIG.clear()
+        SQL_SERVER_CONFIG.update(sql_server_config)
+    if postgres_config is not None:
+        POSTGRES_CONFIG.clear()
+        POSTGRES_CONFIG.update(postgres_config)
+    if db_list is not None:
+        DB_LIST[:] = list(db_list)
+
+def select_entities(entities=None):
+    # ENTITY_ORDER filtered by sheet name (case-insensitive); 'Trigger Functions' comes with Functions
+    if not entities:
+        return [step for step in ENTITY_ORDER if step[0] not in OPT_IN_ENTITIES or step[0] in DEFAULT_OPT_IN_ENTITIES]
+    wanted = {normalize_name(e) for e in entities}
+    if 'trigger functions' in wanted:
+        wanted.add('functions')
+    known = {normalize_name(sheet) for sheet, _, _, _ in ENTITY_ORDER} | {'trigger functions'}
+    unknown = sorted(wanted - known)
+    if unknown:
+        raise ValueError(f"Unknown entities: {', '.join(unknown)} (choose from {', '.join(sheet for sheet, _, _, _ in ENTITY_ORDER)})")
+    return [step for step in ENTITY_ORDER if normalize_name(step[0]) in wanted]
+
+def validate_database(db, timings, entities=None, cancel=None):
+    # Extract and compare every entity for one database; returns the data needed to render its report
+    # cancel: optional CancelToken; its connections are registered so in-flight statements can be stopped
+    cancel = cancel or CancelToken()
+    print(f"\n=== Processing database: {db} ===")
+    print("Connecting to SQL Server and PostgreSQL...")
+    with timings.phase(db, 'Connections', 'connect'):
+        sql_conn = timings.instrument(get_sqlserver_connection(db), db, 'sql')
+        try:
+            pg_conn = timings.instrument(get_postgres_connection(db), db, 'pg')
+        except Exception:
+            sql_conn.close()
+            raise
+    for conn in (sql_conn, pg_conn):
+        conn.cancel_token = cancel
+        cancel.register(conn)
+    sheets = []
+    summary_counts = {}
+    try:
+        for sheet, entity_type, extractor, builder in select_entities(entities):
+            cancel.check()
+            entity_sheets, entity_counts = builder(sheet, entity_type, extractor, sql_conn, pg_conn, timings, db)
+            sheets.extend(entity_sheets)
+            summary_counts.update(entity_counts)
+        # Extractors swallow per-object errors, so a statement cancelled mid-entity only shows up here
+        cancel.check()
+    finally:
+        cancel.unregister(sql_conn)
+        cancel.unregister(pg_conn)
+        for conn in (sql_conn, pg_conn):
+            forget_catalogs(conn)
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"Could not close {conn.side} connection for {db}: {e}")
+    return {'db': db, 'server': SQL_SERVER_CONFIG['server'], 'sheets': sheets, 'summary_counts': summary_counts}
+
+def summarize_result(result, timings):
+    # Overview rows of a validated database, kept on the result for the report and the fleet rollup
+    if result.get('overview_rows') is None:
+        with timings.phase(result['db'], 'Overview', 'compare'):
+            result['overview_rows'] = build_overview_rows(result['summary_counts'], {sheet: rows for sheet, rows, _ in result['sheets']})
+    return result['overview_rows']
+
+def render_report(result, reports_dir, timings, timings_sheet=False, output_format='xlsx'):
+    db = result['db']
+    if output_format not in REPORT_WRITERS:
+        raise ValueError(f"Unknown output format: {output_format!r} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    overview_rows = summarize_result(result, timings)
+    writer, extension = REPORT_WRITERS[output_format]
+    file_path = os.path.join(reports_dir, report_base_name(result['server'], db) + extension)
+    writer(result, overview_rows, file_path, timings, timings_sheet=timings_sheet)
+    if WRITE_RESULTS_DB:
+        # Report name and timings let the fleet rollup be rebuilt from sidecars alone
+        phases = timings.phases_for(db)
+        meta = {'report': os.path.basename(file_path),
+                'generated': datetime.datetime.now().isoformat(timespec='seconds'),
+                'seconds': round(sum(p['seconds'] for p in phases), 4),
+                'entity_seconds': json.dumps(entity_seconds(phases))}
+        with timings.phase(db, 'Results', 'save'):
+            write_results_db(result, overview_rows, results_db_path(file_path), order_columns, meta)
+    print(f'Validation report generated for {db} at {file_path}.')
+    return file_path
+
+# Write a fleet rollup (one row per database x entity) for runs with more than one database
+WRITE_FLEET_ROLLUP = True
+
+def fleet_rollup_path(reports_dir, server, output_format, started_at=None):
+    now_file = (started_at or datetime.datetime.now()).strftime('%Y-%m-%d_%H-%M')
+    return os.path.join(reports_dir, f"{server}_Fleet_Rollup_{now_file}" + REPORT_WRITERS[output_format][1])
+
+def write_fleet_rollup(rollup, file_path, output_format='xlsx'):
+    # Databases sheet (one row per database, linking its report) and Fleet sheet (database x entity)
+    database_rows, fleet_rows = rollup.database_rows(), rollup.fleet_rows()
+    if output_format == 'json':
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(rollup.to_dict(), f, indent=1, default=str)
+    elif output_format == 'csv':
+        import csv
+        os.makedirs(file_path, exist_ok=True)
+        for name, header, rows in (('Databases', DATABASE_COLUMNS, database_rows), ('Fleet', FLEET_COLUMNS, fleet_rows)):
+            with open(os.path.join(file_path, f"{name}.csv"), 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+    else:
+        from openpyxl.formatting.rule import CellIsRule
+        from openpyxl.styles import Font, PatternFill
+        from openpyxl.utils import get_column_letter
+        wb = new_workbook()
+        link_font = Font(color='0563C1', underline='single')
+        for name, header, rows in (('Databases', DATABASE_COLUMNS, database_rows), ('Fleet', FLEET_COLUMNS, fleet_rows)):
+            ws = wb.create_sheet(name)
+            set_column_widths(ws, column_widths(chain([header], rows), len(header)))
+            ws.append([styled_cell(ws, col, font=Font(bold=True)) for col in header])
+            report_idx = header.index('Report') if 'Report' in header else None
+            for row in rows:
+                row = list(row)
+                if report_idx is not None and row[report_idx]:
+                    row[report_idx] = styled_cell(ws, hyperlink_formula(row[report_idx], row[report_idx]), font=link_font)
+                ws.append(row)
+            if rows:
+                add_sheet_table(wb, ws, f"Tbl_Fleet_{name}", f"A1:{get_column_letter(len(header))}{len(rows) + 1}", header)
+                status_col = get_column_letter(header.index('Status') + 1)
+                status_range = f"{status_col}2:{status_col}{len(rows) + 1}"
+                ws.conditional_formatting.add(status_range, CellIsRule(operator='equal', formula=['"Passed"'],
+                    fill=PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')))  # Green
+                ws.conditional_formatting.add(status_range, CellIsRule(operator='notEqual', formula=['"Passed"'],
+                    fill=PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')))  # Red
         wb.save(file_path)
-        print(f'Validation Excel generated for {db} at {file_path}.')
+    print(f"Fleet rollup for {len(rollup)} database(s) written to {file_path}")
+    return file_path
+
+def rebuild_fleet_rollup(reports_dir=None, db_list=None, output_format='xlsx'):
+    # Fleet rollup from the results sidecars already in reports_dir (no database access)
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SchemaValidationReports')
+    rollup = rollup_from_results(reports_dir, db_list)
+    if not len(rollup):
+        raise ValueError(f"No results files ({RESULTS_DB_SUFFIX}) found in {reports_dir}")
+    return write_fleet_rollup(rollup, fleet_rollup_path(reports_dir, rollup.server, output_format), output_format)
+
+# Render reports in the background while the next database is extracted:
+# 'process' (a spawned render process, so rendering gets its own CPU), 'thread'
+# (same process; overlaps rendering with network waits only) or 'inline' (render
+# before moving on). Runs with one database, profiling, or spooled compare rows
+# (STREAM_COLUMN_COMPARE, 'process' mode only) render inline.
+BACKGROUND_RENDER = 'process'
+RENDER_MODES = ('process', 'thread', 'inline')
+
+# Extracted databases that may wait for or be in rendering at once; the main loop
+# blocks before handing over another one, which bounds the results held in memory
+RENDER_SLOTS = 1
+
+def render_settings():
+    # Module settings a spawned render process must share with this one
+    return {'WRITE_RESULTS_DB': WRITE_RESULTS_DB, 'MAX_SHEET_ROWS': MAX_SHEET_ROWS, 'SPLIT_LARGE_ENTITIES': SPLIT_LARGE_ENTITIES}
+
+def render_worker(result, reports_dir, timings_sheet, output_format, phases, settings):
+    # Runs in a render process: renders one report and returns (report path, phase records of the rendering).
+    # phases are the database's extract/compare records, needed for the Timings sheet.
+    globals().update(settings)
+    timings = RunTimings()
+    timings.phases.extend(phases)
+    file_path = render_report(result, reports_dir, timings, timings_sheet=timings_sheet, output_format=output_format)
+    return file_path, timings.phases[len(phases):]
+
+class BackgroundRenderer:
+    # Hands extracted results to a render pool; on_done(db, report path, error) is
+    # called from the pool when each report is written (or failed)
+    def __init__(self, mode, timings, reports_dir, timings_sheet, output_format, on_done, slots=None):
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        self.mode = mode
+        self.timings = timings
+        self.reports_dir = reports_dir
+        self.timings_sheet = timings_sheet
+        self.output_format = output_format
+        self.on_done = on_done
+        slots = slots or RENDER_SLOTS
+        self._slots = threading.BoundedSemaphore(slots)
+        if mode == 'process':
+            import multiprocessing
+            self.pool = ProcessPoolExecutor(max_workers=slots, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=slots, thread_name_prefix='render')
+
+    def _render_here(self, result):
+        try:
+            return render_report(result, self.reports_dir, self.timings, timings_sheet=self.timings_sheet, output_format=self.output_format)
+        finally:
+            close_result(result)
+
+    def submit(self, result):
+        db = result['db']
+        spooled = any(isinstance(rows, RowSpool) for _, rows, _ in result['sheets'])
+        if self.mode == 'process' and spooled:
+            # Spool files belong to this process; render before moving on
+            try:
+                file_path = self._render_here(result)
+            except Exception as e:
+                self.on_done(db, None, e)
+            else:
+                self.on_done(db, file_path, None)
+            return
+        self._slots.acquire()
+        try:
+            if self.mode == 'process':
+                future = self.pool.submit(render_worker, result, self.reports_dir, self.timings_sheet, self.output_format,
+                                          self.timings.phases_for(db), render_settings())
+            else:
+                future = self.pool.submit(self._render_here, result)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._finished(db, f))
+
+    def _finished(self, db, future):
+        self._slots.release()
+        try:
+            if self.mode == 'process':
+                file_path, phases = future.result()
+                self.timings.add_phases(phases)
+            else:
+                file_path = future.result()
+        except Exception as e:
+            self.on_done(db, None, e)
+        else:
+            self.on_done(db, file_path, None)
+
+    def close(self):
+        # Wait for every report handed over so far
+        self.pool.shutdown(wait=True)
+
+def close_result(result):
+    # Remove the temporary files of spooled compare rows once the report is written
+    for _, compare_rows, _ in result['sheets']:
+        if isinstance(compare_rows, RowSpool):
+            compare_rows.close()
+
+# --- Main ---
+def main(db_list=None, timings_sheet=None, profile=None, entities=None, output_format='xlsx', jobs=1, reports_dir=None, progress=None, cancel=None, render=None):
+    # Use DB_LIST from config.py for database list
+    db_list = DB_LIST if db_list is None else db_list
+    timings_sheet = WRITE_TIMINGS_SHEET if timings_sheet is None else timings_sheet
+    render = render or BACKGROUND_RENDER
+    if render not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {render!r} (expected one of {', '.join(RENDER_MODES)})")
+    select_entities(entities)  # Fail fast on unknown entity names
+    if reports_dir is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        reports_dir = os.path.join(script_dir, 'SchemaValidationReports')
+    os.makedirs(reports_dir, exist_ok=True)
+    timings = RunTimings()
+    # Optional cProfile/tracemalloc hooks; output files go next to the reports
+    profiler = RunProfiler(profile, reports_dir, SQL_SERVER_CONFIG['server'], timings)
+    if jobs > 1 and profiler.memory:
+        print("Memory profiling traces the whole process; running databases one at a time.")
+        jobs = 1
+    # Live progress events for the UI (progress is a queue with put(), or None)
+    publisher = ProgressPublisher(progress)
+    timings.add_listener(publisher.phase_finished)
+    # Cancel action (UI); completed reports are kept, remaining databases are skipped
+    cancel = cancel or CancelToken()
+    reports = {}
+    failures = {}
+    cancelled = []
+    # One row per database x entity across the run, filled in as each database finishes
+    rollup = FleetRollup(SQL_SERVER_CONFIG['server']) if WRITE_FLEET_ROLLUP and len(db_list) > 1 else None
+    overviews = {}
+    def database_rendered(db, file_path, error=None):
+        if error is not None:
+            import traceback
+            traceback.print_exception(type(error), error, error.__traceback__)
+            print(f"Validation failed for {db}: {error}")
+            failures[db] = str(error)
+            if rollup is not None:
+                rollup.add_error(db, error)
+            publisher.database_failed(db, error)
+            return
+        reports[db] = file_path
+        print(f"Timings for {db}: {timings.summary(db)}")
+        if rollup is not None:
+            phases = timings.phases_for(db)
+            rollup.add_database(db, overviews.pop(db, []), entity_seconds(phases),
+                                round(sum(p['seconds'] for p in phases), 4), os.path.basename(file_path))
+        publisher.database_finished(db, file_path)
+    # Background rendering overlaps one database's report with the next one's extraction
+    renderer = None
+    if render != 'inline' and len(db_list) > 1 and not (profiler.cpu or profiler.memory):
+        import multiprocessing
+        if render == 'process' and multiprocessing.current_process().daemon:
+            render = 'thread'  # The UI's worker process is daemonic and cannot start render processes
+        renderer = BackgroundRenderer(render, timings, reports_dir, timings_sheet, output_format, database_rendered)
+    def run_database(db):
+        if cancel.cancelled:
+            cancelled.append(db)
+            if rollup is not None:
+                rollup.add_error(db, None, 'Cancelled')
+            publisher.database_cancelled(db)
+            return
+        publisher.database_started(db)
+        try:
+            with profiler.database(db):
+                result = validate_database(db, timings, entities, cancel)
+                overviews[db] = summarize_result(result, timings)
+                if renderer is not None:
+                    renderer.submit(result)
+                    return
+                try:
+                    file_path = render_report(result, reports_dir, timings, timings_sheet=timings_sheet, output_format=output_format)
+                finally:
+                    close_result(result)
+            database_rendered(db, file_path)
+        except Exception as e:
+            if cancel.cancelled:
+                # RunCancelled, or the driver error raised by the cancelled statement
+                print(f"Validation cancelled for {db}")
+                cancelled.append(db)
+                if rollup is not None:
+                    rollup.add_error(db, None, 'Cancelled')
+                publisher.database_cancelled(db)
+                return
+            import traceback
+            traceback.print_exc()
+            print(f"Validation failed for {db}: {e}")
+            failures[db] = str(e)
+            if rollup is not None:
+                rollup.add_error(db, e)
+            publisher.database_failed(db, e)
+    try:
+        if jobs > 1 and len(db_list) > 1:
+            # Databases are independent; extraction is network-bound so threads overlap well
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                list(pool.map(run_database, db_list))
+        else:
+            for db in db_list:
+                run_database(db)
+    finally:
+        if renderer is not None:
+            renderer.close()
+        if rollup is not None and len(rollup):
+            try:
+                write_fleet_rollup(rollup, fleet_rollup_path(reports_dir, rollup.server, output_format, timings.started_at), output_format)
+            except Exception as e:
+                print(f"Fleet rollup could not be written: {e}")
+        # JSON run log with every phase and query of this run
+        now_file = timings.started_at.strftime('%Y-%m-%d_%H-%M')
+        log_path = os.path.join(reports_dir, f"{SQL_SERVER_CONFIG['server']}_Run_Log_{now_file}.json")
+        timings.write_json(log_path)
+        print(f"Run log written to {log_path}")
+        publisher.run_finished(reports, failures, cancelled)
+    if failures or cancelled:
+        raise ValidationFailed(failures, reports, cancelled)
+    return {'reports': reports, 'timings': timings}
+
+def run_worker(conn, cancel_event, sql_server_config, postgres_config, db_list):
+    # Entry point of the UI's worker process: progress events and the final
+    # run_finished/run_failed event go back to the UI over conn (a Pipe end).
+    # cancel_event (multiprocessing.Event) is set by the UI's Cancel button.
+    import threading
+    from progress import PipeProgress
+    progress = PipeProgress(conn)
+    cancel = CancelToken()
+    done = threading.Event()
+    def watch_cancel():
+        while not done.is_set():
+            if cancel_event.wait(0.2):
+                print('Cancel requested; stopping running statements...')
+                cancel.cancel()
+                return
+    threading.Thread(target=watch_cancel, daemon=True).start()
+    try:
+        apply_config(sql_server_config, postgres_config, db_list)
+        main(progress=progress, cancel=cancel)
+    except ValidationFailed:
+        pass  # Per-database failures and run_finished were already published
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        progress.put({'kind': 'run_failed', 'error': str(e)})
+    finally:
+        done.set()
+        conn.close()
+
 if __name__ == '__main__':
-    main()
+    # Same options as SchemaValidatorCLI.py; connection settings default to config.py
+    import sys
+    from SchemaValidatorCLI import cli_main
+    sys.exit(cli_main())
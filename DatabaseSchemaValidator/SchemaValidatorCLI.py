@@ -0,0 +1,118 @@
+# SchemaValidatorCLI.py
+
+# Headless entry point for scheduled (cron/CI) runs. Nothing heavy is imported at
+# startup: database drivers and report writers (openpyxl) are imported only when
+# they are used, and neither tkinter nor Pillow is needed.
+#
+#   python SchemaValidatorCLI.py --db Sales --db HR --entities Tables,Columns --output-format csv --jobs 4
+#   python SchemaValidatorCLI.py --config nightly_config.py --output-dir /var/reports
+#   python SchemaValidatorCLI.py --rollup --output-dir /var/reports   (fleet rollup from existing results)
+#   python SchemaValidatorCLI.py --db Sales --entities DataCounts --row-diff dbo.Orders,dbo.OrderLines
+import os
+import sys
+import argparse
+
+def split_list(values):
+    # --db a --db b,c -> ['a', 'b', 'c']
+    items = []
+    for value in values or []:
+        items.extend(v.strip() for v in value.split(',') if v.strip())
+    return items
+
+def load_config_file(path):
+    # Python (same layout as config.py) or JSON file with SQL_SERVER_CONFIG, POSTGRES_CONFIG and DB_LIST
+    if path.lower().endswith('.json'):
+        import json
+        with open(path, encoding='utf-8') as f:
+            values = json.load(f)
+    else:
+        import runpy
+        values = runpy.run_path(path)
+    return {key: values.get(key) for key in ('SQL_SERVER_CONFIG', 'POSTGRES_CONFIG', 'DB_LIST')}
+
+def build_parser():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from SchemaValidatior import OUTPUT_FORMATS, RENDER_MODES
+    from profiling import PROFILE_MODES
+    parser = argparse.ArgumentParser(
+        prog='SchemaValidatorCLI.py',
+        description='Validate SQL Server schemas against PostgreSQL without the UI.')
+    parser.add_argument('--config', metavar='FILE', help='Connection settings file (.py like config.py, or .json); default: config.py')
+    parser.add_argument('--db', action='append', metavar='NAME', help='Database to validate (repeatable or comma separated); default: DB_LIST')
+    parser.add_argument('--entities', action='append', metavar='LIST', help='Only these tabs, e.g. Tables,Columns,DataCounts (default: all but the opt-in tabs)')
+    parser.add_argument('--list-entities', action='store_true', help='List entity names and exit')
+    parser.add_argument('--row-diff', action='append', metavar='TABLES', help='Diff these tables row by row (schema.table, repeatable or comma separated); adds the RowDiff tab')
+    parser.add_argument('--rollup', action='store_true', help='Rebuild the fleet rollup from the results files in the output folder (no database access) and exit')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='xlsx', help='Report format (default: xlsx)')
+    parser.add_argument('--output-dir', metavar='DIR', help='Report folder (default: SchemaValidationReports)')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N', help='Databases validated in parallel (default: 1)')
+    parser.add_argument('--render', choices=RENDER_MODES, help='Where reports are rendered while the next database is extracted (default: process)')
+    parser.add_argument('--timings-sheet', action='store_true', help='Add per-phase timings next to the Overview')
+    parser.add_argument('--profile', choices=PROFILE_MODES, help='cpu (cProfile .pstats), memory (tracemalloc summaries) or all')
+    capture = parser.add_mutually_exclusive_group()
+    capture.add_argument('--record', metavar='DIR', help='Record every query and result set to DIR (see dbreplay.py)')
+    capture.add_argument('--replay', metavar='DIR', help='Serve queries from captures in DIR instead of live databases')
+    parser.add_argument('--replay-latency-ms', type=float, default=None, metavar='MS', help='Latency injected per replayed round trip')
+    return parser
+
+def cli_main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    import SchemaValidatior
+    if args.list_entities:
+        for sheet, _, _, _ in SchemaValidatior.ENTITY_ORDER:
+            print(sheet + (' (opt-in)' if sheet in SchemaValidatior.OPT_IN_ENTITIES else ''))
+        return 0
+    if args.config:
+        try:
+            SchemaValidatior.apply_config(**{k.lower(): v for k, v in load_config_file(args.config).items()})
+        except (OSError, SyntaxError, ValueError) as e:
+            parser.error(f"Could not load config file {args.config}: {e}")
+    if args.record or args.replay:
+        import dbreplay
+        dbreplay.configure('record' if args.record else 'replay', args.record or args.replay, args.replay_latency_ms)
+    if args.rollup:
+        try:
+            SchemaValidatior.rebuild_fleet_rollup(args.output_dir, split_list(args.db), args.output_format)
+        except (OSError, ValueError) as e:
+            print(f"Fleet rollup failed: {e}", file=sys.stderr)
+            return 1
+        return 0
+    entities = split_list(args.entities)
+    row_diff_tables = split_list(args.row_diff)
+    if row_diff_tables:
+        SchemaValidatior.ROW_DIFF_TABLES = row_diff_tables
+        if entities:
+            entities.append('RowDiff')
+        else:
+            SchemaValidatior.DEFAULT_OPT_IN_ENTITIES = list(SchemaValidatior.DEFAULT_OPT_IN_ENTITIES) + ['RowDiff']
+    try:
+        SchemaValidatior.select_entities(entities)
+    except ValueError as e:
+        parser.error(str(e))
+    db_list = split_list(args.db) or list(SchemaValidatior.DB_LIST)
+    if not db_list:
+        parser.error('No databases to validate: pass --db or set DB_LIST in the config file')
+    try:
+        run = SchemaValidatior.main(
+            db_list=db_list,
+            timings_sheet=args.timings_sheet or None,
+            profile=args.profile,
+            entities=entities,
+            output_format=args.output_format,
+            jobs=args.jobs,
+            reports_dir=args.output_dir,
+            render=args.render,
+        )
+    except SchemaValidatior.ValidationFailed as e:
+        print(f"\n{len(e.failures)} of {len(db_list)} database(s) failed:", file=sys.stderr)
+        for db, err in e.failures.items():
+            print(f"  {db}: {err}", file=sys.stderr)
+        return 1
+    print(f"\n{len(run['reports'])} report(s) written.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(cli_main())
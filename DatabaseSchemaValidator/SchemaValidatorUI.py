@@ -1,10 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
+import multiprocessing
+import heapq
+import time
 import importlib
 import os
-import glob
 from PIL import Image, ImageTk
+from results_store import RESULTS_DB_SUFFIX, ResultsStore, results_db_path
 
 # Try to load a true black theme (fallback to azure-dark if not found)
 def try_load_theme(root):
@@ -30,31 +33,121 @@ def import_config():
     spec.loader.exec_module(config)
     return config
 
-def run_validation():
-    import importlib.util
-    import sys
-    script_path = os.path.join(os.path.dirname(__file__), 'SchemaValidatior.py')
-    spec = importlib.util.spec_from_file_location('SchemaValidatior', script_path)
-    module = importlib.util.module_from_spec(spec)
-    sys.modules['SchemaValidatior'] = module
-    spec.loader.exec_module(module)
-    module.main()
-
-def find_latest_reports():
-    reports_dir = os.path.join(os.path.dirname(__file__), 'SchemaValidationReports')
-    if not os.path.exists(reports_dir):
-        return []
-    files = glob.glob(os.path.join(reports_dir, '*.xlsx'))
-    files.sort(key=os.path.getmtime, reverse=True)
-    return files[:10]
+def start_validation_process(config):
+    # Run the validator in a child process so CPU-bound comparison and report
+    # writing never hold the Tk process's GIL, and a driver or openpyxl crash
+    # cannot take the window down. Returns (process, connection to read events
+    # from, event to set to cancel the run).
+    from SchemaValidatior import run_worker
+    ctx = multiprocessing.get_context('spawn')
+    recv_conn, send_conn = ctx.Pipe(duplex=False)
+    cancel_event = ctx.Event()
+    process = ctx.Process(target=run_worker, args=(send_conn, cancel_event, config.SQL_SERVER_CONFIG, config.POSTGRES_CONFIG, config.DB_LIST), daemon=True)
+    process.start()
+    send_conn.close()  # The child holds the only write end, so EOF means it is gone
+    return process, recv_conn, cancel_event
 
-def load_icon(name, size=(32, 32)):
-    path = os.path.join(os.path.dirname(__file__), 'assets', name)
+REPORTS_DIR = os.path.join(os.path.dirname(__file__), 'SchemaValidationReports')
+RECENT_REPORTS = 8
+REPORTS_POLL_SECONDS = 2.0  # Background check of the reports folder's mtime
+REPORTS_REDRAW_MS = 500     # How often the Tk loop picks up index changes
+
+def scan_reports(reports_dir=REPORTS_DIR, suffixes=('.xlsx',)):
+    # {path: mtime} of every report file; one scandir pass, no per-file stat calls on Windows
     try:
-        img = Image.open(path).resize(size, Image.LANCZOS)
-        return ImageTk.PhotoImage(img)
-    except Exception:
-        return None
+        with os.scandir(reports_dir) as entries:
+            return {e.path: e.stat().st_mtime for e in entries if e.name.lower().endswith(suffixes) and e.is_file()}
+    except OSError:
+        return {}
+
+def find_latest_reports(n=10):
+    reports = scan_reports()
+    return heapq.nlargest(n, reports, key=reports.get)
+
+class ReportIndex:
+    # Recent reports kept up to date by a background thread that only rescans
+    # the folder when its mtime changes (a report was added, replaced or removed).
+    # The Tk thread reads latest()/version and never touches the filesystem.
+    def __init__(self, reports_dir=REPORTS_DIR, poll_seconds=REPORTS_POLL_SECONDS):
+        self.reports_dir = reports_dir
+        self.poll_seconds = poll_seconds
+        self.version = 0
+        self._reports = {}
+        self._results = set()  # results viewer sidecars present in the folder
+        self._dir_mtime = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_refresh(self):
+        # Rescan on the next wake-up even if the folder mtime looks unchanged
+        self._dir_mtime = None
+        self._wake.set()
+
+    def forget(self, path):
+        with self._lock:
+            if self._reports.pop(path, None) is not None:
+                self.version += 1
+
+    def latest(self, n=RECENT_REPORTS):
+        with self._lock:
+            return heapq.nlargest(n, self._reports, key=self._reports.get)
+
+    def results_for(self, report_path):
+        # Sidecar path for the results viewer, or None if the run did not write one
+        path = results_db_path(report_path)
+        with self._lock:
+            return path if path in self._results else None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                mtime = os.stat(self.reports_dir).st_mtime
+            except OSError:
+                mtime = -1
+            if mtime != self._dir_mtime:
+                self._dir_mtime = mtime
+                files = scan_reports(self.reports_dir, ('.xlsx', RESULTS_DB_SUFFIX))
+                reports = {p: m for p, m in files.items() if p.lower().endswith('.xlsx')}
+                results = set(files) - set(reports)
+                with self._lock:
+                    if reports != self._reports or results != self._results:
+                        self._reports = reports
+                        self._results = results
+                        self.version += 1
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+# Decoded once per process: PhotoImages are cached by file and size
+_icon_cache = {}
+
+def load_icon(name, size=(32, 32)):
+    key = (name, size)
+    if key not in _icon_cache:
+        path = os.path.join(os.path.dirname(__file__), 'assets', name)
+        try:
+            img = Image.open(path).resize(size, Image.LANCZOS)
+            _icon_cache[key] = ImageTk.PhotoImage(img)
+        except Exception:
+            _icon_cache[key] = None
+    return _icon_cache[key]
+
+# Results viewer
+RESULTS_PAGE_SIZE = 500
+ALL_STATUSES = 'All'
+
+# Live progress table
+PROGRESS_COLUMNS = ('Database', 'Status', 'Current Step', 'Rows', 'Elapsed')
+PROGRESS_POLL_MS = 100
 
 class ConfigUI(ttk.Frame):
     def __init__(self, parent):
@@ -165,8 +258,11 @@ class ValidationUI(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent, style='Black.TFrame')
         self.parent = parent
-        self.validation_thread = None
+        self.validation_process = None
         self.validation_in_progress = False
+        self.progress_conn = None
+        self.cancel_event = None
+        self.progress_rows = {}  # db -> {'status', 'step', 'rows', 'start', 'elapsed'}
         self.icons = {
             'check': '\u2714',  # Unicode checkmark
             'excel': load_icon('excel.png', size=(28, 28)),
@@ -202,6 +298,9 @@ class ValidationUI(ttk.Frame):
         if self.icons.get('excel'):
             self.validate_btn.config(image=self.icons['excel'])
         self.validate_btn.pack(pady=(10, 4))
+        # Cancel: stops new work and cancels running statements; finished reports are kept
+        self.cancel_btn = tk.Button(top_frame, text='Cancel', font=(None, 10, 'bold'), fg='#fff', bg='#888', activebackground='#aaa',
+                                    relief='flat', padx=12, pady=2, bd=0, cursor='hand2', command=self.cancel_validation)
         self.status_var = tk.StringVar(value='')
         self.status_label = tk.Label(top_frame, textvariable=self.status_var, fg='#8c6916', bg='#2d2d2d', font=(None, 12, 'bold'))
         self.status_label.pack(pady=(2, 6))
@@ -211,6 +310,16 @@ class ValidationUI(ttk.Frame):
         # Lower section: results/messages/reports
         lower_frame = tk.Frame(outer, bg='#2e2d2d')
         lower_frame.grid(row=1, column=0, sticky='nsew')
+        # Live per-database progress table (filled from progress events while a run is going)
+        style = ttk.Style()
+        style.configure('Progress.Treeview', background='#383838', fieldbackground='#383838', foreground='#fff', rowheight=20, borderwidth=0)
+        style.configure('Progress.Treeview.Heading', background='#2e2d2d', foreground='#bbb', font=(None, 9, 'bold'))
+        self.progress_table = ttk.Treeview(lower_frame, columns=PROGRESS_COLUMNS, show='headings', height=4, style='Progress.Treeview')
+        for col, width in zip(PROGRESS_COLUMNS, (130, 70, 170, 70, 70)):
+            self.progress_table.heading(col, text=col)
+            self.progress_table.column(col, width=width, anchor='w' if col in ('Database', 'Current Step') else 'center')
+        self.progress_table.tag_configure('failed', foreground='#ff4444')
+        self.progress_table.tag_configure('done', foreground='#4caf50')
         self.db_results_frame = tk.Frame(lower_frame, bg='#2e2d2d')
         self.db_results_frame.pack(fill='both', expand=True)
 
@@ -221,12 +330,115 @@ class ValidationUI(ttk.Frame):
         self.validate_btn.config(state='disabled')
         for widget in self.db_results_frame.winfo_children():
             widget.destroy()
+        self._reset_progress_table(getattr(self.config, 'DB_LIST', []))
         # Show spinner
         self.spinner_running = True
         self._animate_spinner()
-        t = threading.Thread(target=self._run_validation)
-        t.start()
-        self.validation_thread = t
+        try:
+            self.validation_process, self.progress_conn, self.cancel_event = start_validation_process(self.config)
+        except Exception as e:
+            self._show_db_results([(db, False, str(e)) for db in getattr(self.config, 'DB_LIST', [])])
+            return
+        self.cancel_btn.config(state='normal', text='Cancel')
+        self.cancel_btn.pack(pady=(0, 4), after=self.validate_btn)
+        self.after(PROGRESS_POLL_MS, self._poll_progress)
+
+    def cancel_validation(self):
+        if self.cancel_event is None:
+            return
+        self.cancel_event.set()
+        self.cancel_btn.config(state='disabled', text='Cancelling...')
+        self.status_var.set('Cancelling: stopping running queries')
+        for db, row in self.progress_rows.items():
+            if row['status'] == 'Queued':
+                row.update(status='Cancelled')
+                self._update_progress_row(db)
+
+    def _reset_progress_table(self, db_list):
+        self.progress_table.delete(*self.progress_table.get_children())
+        self.progress_rows = {}
+        for db in db_list:
+            self.progress_rows[db] = {'status': 'Queued', 'step': '', 'rows': 0, 'start': None, 'elapsed': None}
+            self.progress_table.insert('', 'end', iid=db, values=(db, 'Queued', '', '', ''))
+        self.progress_table.configure(height=max(1, min(len(db_list), 8)))
+        self.progress_table.pack(fill='x', padx=6, pady=(0, 6), before=self.db_results_frame)
+
+    def _update_progress_row(self, db):
+        row = self.progress_rows[db]
+        elapsed = row['elapsed']
+        if elapsed is None and row['start'] is not None:
+            elapsed = time.monotonic() - row['start']
+        elapsed_text = time.strftime('%H:%M:%S', time.gmtime(elapsed)) if elapsed is not None else ''
+        tags = ('failed',) if row['status'] == 'Failed' else ('done',) if row['status'] == 'Done' else ()
+        self.progress_table.item(db, values=(db, row['status'], row['step'], f"{row['rows']:,}", elapsed_text), tags=tags)
+
+    def _apply_progress_event(self, event):
+        db = event.get('db')
+        if db is not None and db not in self.progress_rows:
+            self.progress_rows[db] = {'status': 'Queued', 'step': '', 'rows': 0, 'start': None, 'elapsed': None}
+            self.progress_table.insert('', 'end', iid=db, values=(db, 'Queued', '', '', ''))
+        row = self.progress_rows.get(db)
+        kind = event['kind']
+        if kind == 'database_started':
+            row.update(status='Running', step='Connecting', start=time.monotonic())
+        elif kind == 'phase_finished':
+            row['rows'] += event.get('rows_fetched') or 0
+            verb = {'extract': 'extracted', 'compare': 'compared', 'write': 'written', 'save': 'saved'}.get(event['phase'], event['phase'])
+            row['step'] = f"{event['entity']} {verb}"
+            if event['phase'] == 'extract' and event.get('rows') is not None:
+                row['step'] += f" ({event['rows']:,})"
+        elif kind == 'database_finished':
+            row.update(status='Done', step='Report saved', elapsed=event.get('seconds'))
+        elif kind == 'database_failed':
+            row.update(status='Failed', step=event.get('error', '')[:80], elapsed=event.get('seconds'))
+        elif kind == 'database_cancelled':
+            row.update(status='Cancelled', step='Cancelled' if row['start'] is not None else '', elapsed=event.get('seconds'))
+        if row is not None:
+            self._update_progress_row(db)
+
+    def _poll_progress(self):
+        # Drain progress events sent by the worker process without blocking the Tk loop
+        finished = None
+        try:
+            while finished is None and self.progress_conn.poll():
+                event = self.progress_conn.recv()
+                if event['kind'] in ('run_finished', 'run_failed'):
+                    finished = event
+                else:
+                    self._apply_progress_event(event)
+        except (EOFError, OSError):
+            # Pipe closed without a final event: the worker process died
+            self.validation_process.join(timeout=1)
+            finished = {'kind': 'run_failed', 'error': f'Validation process exited unexpectedly (exit code {self.validation_process.exitcode})'}
+        for db, row in self.progress_rows.items():
+            if row['status'] == 'Running':
+                self._update_progress_row(db)
+        if finished is None:
+            self.after(PROGRESS_POLL_MS, self._poll_progress)
+            return
+        db_list = list(self.progress_rows)
+        if finished['kind'] == 'run_failed':
+            # Failed before or outside the per-database loop (config, import, process crash)
+            db_results = [(db, self.progress_rows[db]['status'] == 'Done', '' if self.progress_rows[db]['status'] == 'Done' else finished['error']) for db in db_list]
+            for db in db_list:
+                if self.progress_rows[db]['status'] not in ('Done', 'Failed', 'Cancelled'):
+                    self.progress_rows[db].update(status='Failed', step=finished['error'][:80])
+                    self._update_progress_row(db)
+        else:
+            failures = finished['failures']
+            # Cancelled databases are neither a success nor an error message
+            db_results = [(db, db in finished['reports'], f"{db}: {failures[db]}" if db in failures else '') for db in db_list]
+        self.progress_conn.close()
+        self.progress_conn = None
+        self.validation_process.join(timeout=5)
+        self.validation_process = None
+        was_cancelled = self.cancel_event.is_set()
+        self.cancel_event = None
+        self.cancel_btn.pack_forget()
+        self._show_db_results(db_results)
+        if was_cancelled:
+            self.status_var.set('Validation cancelled')
+            self.status_label.configure(fg='#8c6916')
 
     def _animate_spinner(self):
         # Simple text-based spinner animation
@@ -240,17 +452,6 @@ class ValidationUI(ttk.Frame):
         self._spinner_index = (self._spinner_index + 1) % len(spinner_chars)
         self.after(120, self._animate_spinner)
 
-    def _run_validation(self):
-        # Only run validation once for all databases
-        try:
-            run_validation()
-            db_list = getattr(self.config, 'DB_LIST', [])
-            db_results = [(db, True, '') for db in db_list]
-        except Exception as e:
-            db_list = getattr(self.config, 'DB_LIST', [])
-            db_results = [(db, False, str(e)) for db in db_list]
-        self.after(0, lambda: self._show_db_results(db_results))
-
     def _show_db_results(self, db_results):
         # Clear previous results/messages
         for widget in self.db_results_frame.winfo_children():
@@ -277,9 +478,9 @@ class ValidationUI(ttk.Frame):
             frame.pack(anchor='center')
             # Remove success message after 10 seconds
             self.after(10000, lambda: frame.destroy())
-        # Refresh reports with a short delay to ensure file is written
+        # Ask the report index to rescan now rather than on its next poll
         if success_dbs:
-            self.after(1000, lambda: getattr(self.winfo_toplevel(), 'refresh_reports', lambda: None)())
+            getattr(self.winfo_toplevel(), 'refresh_reports', lambda: None)()
         # Show error message with copy button if error(s) exist
         if error_msgs:
             self.error_area = tk.Frame(self.db_results_frame, bg='#2e2d2d', height=40)
@@ -315,9 +516,121 @@ class ValidationUI(ttk.Frame):
             self.status_var.set('')
             self.status_label.configure(fg='#fff')
             self.validate_btn.config(state='normal')
-        # Add a short delay before refreshing recent reports to ensure file is written
-        if success_dbs:
-            self.after(700, lambda: hasattr(self.parent.master, 'refresh_reports') and self.parent.master.refresh_reports())
+
+class ResultsViewer(tk.Toplevel):
+    # Browse a report's compare rows from its SQLite sidecar. The Treeview holds
+    # only the pages scrolled into so far; the next page is fetched when the
+    # view nears the bottom, so opening a 500k-row sheet costs one page.
+    def __init__(self, parent, results_path):
+        super().__init__(parent)
+        self.configure(bg='#2d2d2d')
+        self.geometry('1000x560')
+        self.store = ResultsStore(results_path)
+        meta = self.store.meta()
+        self.title(f"Results - {meta.get('db', '')} ({os.path.basename(results_path)})")
+        self.sheets = {sheet: (columns, total) for sheet, columns, total in self.store.sheets()}
+        self.last_id = 0
+        self.exhausted = True
+        self._search_job = None
+        self.create_widgets()
+        self.protocol('WM_DELETE_WINDOW', self.close)
+        if self.sheets:
+            self.sheet_var.set(self._sheet_label(next(iter(self.sheets))))
+            self.on_sheet_change()
+
+    def _sheet_label(self, sheet):
+        return f"{sheet} ({self.sheets[sheet][1]:,})"
+
+    def create_widgets(self):
+        bar = tk.Frame(self, bg='#2d2d2d')
+        bar.pack(fill='x', padx=10, pady=8)
+        tk.Label(bar, text='Entity', fg='#bbb', bg='#2d2d2d', font=(None, 10, 'bold')).pack(side='left')
+        self.sheet_var = tk.StringVar()
+        self.sheet_labels = {self._sheet_label(sheet): sheet for sheet in self.sheets}
+        sheet_box = ttk.Combobox(bar, textvariable=self.sheet_var, values=list(self.sheet_labels), state='readonly', width=26)
+        sheet_box.pack(side='left', padx=(4, 12))
+        sheet_box.bind('<<ComboboxSelected>>', lambda e: self.on_sheet_change())
+        tk.Label(bar, text='Status', fg='#bbb', bg='#2d2d2d', font=(None, 10, 'bold')).pack(side='left')
+        self.status_var = tk.StringVar(value=ALL_STATUSES)
+        self.status_box = ttk.Combobox(bar, textvariable=self.status_var, state='readonly', width=28)
+        self.status_box.pack(side='left', padx=(4, 12))
+        self.status_box.bind('<<ComboboxSelected>>', lambda e: self.reload())
+        tk.Label(bar, text='Search name', fg='#bbb', bg='#2d2d2d', font=(None, 10, 'bold')).pack(side='left')
+        self.search_var = tk.StringVar()
+        tk.Entry(bar, textvariable=self.search_var, width=24, fg='#fff', bg='#383838', insertbackground='#fff',
+                 highlightbackground='#4a3d0e', highlightcolor='#4a3d0e', highlightthickness=1, relief='flat').pack(side='left', padx=4)
+        self.search_var.trace_add('write', lambda *args: self._schedule_search())
+        self.count_var = tk.StringVar(value='')
+        tk.Label(bar, textvariable=self.count_var, fg='#bbb', bg='#2d2d2d', font=(None, 9)).pack(side='right')
+        table_frame = tk.Frame(self, bg='#2d2d2d')
+        table_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        self.tree = ttk.Treeview(table_frame, show='headings', style='Progress.Treeview')
+        yscroll = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
+        xscroll = ttk.Scrollbar(table_frame, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(yscrollcommand=lambda first, last: (yscroll.set(first, last), self._maybe_load_more(last)),
+                            xscrollcommand=xscroll.set)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        yscroll.grid(row=0, column=1, sticky='ns')
+        xscroll.grid(row=1, column=0, sticky='ew')
+        table_frame.grid_rowconfigure(0, weight=1)
+        table_frame.grid_columnconfigure(0, weight=1)
+        self.tree.tag_configure('mismatch', foreground='#ff4444')
+
+    def on_sheet_change(self):
+        self.sheet = self.sheet_labels[self.sheet_var.get()]
+        columns = self.sheets[self.sheet][0]
+        self.tree.configure(columns=columns)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=140, stretch=False, anchor='w')
+        self.status_box.configure(values=[ALL_STATUSES] + [f"{status} ({n:,})" for status, n in self.store.statuses(self.sheet)])
+        self.status_var.set(ALL_STATUSES)
+        self.reload()
+
+    def _filters(self):
+        status = self.status_var.get()
+        status = None if status == ALL_STATUSES else status.rsplit(' (', 1)[0]
+        return status, self.search_var.get().strip() or None
+
+    def _schedule_search(self):
+        # Debounce typing so each keystroke does not requery
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(300, self.reload)
+
+    def reload(self):
+        self._search_job = None
+        self.tree.delete(*self.tree.get_children())
+        self.last_id = 0
+        self.exhausted = False
+        status, search = self._filters()
+        total = self.store.count(self.sheet, status, search)
+        self.count_var.set(f"{total:,} row(s)")
+        self.load_page()
+        self.tree.yview_moveto(0)
+
+    def load_page(self):
+        if self.exhausted:
+            return
+        status, search = self._filters()
+        rows = self.store.page(self.sheet, status, search, self.last_id, RESULTS_PAGE_SIZE)
+        columns = self.sheets[self.sheet][0]
+        status_idx = columns.index('Status') if 'Status' in columns else None
+        for row_id, values in rows:
+            row_status = str(values[status_idx]) if status_idx is not None else ''
+            tags = () if row_status.upper().startswith('MATCHED') else ('mismatch',)
+            self.tree.insert('', 'end', values=['' if v is None else v for v in values], tags=tags)
+        if rows:
+            self.last_id = rows[-1][0]
+        self.exhausted = len(rows) < RESULTS_PAGE_SIZE
+
+    def _maybe_load_more(self, last):
+        if not self.exhausted and float(last) > 0.9:
+            self.after_idle(self.load_page)
+
+    def close(self):
+        self.store.close()
+        self.destroy()
 
 class AboutUI(ttk.Frame):
     def __init__(self, parent):
@@ -470,7 +783,9 @@ class MainApp(tk.Tk):
         self.refresh_btn.pack(side='right', anchor='e', padx=(0, 2))
         self.reports_frame = tk.Frame(self.resultset_frame, bg='#383838')
         self.reports_frame.pack(fill='x', padx=10)
-        self.refresh_reports()
+        self.report_index = ReportIndex().start()
+        self._reports_version = None
+        self._redraw_reports()
 
     def show_about_window(self):
         win = tk.Toplevel(self)
@@ -487,10 +802,20 @@ class MainApp(tk.Tk):
         tk.Label(win, text=about_text, font=(None, 11), fg='#bbb', bg='#2d2d2d', wraplength=420, justify='left').pack(padx=28, pady=(0, 18))
 
     def refresh_reports(self):
+        # Non-blocking: the index rescans in the background and _redraw_reports picks it up
+        self.report_index.request_refresh()
+
+    def _redraw_reports(self):
+        # Rebuild the rows only when the index changed
+        if self.report_index.version != self._reports_version:
+            self._reports_version = self.report_index.version
+            self._draw_reports(self.report_index.latest(RECENT_REPORTS))
+        self.after(REPORTS_REDRAW_MS, self._redraw_reports)
+
+    def _draw_reports(self, files):
         # Clear previous
         for widget in self.reports_frame.winfo_children():
             widget.destroy()
-        files = find_latest_reports()[:8]
         icons = {
             'view': load_icon('eye.png', size=(18, 18)),
             'delete': load_icon('delete.png', size=(18, 18))
@@ -511,11 +836,25 @@ class MainApp(tk.Tk):
             if icons.get('delete'):
                 del_btn.config(image=icons['delete'], compound='left', padx=4)
             del_btn.pack(side='right', padx=2)
+            results = self.report_index.results_for(f)
+            if results:
+                browse_btn = tk.Button(row, text='Browse', command=lambda r=results: ResultsViewer(self, r), fg='#fff', bg='#383838',
+                                       activebackground='#2e2d2d', highlightbackground='#4a3d0e', highlightcolor='#4a3d0e', highlightthickness=1, relief='flat', font=(None, 9))
+                browse_btn.pack(side='right', padx=2)
 
     def delete_report_file(self, file):
         if CustomMessage(self, f'Delete report file?\n{os.path.basename(file)}', 'Delete', 'warning', ask_yes_no=True):
             try:
                 os.remove(file)
+                results = results_db_path(file)
+                if os.path.exists(results):
+                    os.remove(results)
+                from SchemaValidatior import report_parts_dir
+                parts = report_parts_dir(file)
+                if os.path.isdir(parts):
+                    import shutil
+                    shutil.rmtree(parts)  # Per-schema workbooks of a split report
+                self.report_index.forget(file)
                 self.refresh_reports()
             except Exception as e:
                 CustomMessage(self, f'Could not delete file:\n{e}', 'Error', 'error')
@@ -531,5 +870,6 @@ class MainApp(tk.Tk):
         subprocess.Popen(f'explorer "{folder}"')
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Needed for the worker process in PyInstaller builds
     app = MainApp()
     app.mainloop()
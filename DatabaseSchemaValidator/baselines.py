@@ -0,0 +1,58 @@
+# baselines.py
+
+# Definition hash baselines for the Definitions tab.
+#
+# Each server/database has one small JSON file with, per side, the normalized
+# definition hash, length and parameter list of every view, procedure and
+# function seen so far. A run compares the hashes it just read against it, so
+# only objects whose hash moved need their bodies fetched. New objects are
+# added to the baseline; hashes that changed are kept until the file is deleted
+# or the run is told to replace them.
+import os
+import json
+import datetime
+
+BASELINE_SUFFIX = '_Definitions.json'
+
+def baseline_path(baseline_dir, server, db):
+    return os.path.join(baseline_dir, f"{server}_{db}{BASELINE_SUFFIX}")
+
+def definition_key(rec):
+    # kind:schema.name(params), lowercase; overloaded functions get one entry each
+    return f"{rec['kind']}:{rec['schema']}.{rec['name']}({rec.get('params') or ''})".lower()
+
+def load_baseline(path):
+    # {'sql': {key: {'hash', 'length', 'params'}}, 'pg': {...}}; empty when there is none yet
+    try:
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable definition baseline {path}: {e}")
+        baseline = {}
+    baseline.setdefault('sql', {})
+    baseline.setdefault('pg', {})
+    return baseline
+
+def merge_baseline(baseline, side, records, replace_changed=False):
+    # Adds records not in the baseline yet (and changed ones with replace_changed); returns True if anything changed
+    entries = baseline[side]
+    changed = False
+    for rec in records:
+        key = definition_key(rec)
+        entry = entries.get(key)
+        if entry is None or (replace_changed and entry['hash'] != rec['hash']):
+            entries[key] = {'hash': rec['hash'], 'length': rec['length'], 'params': rec.get('params') or ''}
+            changed = True
+    return changed
+
+def save_baseline(path, baseline, server, db):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline['server'] = server
+    baseline['db'] = db
+    baseline['updated'] = datetime.datetime.now().isoformat(timespec='seconds')
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
@@ -0,0 +1,58 @@
+# cancellation.py
+
+# Cooperative cancellation for validation runs.
+#
+# A CancelToken is handed to main(cancel=...). Connections opened for a
+# database are registered with it; cancel() (safe to call from any thread)
+# stops new databases and entities from starting and cancels the statement
+# each registered connection is running right now (psycopg2
+# connection.cancel(), which is what pg_cancel_backend does for another
+# session, and pyodbc cursor.cancel() for SQL Server). Statements issued
+# after that are refused with RunCancelled instead of being sent.
+import threading
+
+class RunCancelled(Exception):
+    pass
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise RunCancelled('Validation cancelled')
+
+    def register(self, conn):
+        # conn is an InstrumentedConnection (anything with cancel())
+        with self._lock:
+            self._connections.append(conn)
+        if self._event.is_set():
+            cancel_connection(conn)
+
+    def unregister(self, conn):
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+
+    def cancel(self):
+        self._event.set()
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            cancel_connection(conn)
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+def cancel_connection(conn):
+    try:
+        conn.cancel()
+    except Exception as e:
+        # The statement may have just finished or the connection dropped; nothing left to stop
+        print(f"Could not cancel statement on {getattr(conn, 'db', '?')} ({getattr(conn, 'side', '?')}): {e}")
@@ -0,0 +1,401 @@
+# dbreplay.py
+
+# Record/replay stand-in for the DB-API connections opened by SchemaValidatior.
+#
+# 'record' mode wraps the real pyodbc/psycopg2 connection and captures every
+# query issued through it together with the rows that were fetched.
+# 'replay' mode never touches a database: a ReplayConnection serves the captured
+# result sets back to the unmodified extract_* functions and main(), with an
+# optional injected latency per round trip, so throughput and round-trip counts
+# can be reproduced offline.
+#
+# Mode selection (either through configure() or environment variables):
+#   SCHEMA_VALIDATOR_CAPTURE_MODE        record | replay (unset = live database)
+#   SCHEMA_VALIDATOR_CAPTURE_DIR         folder holding one JSON capture per database
+#   SCHEMA_VALIDATOR_REPLAY_LATENCY_MS   latency added to every replayed round trip
+import os
+import json
+import time
+import uuid
+import atexit
+import decimal
+import datetime
+import threading
+
+CAPTURE_MODE_ENV = 'SCHEMA_VALIDATOR_CAPTURE_MODE'
+CAPTURE_DIR_ENV = 'SCHEMA_VALIDATOR_CAPTURE_DIR'
+REPLAY_LATENCY_ENV = 'SCHEMA_VALIDATOR_REPLAY_LATENCY_MS'
+
+CAPTURE_VERSION = 1
+
+_settings = {'mode': None, 'dir': None, 'latency_ms': None}
+_lock = threading.Lock()
+_recordings = {}  # capture path -> _Recording
+_captures = {}    # capture path -> {query key: [entries]}
+_replay_totals = {'connections': 0, 'round_trips': 0, 'rows': 0}
+
+class ReplayError(Exception):
+    # Raised by a replay cursor for queries that failed while recording or were never recorded
+    pass
+
+def configure(mode=None, capture_dir=None, latency_ms=None):
+    # Programmatic override of the environment variables; mode=None means live database
+    if mode not in (None, 'record', 'replay'):
+        raise ValueError(f"Unknown capture mode: {mode!r} (expected 'record' or 'replay')")
+    _settings['mode'] = mode
+    _settings['dir'] = capture_dir
+    _settings['latency_ms'] = latency_ms
+
+def get_settings():
+    mode = _settings['mode'] or (os.environ.get(CAPTURE_MODE_ENV) or '').strip().lower() or None
+    capture_dir = _settings['dir'] or os.environ.get(CAPTURE_DIR_ENV) or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'SchemaValidationCaptures')
+    latency_ms = _settings['latency_ms']
+    if latency_ms is None:
+        latency_ms = float(os.environ.get(REPLAY_LATENCY_ENV) or 0)
+    return {'mode': mode, 'dir': capture_dir, 'latency_ms': float(latency_ms)}
+
+def capture_path(capture_dir, dbtype, database):
+    safe_db = ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in str(database or ''))
+    return os.path.join(capture_dir, f"{dbtype}_{safe_db}.json")
+
+def open_connection(connect, dbtype, database):
+    # Used by get_sqlserver_connection/get_postgres_connection: connect is only
+    # called (and the driver only imported) when a live connection is needed.
+    settings = get_settings()
+    mode = settings['mode']
+    if mode == 'replay':
+        path = capture_path(settings['dir'], dbtype, database)
+        return ReplayConnection(path, latency_ms=settings['latency_ms'])
+    if mode == 'record':
+        path = capture_path(settings['dir'], dbtype, database)
+        return RecordingConnection(connect(), _get_recording(path, dbtype, database))
+    if mode:
+        raise ValueError(f"Unknown capture mode: {mode!r} (expected 'record' or 'replay')")
+    return connect()
+
+def query_key(sql, params=None):
+    # Whitespace-insensitive key so reformatting a query does not invalidate captures
+    key = ' '.join((sql or '').split())
+    if params:
+        key += ' -- ' + json.dumps(_encode_value(list(params) if not isinstance(params, dict) else params), sort_keys=True)
+    return key
+
+# --- Value encoding (JSON with tagged non-native types) ---
+def _encode_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return {'$t': 'datetime', 'v': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$t': 'date', 'v': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'$t': 'time', 'v': value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {'$t': 'decimal', 'v': str(value)}
+    if isinstance(value, uuid.UUID):
+        return {'$t': 'uuid', 'v': str(value)}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'$t': 'bytes', 'v': bytes(value).hex()}
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _encode_value(v) for k, v in value.items()}
+    return str(value)
+
+def _decode_value(value):
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    tag = value.get('$t')
+    raw = value.get('v')
+    if tag == 'datetime':
+        return datetime.datetime.fromisoformat(raw)
+    if tag == 'date':
+        return datetime.date.fromisoformat(raw)
+    if tag == 'time':
+        return datetime.time.fromisoformat(raw)
+    if tag == 'decimal':
+        return decimal.Decimal(raw)
+    if tag == 'uuid':
+        return uuid.UUID(raw)
+    if tag == 'bytes':
+        return bytes.fromhex(raw)
+    return {k: _decode_value(v) for k, v in value.items()}
+
+# --- Recording ---
+class _Recording:
+    def __init__(self, path, dbtype, database):
+        self.path = path
+        self.dbtype = dbtype
+        self.database = database
+        self.entries = []
+        self.lock = threading.Lock()
+        self.dirty = False
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            payload = {
+                'version': CAPTURE_VERSION,
+                'dbtype': self.dbtype,
+                'database': self.database,
+                'recorded_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'queries': self.entries,
+            }
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+def _get_recording(path, dbtype, database):
+    with _lock:
+        recording = _recordings.get(path)
+        if recording is None:
+            recording = _Recording(path, dbtype, database)
+            _recordings[path] = recording
+        return recording
+
+def save_recordings():
+    with _lock:
+        recordings = list(_recordings.values())
+    for recording in recordings:
+        recording.save()
+
+atexit.register(save_recordings)
+
+class RecordingCursor:
+    def __init__(self, cursor, recording):
+        self._cursor = cursor
+        self._recording = recording
+        self._entry = None
+
+    def _finish(self):
+        if self._entry is not None:
+            self._recording.add(self._entry)
+            self._entry = None
+
+    def _capture(self, rows):
+        if self._entry is not None:
+            self._entry['rows'].extend(_encode_value(list(r)) for r in rows)
+        return rows
+
+    def execute(self, sql, *params):
+        self._finish()
+        args = params[0] if len(params) == 1 and isinstance(params[0], (list, tuple, dict)) else list(params)
+        self._entry = {'sql': sql, 'params': _encode_value(args) if args else None, 'rows': []}
+        try:
+            result = self._cursor.execute(sql, *params)
+        except Exception as e:
+            self._entry['error'] = f"{type(e).__name__}: {e}"
+            self._finish()
+            raise
+        description = getattr(self._cursor, 'description', None)
+        self._entry['columns'] = [d[0] for d in description] if description else None
+        return self if result is self._cursor else result
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._capture([row])
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._capture(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._capture(self._cursor.fetchall())
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class RecordingConnection:
+    def __init__(self, conn, recording):
+        self._conn = conn
+        self._recording = recording
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = RecordingCursor(self._conn.cursor(*args, **kwargs), self._recording)
+        self._cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        for cursor in self._cursors:
+            cursor._finish()
+        self._cursors = []
+        self._recording.save()
+        return self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+# --- Replay ---
+def replay_totals():
+    # Connections opened, round trips and rows served by all replay connections so far
+    with _lock:
+        return dict(_replay_totals)
+
+def load_capture(path):
+    with _lock:
+        capture = _captures.get(path)
+        if capture is not None:
+            return capture
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No replay capture found at {path}; record one first with SCHEMA_VALIDATOR_CAPTURE_MODE=record")
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    capture = {}
+    for entry in payload.get('queries', []):
+        key = query_key(entry['sql'], _decode_value(entry['params']) if entry.get('params') else None)
+        capture.setdefault(key, []).append(entry)
+    with _lock:
+        _captures[path] = capture
+    return capture
+
+class ReplayCursor:
+    def __init__(self, conn, name=None):
+        self._conn = conn
+        self.name = name  # psycopg2 server-side cursors: every fetchmany is a round trip
+        self.arraysize = 1
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+        self._pos = 0
+
+    def execute(self, sql, *params):
+        args = params[0] if len(params) == 1 and isinstance(params[0], (list, tuple, dict)) else list(params)
+        entry = self._conn._next_entry(query_key(sql, args or None))
+        self._conn._round_trip()
+        if entry is None:
+            raise ReplayError(f"Query was not recorded: {' '.join(sql.split())[:200]}")
+        if entry.get('error'):
+            raise ReplayError(entry['error'])
+        columns = entry.get('columns')
+        self.description = [(c, None, None, None, None, None, None) for c in columns] if columns else None
+        self._rows = [tuple(_decode_value(r)) for r in entry.get('rows', [])]
+        self._pos = 0
+        self.rowcount = len(self._rows)
+        return self
+
+    def _take(self, n):
+        rows = self._rows[self._pos:self._pos + n]
+        self._pos += len(rows)
+        self._conn.rows_served += len(rows)
+        with _lock:
+            _replay_totals['rows'] += len(rows)
+        return rows
+
+    def fetchone(self):
+        rows = self._take(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=None):
+        if self.name:
+            self._conn._round_trip()
+        return self._take(size or self.arraysize)
+
+    def fetchall(self):
+        return self._take(len(self._rows) - self._pos)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ReplayConnection:
+    def __init__(self, path, latency_ms=0.0):
+        self.path = path
+        self.latency = max(float(latency_ms or 0), 0.0) / 1000.0
+        self._capture = load_capture(path)
+        self._served = {}  # query key -> number of times served on this connection
+        self._served_lock = threading.Lock()
+        self.round_trips = 0
+        self.rows_served = 0
+        self.autocommit = False
+        self.closed = False
+        with _lock:
+            _replay_totals['connections'] += 1
+
+    def _next_entry(self, key):
+        entries = self._capture.get(key)
+        if not entries:
+            return None
+        with self._served_lock:
+            n = self._served.get(key, 0)
+            self._served[key] = n + 1
+        # Repeated queries are served in recorded order; the last result is reused once exhausted
+        return entries[min(n, len(entries) - 1)]
+
+    def _round_trip(self):
+        self.round_trips += 1
+        with _lock:
+            _replay_totals['round_trips'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def cursor(self, name=None, *args, **kwargs):
+        return ReplayCursor(self, name=name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+if __name__ == '__main__':
+    # python dbreplay.py record|replay [--dir DIR] [--latency-ms N]
+    # Run as a script this file is the __main__ module; SchemaValidatior imports dbreplay
+    # as a module of its own, so that is the one to configure.
+    import argparse
+    import dbreplay
+    parser = argparse.ArgumentParser(description='Run the schema validator against recorded database captures.')
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('--dir', dest='capture_dir', default=None, help='Capture folder (default: SchemaValidationCaptures)')
+    parser.add_argument('--latency-ms', type=float, default=None, help='Latency injected per replayed round trip')
+    args = parser.parse_args()
+    dbreplay.configure(args.mode, args.capture_dir, args.latency_ms)
+    import SchemaValidatior
+    started = time.perf_counter()
+    SchemaValidatior.main()
+    print(f"\n{args.mode.capitalize()} run finished in {time.perf_counter() - started:.2f}s")
+    if args.mode == 'replay':
+        totals = dbreplay.replay_totals()
+        print(f"Connections: {totals['connections']}, round trips: {totals['round_trips']}, rows served: {totals['rows']}")
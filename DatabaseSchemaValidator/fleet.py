@@ -0,0 +1,104 @@
+# fleet.py
+
+# Fleet rollup: one row per database x entity across a whole run, so the state of
+# an estate can be read from a single file instead of one Overview per workbook.
+#
+# main() adds each database's Overview rows and phase timings as the database
+# finishes (nothing is read back from the reports). rollup_from_results() builds
+# the same rollup from the results sidecars (<report>.results.sqlite) already in a
+# reports folder, which only reads their small overview and meta tables.
+import os
+import json
+import threading
+from results_store import RESULTS_DB_SUFFIX, ResultsStore
+
+DATABASE_COLUMNS = ['Database', 'Status', 'Failed Entities', 'Seconds', 'Report']
+FLEET_COLUMNS = ['Database', 'Entity', 'SQL Count', 'PG Count', 'Difference', 'Status', 'Reason', 'Seconds']
+
+def entity_seconds(phases):
+    # {entity: seconds} summed over a database's phase records
+    seconds = {}
+    for p in phases:
+        seconds[p['entity']] = round(seconds.get(p['entity'], 0) + (p.get('seconds') or 0), 4)
+    return seconds
+
+class FleetRollup:
+    def __init__(self, server):
+        self.server = server
+        self._databases = {}  # db -> {'status', 'overview', 'seconds', 'entity_seconds', 'report', 'error'}
+        self._lock = threading.Lock()
+
+    def add_database(self, db, overview_rows, seconds_by_entity, seconds, report):
+        # overview_rows: [Entity, SQL Count, PG Count, Difference, Status, Reason] (build_overview_rows)
+        failed = [row[0] for row in overview_rows if str(row[4]).lower() != 'passed']
+        with self._lock:
+            self._databases[db] = {'status': 'Failed' if failed else 'Passed', 'failed': failed,
+                                   'overview': [list(row) for row in overview_rows], 'seconds': seconds,
+                                   'entity_seconds': dict(seconds_by_entity), 'report': report, 'error': None}
+
+    def add_error(self, db, error, status='Error'):
+        # A database that failed or was cancelled before its report was written
+        with self._lock:
+            self._databases[db] = {'status': status, 'failed': [], 'overview': [], 'seconds': None,
+                                   'entity_seconds': {}, 'report': None, 'error': str(error) if error else None}
+
+    def __len__(self):
+        return len(self._databases)
+
+    def database_rows(self):
+        with self._lock:
+            items = sorted(self._databases.items(), key=lambda item: item[0].lower())
+        return [[db, d['status'], ', '.join(d['failed']) or d['error'] or '', d['seconds'], d['report'] or '']
+                for db, d in items]
+
+    def fleet_rows(self):
+        with self._lock:
+            items = sorted(self._databases.items(), key=lambda item: item[0].lower())
+        rows = []
+        for db, d in items:
+            if not d['overview']:
+                rows.append([db, '', None, None, None, d['status'], d['error'] or '', None])
+            for entity, sql_count, pg_count, diff, status, reason in d['overview']:
+                rows.append([db, entity, sql_count, pg_count, diff, status, reason, d['entity_seconds'].get(entity)])
+        return rows
+
+    def to_dict(self):
+        return {
+            'server': self.server,
+            'databases': [dict(zip(DATABASE_COLUMNS, r)) for r in self.database_rows()],
+            'fleet': [dict(zip(FLEET_COLUMNS, r)) for r in self.fleet_rows()],
+        }
+
+def report_for_sidecar(path):
+    # Report next to a results sidecar written before the report name was stored in it
+    base = path[:-len(RESULTS_DB_SUFFIX)]
+    for candidate in (base + '.xlsx', base + '.json', base):
+        if os.path.exists(candidate):
+            return os.path.basename(candidate)
+    return ''
+
+def rollup_from_results(reports_dir, db_list=None, server=None):
+    # Rollup of the latest results sidecar per (server, database) in reports_dir
+    latest = {}
+    with os.scandir(reports_dir) as entries:
+        sidecars = [(e.stat().st_mtime, e.path) for e in entries if e.name.endswith(RESULTS_DB_SUFFIX) and e.is_file()]
+    wanted = {db.lower() for db in db_list} if db_list else None
+    for mtime, path in sorted(sidecars):
+        store = ResultsStore(path)
+        try:
+            meta = store.meta()
+            if (server and meta.get('server') != server) or (wanted and meta.get('db', '').lower() not in wanted):
+                continue
+            latest[(meta.get('server'), meta.get('db'))] = (path, meta, store.overview())
+        except Exception as e:
+            print(f"Skipping unreadable results file {path}: {e}")
+        finally:
+            store.close()
+    servers = sorted({key[0] for key in latest if key[0]})
+    rollup = FleetRollup(server or (servers[0] if len(servers) == 1 else 'Fleet'))
+    for (meta_server, db), (path, meta, overview) in latest.items():
+        name = db if server or len(servers) <= 1 else f"{meta_server}/{db}"
+        seconds = meta.get('seconds')
+        rollup.add_database(name, overview, json.loads(meta.get('entity_seconds') or '{}'),
+                            float(seconds) if seconds else None, meta.get('report') or report_for_sidecar(path))
+    return rollup
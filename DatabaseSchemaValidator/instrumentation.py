@@ -0,0 +1,215 @@
+# instrumentation.py
+
+# Per-phase timing, round-trip and row-count instrumentation for validation runs.
+#
+# RunTimings collects one record per (database, entity, phase) block - extract,
+# compare, write, save - with wall time, rows fetched, round trips and the peak
+# RSS seen so far, plus one record per query issued through an instrumented
+# connection. The result is written as a JSON run log and can optionally be
+# rendered as a "Timings" sheet next to the Overview.
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+from contextlib import contextmanager
+from cancellation import RunCancelled
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far, in MB (None if unavailable)
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        peak = getattr(info, 'peak_wset', None) or getattr(info, 'rss', 0)
+        return round(peak / (1024 * 1024), 1)
+    except Exception:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and KB on Linux
+        return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+    except Exception:
+        return None
+
+class InstrumentedCursor:
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self._query = None
+
+    def _count(self, rows):
+        n = len(rows) if rows is not None else 0
+        self._conn.rows_fetched += n
+        if self._query is not None:
+            self._query['rows'] += n
+            self._query['seconds'] = round(time.perf_counter() - self._query['_start'], 4)
+        return rows
+
+    def execute(self, sql, *params):
+        if self._conn.cancelled:
+            raise RunCancelled('Validation cancelled')
+        self._conn.active_cursor = self._cursor
+        self._conn.round_trips += 1
+        self._query = {'side': self._conn.side, 'entity': self._conn.timings.current_entity(),
+                       'sql': ' '.join((sql or '').split())[:200], 'rows': 0, 'seconds': 0.0,
+                       '_start': time.perf_counter()}
+        self._conn.timings.add_query(self._conn.db, self._query)
+        try:
+            result = self._cursor.execute(sql, *params)
+        finally:
+            self._query['seconds'] = round(time.perf_counter() - self._query['_start'], 4)
+        return self if result is self._cursor else result
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count([row] if row is not None else [])
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        if getattr(self._cursor, 'name', None):
+            self._conn.round_trips += 1  # server-side cursor: every batch is a round trip
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedConnection:
+    def __init__(self, conn, timings, db, side):
+        self._conn = conn
+        self.timings = timings
+        self.db = db
+        self.side = side
+        self.round_trips = 0
+        self.rows_fetched = 0
+        self.cancelled = False
+        self.active_cursor = None
+        self.cancel_token = None  # CancelToken of the run, for connections opened later for the same database
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self)
+
+    def cancel(self):
+        # Called from another thread: stop the running statement and refuse new ones.
+        # psycopg2 cancels at connection level; pyodbc only has Cursor.cancel().
+        self.cancelled = True
+        if hasattr(self._conn, 'cancel'):
+            self._conn.cancel()
+        elif self.active_cursor is not None:
+            self.active_cursor.cancel()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+class RunTimings:
+    def __init__(self):
+        self.started_at = datetime.datetime.now()
+        self.phases = []
+        self.queries = []
+        self._connections = {}  # db -> [InstrumentedConnection]
+        self._listeners = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        # callback(rec) is called after every phase record is completed
+        self._listeners.append(callback)
+
+    def instrument(self, conn, db, side):
+        wrapped = InstrumentedConnection(conn, self, db, side)
+        with self._lock:
+            self._connections.setdefault(db, []).append(wrapped)
+        return wrapped
+
+    def current_entity(self):
+        return getattr(self._local, 'entity', None)
+
+    def add_query(self, db, query):
+        # The cursor keeps updating this dict (elapsed, rows) as results are fetched
+        query['db'] = db
+        with self._lock:
+            self.queries.append(query)
+
+    def _counters(self, db):
+        conns = self._connections.get(db, [])
+        return sum(c.round_trips for c in conns), sum(c.rows_fetched for c in conns)
+
+    @contextmanager
+    def phase(self, db, entity, phase):
+        # Usage: with timings.phase(db, 'Columns', 'compare') as rec: ...; rec['rows'] = len(rows)
+        rec = {'db': db, 'entity': entity, 'phase': phase, 'rows': None}
+        previous = self.current_entity()
+        self._local.entity = entity
+        trips_before, fetched_before = self._counters(db)
+        start = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            trips_after, fetched_after = self._counters(db)
+            rec['seconds'] = round(time.perf_counter() - start, 4)
+            rec['round_trips'] = trips_after - trips_before
+            rec['rows_fetched'] = fetched_after - fetched_before
+            rec['peak_rss_mb'] = peak_rss_mb()
+            self._local.entity = previous
+            with self._lock:
+                self.phases.append(rec)
+            for callback in self._listeners:
+                callback(rec)
+
+    @contextmanager
+    def entity(self, entity):
+        # Attribute this thread's queries to entity without timing a phase (worker threads of a phase)
+        previous = self.current_entity()
+        self._local.entity = entity
+        try:
+            yield
+        finally:
+            self._local.entity = previous
+
+    def add_phases(self, recs):
+        # Phase records timed in another process (background report rendering);
+        # listeners are notified as if the phases had run here
+        with self._lock:
+            self.phases.extend(recs)
+        for rec in recs:
+            for callback in self._listeners:
+                callback(rec)
+
+    def phases_for(self, db):
+        return [p for p in self.phases if p['db'] == db]
+
+    def summary(self, db=None):
+        # Total seconds per phase kind, e.g. {'extract': 12.3, 'compare': 1.2, 'write': 4.5}
+        totals = {}
+        for p in self.phases:
+            if db is None or p['db'] == db:
+                totals[p['phase']] = round(totals.get(p['phase'], 0) + p['seconds'], 4)
+        return totals
+
+    def to_dict(self):
+        queries = [{k: v for k, v in q.items() if not k.startswith('_')} for q in self.queries]
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'peak_rss_mb': peak_rss_mb(),
+            'summary': self.summary(),
+            'phases': self.phases,
+            'queries': queries,
+        }
+
+    def write_json(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
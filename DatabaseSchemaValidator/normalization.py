@@ -0,0 +1,113 @@
+# normalization.py
+
+# Name normalization shared by every entity comparison.
+#
+# The same schema, table and object names are normalized over and over in nested
+# matching loops, so every normalizer is memoized in a bounded LRU cache (which
+# also interns the results) and uses precompiled patterns. annotate() computes a
+# record's normalized forms once, at extraction time, and stores them on the
+# record under NORM_PREFIX keys ('_schema', '_table', '_name', '_type',
+# '_compact'); matchers read those instead of normalizing again. Keys starting
+# with NORM_PREFIX are never copied into report rows.
+import re
+from functools import lru_cache
+
+NORM_PREFIX = '_'
+
+# Distinct strings kept per normalizer; a large catalog has far fewer distinct names
+NORMALIZE_CACHE_SIZE = 1 << 17
+
+INDEX_PREFIX_RE = re.compile(r'^(ix_|idxn|idx|pk_|pk__|uq_|uq__|ak_|ak__|unique_)')
+TRAILING_DIGITS_RE = re.compile(r'_[0-9]+$')
+CONSTRAINT_PREFIX_RE = re.compile(r'^(chk_|ck_|df_|default_)+')
+EVENT_SUFFIX_RE = re.compile(r'_(insert|update|delete)$', re.IGNORECASE)
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_name(name):
+    return (name or '').strip().lower()
+
+def normalize_fullname(schema, name):
+    return f"{normalize_name(schema)}.{normalize_name(name)}"
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_index_name(name):
+    # Remove common prefixes, underscores, and lowercase
+    name = (name or '').lower()
+    name = INDEX_PREFIX_RE.sub('', name)
+    return name.replace('_', '')
+
+def normalize_index_columns(columns):
+    # Normalize and sort columns for comparison
+    if not columns:
+        return []
+    return sorted([c.strip().lower() for c in columns.split(',') if c.strip()])
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_check_name(name):
+    # For Postgres, strip trailing _<digits> for check constraints
+    if name is None:
+        return ''
+    return TRAILING_DIGITS_RE.sub('', name.lower())
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_constraint_name(name):
+    # Lowercase, remove prefixes (chk_, ck_, etc.), and strip trailing _digits
+    if not name:
+        return ''
+    name = CONSTRAINT_PREFIX_RE.sub('', name.lower())
+    return TRAILING_DIGITS_RE.sub('', name)
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def compact_name(name):
+    # Lowercase without underscores (trigger and type matching)
+    return (name or '').replace('_', '').lower()
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def strip_event_suffix(name):
+    # Remove _insert, _update, _delete suffixes for robust matching
+    return EVENT_SUFFIX_RE.sub('', name)
+
+# Column defaults are compared after removing what differs only in spelling between
+# the servers: PostgreSQL casts ('0'::integer), SQL Server's wrapping parentheses
+# (((0))), N'' prefixes and literal quotes, and the names of equivalent functions.
+# Bit defaults 1/0 compare equal to true/false.
+COLUMN_DEFAULT_CAST_RE = re.compile(r"::[a-z][a-z0-9 ]*(\(\d+(,\s*\d+)?\))?(\[\])?")
+COLUMN_DEFAULT_PARENS_RE = re.compile(r'^\((.*)\)$')
+COLUMN_DEFAULT_NCHAR_RE = re.compile(r"^n'")
+COLUMN_DEFAULT_QUOTES_RE = re.compile(r"^'(.*)'$")
+COLUMN_DEFAULT_PAREN_DEPTH = 3
+COLUMN_DEFAULT_EQUIVALENTS = {
+    'getdate()': 'now()', 'sysdatetime()': 'now()', 'current_timestamp': 'now()',
+    'newid()': 'gen_random_uuid()', 'uuid_generate_v4()': 'gen_random_uuid()',
+}
+BIT_DEFAULTS = {'1': 'true', '0': 'false'}
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_default(value, datatype):
+    text = COLUMN_DEFAULT_CAST_RE.sub('', (value or '').strip().lower())
+    for _ in range(COLUMN_DEFAULT_PAREN_DEPTH):
+        text = COLUMN_DEFAULT_PARENS_RE.sub(r'\1', text)
+    text = COLUMN_DEFAULT_QUOTES_RE.sub(r'\1', COLUMN_DEFAULT_NCHAR_RE.sub("'", text))
+    text = COLUMN_DEFAULT_EQUIVALENTS.get(text, text)
+    if (datatype or '').lower() in ('bit', 'boolean'):
+        text = BIT_DEFAULTS.get(text, text)
+    return text
+
+def annotate(records, name_field='name'):
+    # Store normalized forms on each record (in place); returns the same list
+    for rec in records:
+        rec['_schema'] = normalize_name(rec.get('schema', ''))
+        rec['_table'] = normalize_name(rec.get('table', ''))
+        rec['_name'] = normalize_name(rec.get(name_field, ''))
+        rec['_type'] = normalize_name(rec.get('type', ''))
+        rec['_compact'] = compact_name(rec.get(name_field, ''))
+    return records
+
+def norm_field(rec, field):
+    # Precomputed normalized value if the record was annotated, else normalize now
+    value = rec.get(NORM_PREFIX + field)
+    return value if value is not None else normalize_name(rec.get(field, ''))
+
+def public_fields(rec, skip):
+    # Record fields copied into report rows: not the other side's prefix, Status or normalized keys
+    return [k for k in rec if not k.startswith(skip) and not k.startswith(NORM_PREFIX) and k != 'Status']
@@ -0,0 +1,177 @@
+# profiles.py
+
+# Per-column data profiles for the ColumnProfiles tab, and the comparison of
+# optimizer statistics estimates for the ColumnStats tab.
+#
+# Every table is profiled with one aggregate query covering all of its columns:
+# row count, and per column the non-null count plus, where the type allows it,
+# MIN/MAX and COUNT(DISTINCT). Which aggregates a column gets depends on its type
+# class on that server; the comparison uses the statistics both sides have.
+#
+# Profiles are compared with type-aware tolerances: floats relatively, date/time
+# values within the rounding of SQL Server's datetime, numbers exactly. Text
+# MIN/MAX and distinct counts depend on collation (SQL Server is usually case
+# insensitive, PostgreSQL is not), so differences there are noted in the Reason
+# without failing the column.
+import datetime
+from decimal import Decimal, InvalidOperation
+
+# Relative tolerance for float/real min and max
+PROFILE_FLOAT_TOLERANCE = 1e-6
+
+# SQL Server datetime is stored in 1/300 s steps
+PROFILE_TIME_TOLERANCE = datetime.timedelta(milliseconds=4)
+
+# Characters of a text min/max kept in the report
+PROFILE_TEXT_CHARS = 200
+
+TYPE_CLASSES = {
+    'integer': {'int', 'integer', 'bigint', 'smallint', 'tinyint', 'serial', 'bigserial', 'smallserial'},
+    'decimal': {'decimal', 'numeric', 'money', 'smallmoney'},
+    'float': {'float', 'real', 'double precision'},
+    'temporal': {'date', 'datetime', 'datetime2', 'smalldatetime', 'datetimeoffset', 'time',
+                 'timestamp', 'timestamp without time zone', 'timestamp with time zone',
+                 'time without time zone', 'time with time zone'},
+    'bool': {'bit', 'boolean'},
+    'text': {'char', 'varchar', 'nchar', 'nvarchar', 'character', 'character varying', 'text', 'citext', 'bpchar', 'name'},
+    'guid': {'uniqueidentifier', 'uuid'},
+}
+_CLASS_OF = {t: cls for cls, types in TYPE_CLASSES.items() for t in types}
+
+# SQL Server types that allow neither DISTINCT nor MIN/MAX (only null counts)
+SQL_LOB_TYPES = {'text', 'ntext', 'image', 'xml', 'geography', 'geometry', 'hierarchyid', 'sql_variant'}
+
+# Aggregates per type class, after the non-null count
+CLASS_AGGREGATES = {
+    'integer': ('min', 'max', 'distinct'),
+    'decimal': ('min', 'max', 'distinct'),
+    'float': ('min', 'max', 'distinct'),
+    'temporal': ('min', 'max', 'distinct'),
+    'bool': ('min', 'max', 'distinct'),
+    'text': ('min', 'max', 'distinct'),
+    'guid': ('distinct',),  # uniqueidentifier and uuid sort differently; only distinct counts compare
+    'other': (),
+}
+
+def type_class(datatype, dbtype):
+    datatype = (datatype or '').strip().lower()
+    if dbtype == 'sql' and datatype in SQL_LOB_TYPES:
+        return 'other'
+    return _CLASS_OF.get(datatype, 'other')
+
+def quote_ident(name, dbtype):
+    if dbtype == 'sql':
+        return '[' + name.replace(']', ']]') + ']'
+    return '"' + name.replace('"', '""') + '"'
+
+def profile_query(schema, table, columns, dbtype):
+    # columns: [(column name, type class)]; one SELECT with every aggregate of the table
+    count = 'COUNT_BIG' if dbtype == 'sql' else 'count'
+    parts = [f"{count}(*)"]
+    for name, cls in columns:
+        col = quote_ident(name, dbtype)
+        expr = (f"CAST({col} AS int)" if dbtype == 'sql' else f"({col})::int") if cls == 'bool' else col
+        parts.append(f"{count}({col})")
+        for agg in CLASS_AGGREGATES[cls]:
+            parts.append(f"{count}(DISTINCT {expr})" if agg == 'distinct' else f"{agg.upper()}({expr})")
+    return f"SELECT {', '.join(parts)} FROM {quote_ident(schema, dbtype)}.{quote_ident(table, dbtype)}"
+
+def parse_profile(row, columns):
+    # (row count, {column name: {'nulls', 'min', 'max', 'distinct'}}) from the profile_query result row
+    values = iter(row)
+    rows = next(values)
+    stats = {}
+    for name, cls in columns:
+        s = {'nulls': rows - next(values)}
+        for agg in CLASS_AGGREGATES[cls]:
+            s[agg] = next(values)
+        stats[name] = s
+    return rows, stats
+
+def report_value(value):
+    # Min/max as a report cell: numbers and naive dates as they are, anything else as text
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, Decimal)):
+        return value
+    if isinstance(value, (datetime.datetime, datetime.time)) and value.tzinfo is not None:
+        return value.isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value
+    return str(value)[:PROFILE_TEXT_CHARS]
+
+def values_close(cls, a, b):
+    # Whether two min/max values are equal within the tolerance of their type class
+    if a is None or b is None:
+        return a is None and b is None
+    try:
+        if cls == 'float':
+            a, b = float(a), float(b)
+            return abs(a - b) <= PROFILE_FLOAT_TOLERANCE * max(abs(a), abs(b), 1e-300)
+        if cls in ('integer', 'decimal', 'bool'):
+            return Decimal(str(a)) == Decimal(str(b))
+        if cls == 'temporal':
+            if isinstance(a, datetime.datetime) and isinstance(b, datetime.datetime) and (a.tzinfo is None) == (b.tzinfo is None):
+                return abs(a - b) <= PROFILE_TIME_TOLERANCE
+            return a == b
+        if cls == 'text':
+            return str(a).rstrip().casefold() == str(b).rstrip().casefold()
+    except (TypeError, ValueError, InvalidOperation, OverflowError):
+        pass
+    return str(a) == str(b)
+
+def compare_profile(cls, sql_rows, sql_stats, pg_rows, pg_stats):
+    # (Status, Reason) for one column; cls is the SQL Server side's type class
+    failures, notes = [], []
+    if sql_rows != pg_rows:
+        failures.append(f"Row count differs: {sql_rows} vs {pg_rows}")
+    elif sql_stats['nulls'] != pg_stats['nulls']:
+        failures.append(f"Null count differs: {sql_stats['nulls']} vs {pg_stats['nulls']}")
+    if 'distinct' in sql_stats and 'distinct' in pg_stats and sql_stats['distinct'] != pg_stats['distinct']:
+        message = f"Distinct count differs: {sql_stats['distinct']} vs {pg_stats['distinct']}"
+        (notes if cls == 'text' else failures).append(message)
+    for agg in ('min', 'max'):
+        if agg in sql_stats and agg in pg_stats and not values_close(cls, sql_stats[agg], pg_stats[agg]):
+            message = f"{agg.capitalize()} differs: {report_value(sql_stats[agg])} vs {report_value(pg_stats[agg])}"
+            (notes if cls == 'text' else failures).append(message)
+    reason = '; '.join(failures + [n + ' (collation-dependent)' for n in notes])
+    return ('MISMATCH' if failures else 'MATCHED'), reason or 'Profiles match'
+
+# Optimizer statistics (the ColumnStats tab) are sampled and may be stale, so their
+# estimates are compared loosely: null fractions within an absolute tolerance, row and
+# distinct counts within a factor. Histogram bounds come from samples (and PostgreSQL
+# leaves its most common values out of the histogram), so they are only noted.
+STATS_NULL_FRACTION_TOLERANCE = 0.05
+STATS_COUNT_RATIO = 2.0
+
+def count_ratio(a, b):
+    # Smoothed so that tiny counts (0 vs 1) are not flagged
+    return (max(a, b) + 1) / (min(a, b) + 1)
+
+def bound_differs(cls, a, b):
+    # Histogram bounds arrive as text; only numeric bounds are compared
+    if cls not in ('integer', 'decimal', 'float') or a is None or b is None:
+        return False
+    try:
+        a, b = float(a), float(b)
+    except ValueError:
+        return False
+    return abs(a - b) > PROFILE_FLOAT_TOLERANCE * max(abs(a), abs(b), 1.0)
+
+def compare_estimates(cls, sql, pg):
+    # (Status, Reason) for one column; sql and pg have 'rows', 'null_fraction', 'distinct', 'low', 'high' (None if unknown)
+    failures, notes = [], []
+    if sql['rows'] is not None and pg['rows'] is not None and count_ratio(sql['rows'], pg['rows']) > STATS_COUNT_RATIO:
+        failures.append(f"Estimated rows differ: {sql['rows']} vs {pg['rows']}")
+    if abs(sql['null_fraction'] - pg['null_fraction']) > STATS_NULL_FRACTION_TOLERANCE:
+        failures.append(f"Null fraction differs: {sql['null_fraction']:.3f} vs {pg['null_fraction']:.3f}")
+    if sql['distinct'] is not None and pg['distinct'] is not None and count_ratio(sql['distinct'], pg['distinct']) > STATS_COUNT_RATIO:
+        message = f"Estimated distinct values differ: {sql['distinct']} vs {pg['distinct']}"
+        (notes if cls == 'text' else failures).append(message)
+    for bound in ('low', 'high'):
+        if bound_differs(cls, sql[bound], pg[bound]):
+            notes.append(f"Histogram {bound} bound differs: {sql[bound]} vs {pg[bound]}")
+    reason = '; '.join(failures + [n + ' (estimate)' for n in notes])
+    return ('MISMATCH' if failures else 'MATCHED'), reason or 'Estimates agree'
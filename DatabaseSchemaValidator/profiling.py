@@ -0,0 +1,112 @@
+# profiling.py
+
+# Opt-in profiling hooks for validation runs (--profile cpu|memory|all).
+#
+# cpu:    each database run is wrapped in cProfile; stats are dumped to a .pstats
+#         file next to the report and the top functions are printed.
+# memory: tracemalloc snapshots are taken at phase boundaries (after each extract,
+#         compare and workbook save phase recorded by RunTimings) and the top
+#         allocations, growth since the previous boundary and traced peak are
+#         written to a text summary next to the report.
+import os
+import datetime
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_MODES = ('cpu', 'memory', 'all')
+
+# Phase kinds after which a memory snapshot is taken
+SNAPSHOT_PHASES = ('extract', 'compare', 'save')
+
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+
+class RunProfiler:
+    def __init__(self, mode, reports_dir, server, timings):
+        if mode not in (None,) + PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode!r} (expected one of {', '.join(PROFILE_MODES)})")
+        self.cpu = mode in ('cpu', 'all')
+        self.memory = mode in ('memory', 'all')
+        self.reports_dir = reports_dir
+        self.server = server
+        self.stamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M')
+        self.files = []
+        self._db = None
+        self._memory_file = None
+        self._last_snapshot = None
+        if self.memory:
+            timings.add_listener(self.phase_finished)
+
+    def _path(self, db, suffix):
+        return os.path.join(self.reports_dir, f"{self.server}_{db}_{suffix}")
+
+    @contextmanager
+    def database(self, db):
+        # Wraps one database run (extraction, comparison and report rendering)
+        if not (self.cpu or self.memory):
+            yield
+            return
+        self._db = db
+        profile = None
+        if self.memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(10)
+            self._last_snapshot = _take_snapshot()
+            path = self._path(db, f"Memory_{self.stamp}.txt")
+            self._memory_file = open(path, 'w', encoding='utf-8')
+            self._memory_file.write(f"Memory profile for {db} ({self.stamp})\n")
+            self.files.append(path)
+        if self.cpu:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                path = self._path(db, f"Profile_{self.stamp}.pstats")
+                profile.dump_stats(path)
+                self.files.append(path)
+                import io
+                import pstats
+                out = io.StringIO()
+                pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                print(f"\n[Profile] Top {TOP_FUNCTIONS} functions by cumulative time for {db}:")
+                print(out.getvalue())
+                print(f"[Profile] CPU profile written to {path} (open with: python -m pstats {os.path.basename(path)})")
+            if self.memory:
+                self._memory_file.close()
+                print(f"[Profile] Memory summary written to {self._memory_file.name}")
+                self._memory_file = None
+                self._last_snapshot = None
+                if started_tracing:
+                    tracemalloc.stop()
+            self._db = None
+
+    def phase_finished(self, rec):
+        # RunTimings listener: snapshot memory at extract/compare/save boundaries
+        if not self._memory_file or rec['db'] != self._db or rec['phase'] not in SNAPSHOT_PHASES:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshot = _take_snapshot()
+        f = self._memory_file
+        f.write(f"\n=== After {rec['entity']} {rec['phase']}: traced {current / 1048576:.1f} MB, "
+                f"phase peak {peak / 1048576:.1f} MB ===\n")
+        f.write(f"-- Top {TOP_ALLOCATIONS} allocations --\n")
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            f.write(f"{stat}\n")
+        if self._last_snapshot is not None:
+            f.write(f"-- Top {TOP_ALLOCATIONS} changes since previous boundary --\n")
+            for stat in snapshot.compare_to(self._last_snapshot, 'lineno')[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+        f.flush()
+        self._last_snapshot = snapshot
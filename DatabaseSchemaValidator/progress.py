@@ -0,0 +1,72 @@
+# progress.py
+
+# Live progress events for a validation run.
+#
+# ProgressPublisher turns RunTimings phase records and database start/finish
+# notifications into small event dicts and puts them on a thread-safe queue
+# (queue.Queue, or a multiprocessing queue/pipe wrapper with a put() method).
+# The UI drains the queue from its event loop; with no target every call is a
+# no-op so headless runs pay nothing. Events can be published from several threads
+# (parallel databases, background report rendering); puts are serialized.
+#
+# Event kinds:
+#   database_started  {db}
+#   phase_finished    {db, entity, phase, rows, rows_fetched, seconds}
+#   database_finished {db, report, seconds}
+#   database_failed   {db, error, seconds}
+#   database_cancelled {db, seconds}
+#   run_finished      {reports, failures, cancelled}
+import time
+import threading
+
+class ProgressPublisher:
+    def __init__(self, target=None):
+        self.target = target
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _put(self, kind, **event):
+        if self.target is None:
+            return
+        event['kind'] = kind
+        event['time'] = time.time()
+        try:
+            with self._lock:
+                self.target.put(event)
+        except Exception:
+            # Progress is best effort; never let a closed queue fail the run
+            pass
+
+    def database_started(self, db):
+        self._started[db] = time.perf_counter()
+        self._put('database_started', db=db)
+
+    def _elapsed(self, db):
+        start = self._started.get(db)
+        return round(time.perf_counter() - start, 2) if start is not None else None
+
+    def phase_finished(self, rec):
+        # RunTimings listener
+        self._put('phase_finished', db=rec['db'], entity=rec['entity'], phase=rec['phase'],
+                  rows=rec.get('rows'), rows_fetched=rec.get('rows_fetched'), seconds=rec.get('seconds'))
+
+    def database_finished(self, db, report):
+        self._put('database_finished', db=db, report=report, seconds=self._elapsed(db))
+
+    def database_failed(self, db, error):
+        self._put('database_failed', db=db, error=str(error), seconds=self._elapsed(db))
+
+    def database_cancelled(self, db):
+        self._put('database_cancelled', db=db, seconds=self._elapsed(db))
+
+    def run_finished(self, reports, failures, cancelled=()):
+        self._put('run_finished', reports=dict(reports), failures=dict(failures), cancelled=list(cancelled))
+
+class PipeProgress:
+    # Queue-like adapter that sends events over a multiprocessing Connection,
+    # so a worker process can publish to the UI process
+    def __init__(self, conn):
+        self.conn = conn
+
+    def put(self, event):
+        self.conn.send(event)
@@ -0,0 +1,118 @@
+# results_store.py
+
+# Compact SQLite sidecar of a run's compare rows, written next to each report
+# (<report name>.results.sqlite) so the UI can browse results without loading
+# the workbook. Rows are stored once, as JSON arrays in sheet column order,
+# with the sheet, Status and a lower-cased search key (the name/table/schema
+# columns) broken out and indexed for filtering and keyset paging.
+import os
+import json
+import sqlite3
+import pathlib
+
+RESULTS_DB_SUFFIX = '.results.sqlite'
+
+# Columns whose values make up the searchable object name
+NAME_COLUMN_HINTS = ('name', 'table', 'schema')
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE sheets (sheet TEXT PRIMARY KEY, position INTEGER, columns TEXT, total INTEGER);
+CREATE TABLE overview (position INTEGER, data TEXT);
+CREATE TABLE rows (id INTEGER PRIMARY KEY, sheet TEXT, status TEXT, name TEXT, data TEXT);
+"""
+
+INDEXES = """
+CREATE INDEX rows_sheet ON rows (sheet);
+CREATE INDEX rows_sheet_status ON rows (sheet, status);
+"""
+
+def results_db_path(report_path):
+    # Sidecar for a report file (.xlsx/.json) or a CSV report folder
+    base, ext = os.path.splitext(report_path)
+    return (base if ext.lower() in ('.xlsx', '.json') else report_path) + RESULTS_DB_SUFFIX
+
+def name_columns(columns):
+    return [i for i, c in enumerate(columns) if any(h in c.lower() for h in NAME_COLUMN_HINTS)]
+
+def write_results_db(result, overview_rows, path, columns_for, meta=None):
+    # columns_for(out_columns) -> ordered sheet columns (order_columns in SchemaValidatior)
+    # meta: extra string values stored in the meta table (report name, timings for the fleet rollup)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.executescript(SCHEMA)
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [('db', result['db']), ('server', result['server'])] +
+                         [(key, str(value)) for key, value in (meta or {}).items()])
+        conn.executemany('INSERT INTO overview VALUES (?, ?)',
+                         ((i, json.dumps(list(r), default=str)) for i, r in enumerate(overview_rows)))
+        for position, (sheet, compare_rows, out_columns) in enumerate(result['sheets']):
+            columns = columns_for(out_columns)
+            name_idx = name_columns(columns)
+            status_idx = columns.index('Status') if 'Status' in columns else None
+            def rows():
+                for row in compare_rows:
+                    values = [row.get(col, '') for col in columns]
+                    name = ' '.join(str(values[i]) for i in name_idx if values[i] not in (None, '')).lower()
+                    status = values[status_idx] if status_idx is not None else None
+                    yield sheet, status, name, json.dumps(values, default=str)
+            conn.executemany('INSERT INTO rows (sheet, status, name, data) VALUES (?, ?, ?, ?)', rows())
+            conn.execute('INSERT INTO sheets VALUES (?, ?, ?, ?)', (sheet, position, json.dumps(columns), len(compare_rows)))
+        conn.executescript(INDEXES)
+        conn.commit()
+    finally:
+        conn.close()
+    # Replace atomically so a viewer never opens a half-written file
+    os.replace(tmp_path, path)
+    return path
+
+class ResultsStore:
+    # Read-only access used by the results viewer
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(pathlib.Path(os.path.abspath(path)).as_uri() + '?mode=ro', uri=True, check_same_thread=False)
+
+    def close(self):
+        self.conn.close()
+
+    def meta(self):
+        return dict(self.conn.execute('SELECT key, value FROM meta'))
+
+    def sheets(self):
+        # [(sheet, columns, total rows)] in workbook order
+        return [(sheet, json.loads(columns), total) for sheet, columns, total in
+                self.conn.execute('SELECT sheet, columns, total FROM sheets ORDER BY position')]
+
+    def overview(self):
+        return [json.loads(data) for (data,) in self.conn.execute('SELECT data FROM overview ORDER BY position')]
+
+    def statuses(self, sheet):
+        # [(status, count)] for one sheet
+        return list(self.conn.execute(
+            'SELECT status, COUNT(*) FROM rows WHERE sheet = ? GROUP BY status ORDER BY status', (sheet,)))
+
+    def _where(self, sheet, status=None, search=None):
+        clauses, params = ['sheet = ?'], [sheet]
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if search:
+            term = search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            params.append(f'%{term}%')
+        return ' AND '.join(clauses), params
+
+    def count(self, sheet, status=None, search=None):
+        where, params = self._where(sheet, status, search)
+        return self.conn.execute(f'SELECT COUNT(*) FROM rows WHERE {where}', params).fetchone()[0]
+
+    def page(self, sheet, status=None, search=None, after_id=0, limit=200):
+        # Keyset paging: [(id, values)] with id > after_id; pass the last id to get the next page
+        where, params = self._where(sheet, status, search)
+        cursor = self.conn.execute(f'SELECT id, data FROM rows WHERE {where} AND id > ? ORDER BY id LIMIT ?',
+                                   params + [after_id, limit])
+        return [(row_id, json.loads(data)) for row_id, data in cursor]
@@ -0,0 +1,71 @@
+# rowdiff.py
+
+# Streaming row-level diff for the RowDiff tab.
+#
+# Both sides of a table are read in primary key order and merge-joined with
+# streaming.merge_join(), so memory stays constant however large the table is.
+# SQL Server rows come in fetchmany() batches and PostgreSQL rows through a
+# server-side cursor. Text keys are ordered with a binary collation on both
+# sides, and GUID keys by their text form, so both servers return keys in the
+# order Python compares them. If they still disagree, merge_join() raises
+# SortOrderError and the table is reported as failed.
+#
+# Values are normalized and compared like in the DataSample tab (sampling.py):
+# bit/boolean, datetime precision, money/numeric scale, uniqueidentifier/uuid case.
+# Every difference is counted, and the first ROW_DIFF_SAMPLE_ROWS per table are
+# kept for the report.
+from profiles import quote_ident
+from sampling import normalize_value, values_equal
+from streaming import fetch_batches, merge_join
+
+# Differences per table listed on the RowDiff Detail sheet
+ROW_DIFF_SAMPLE_ROWS = 100
+
+def key_order_expression(column, cls, dbtype):
+    col = quote_ident(column, dbtype)
+    if cls == 'guid':
+        return f"CONVERT(char(36), {col}) COLLATE Latin1_General_BIN2" if dbtype == 'sql' else f'{col}::text COLLATE "C"'
+    if cls == 'text':
+        return f"{col} COLLATE Latin1_General_BIN2" if dbtype == 'sql' else f'{col} COLLATE "C"'
+    return col
+
+def ordered_query(schema, table, columns, key_positions, classes, dbtype):
+    # Every compared column, in primary key order
+    order = ', '.join(key_order_expression(columns[i], classes[i], dbtype) for i in key_positions)
+    return (f"SELECT {', '.join(quote_ident(c, dbtype) for c in columns)} "
+            f"FROM {quote_ident(schema, dbtype)}.{quote_ident(table, dbtype)} ORDER BY {order}")
+
+def normalized_rows(cursor, classes, key_positions, batch_rows=None):
+    # (normalized key, normalized values) for every row of an executed cursor
+    for rows in fetch_batches(cursor, batch_rows):
+        for row in rows:
+            values = tuple(normalize_value(v, cls) for v, cls in zip(row, classes))
+            yield tuple(values[i] for i in key_positions), values
+
+def new_counts(columns):
+    return {'sql_rows': 0, 'pg_rows': 0, 'matched': 0, 'missing': 0, 'extra': 0, 'mismatched': 0,
+            'columns': dict.fromkeys(columns, 0)}
+
+def diff_streams(sql_rows, pg_rows, columns, classes, counts):
+    # Merge-joins two key-ordered normalized_rows() streams, updating counts; yields
+    # (key, column, sql value, pg value, status) for every difference
+    for sql, pg in merge_join(sql_rows, pg_rows, key=lambda r: r[0]):
+        if pg is None:
+            counts['sql_rows'] += 1
+            counts['missing'] += 1
+            yield sql[0], '', None, None, 'MISSING in PG'
+            continue
+        counts['pg_rows'] += 1
+        if sql is None:
+            counts['extra'] += 1
+            yield pg[0], '', None, None, 'EXTRA in PG'
+            continue
+        counts['sql_rows'] += 1
+        differing = [i for i, cls in enumerate(classes) if not values_equal(cls, sql[1][i], pg[1][i])]
+        if not differing:
+            counts['matched'] += 1
+            continue
+        counts['mismatched'] += 1
+        for i in differing:
+            counts['columns'][columns[i]] += 1
+            yield sql[0], columns[i], sql[1][i], pg[1][i], 'MISMATCH'
@@ -0,0 +1,155 @@
+# sampling.py
+
+# Sampled row comparison for the DataSample tab.
+#
+# Each table with a primary key gets a sample of at most SAMPLE_ROWS rows from
+# each side: TABLESAMPLE ... REPEATABLE reads a fixed set of pages, so the cost
+# depends on the sample size, not the table size, and repeated runs on unchanged
+# data sample the same rows. Each server's sample is sized from its own row
+# estimate, so both sides sample at about the same rate. Tables estimated at
+# SAMPLE_ROWS rows or fewer on both sides are read whole in key order instead;
+# if such a read comes back full, the estimate was stale and only the first rows
+# in key order were compared. Each side's sampled keys are then looked up on the
+# other side in batched key queries, and the rows are compared column by column
+# after type normalization. Keys sampled on SQL Server and not found in PostgreSQL are
+# missing, keys sampled on PostgreSQL and not found in SQL Server are extra.
+#
+# From the number of sampled rows that differ, the tab reports an upper bound on
+# the share of differing rows in the whole table (Wilson score interval with a
+# finite population correction).
+import math
+import statistics
+import uuid
+import datetime
+from decimal import Decimal
+
+from profiles import PROFILE_FLOAT_TOLERANCE, PROFILE_TIME_TOLERANCE, quote_ident
+
+# Keys sampled per table and side; the main cost knob
+SAMPLE_ROWS = 1000
+
+# Keys per lookup query (SQL Server allows at most 2100 parameters per statement)
+SAMPLE_BATCH_ROWS = 500
+SAMPLE_MAX_PARAMS = 2000
+
+# Seed for TABLESAMPLE ... REPEATABLE; change it to sample other pages
+SAMPLE_SEED = 20260101
+
+# Differences per table listed on the DataSample Detail sheet
+SAMPLE_DIFF_ROWS = 20
+
+# Confidence level of the reported bound
+SAMPLE_CONFIDENCE = 0.95
+
+# SQL Server types the drivers cannot fetch or compare meaningfully; left out of the sample
+SAMPLE_SKIP_TYPES = {'geography', 'geometry', 'hierarchyid', 'sql_variant', 'timestamp', 'rowversion'}
+
+def shared_estimate(sql_rows, pg_rows):
+    # One estimate decides for both sides whether the table is read whole, so that both
+    # read the same kind of sample; None when neither side has an estimate
+    known = [rows for rows in (sql_rows, pg_rows) if rows is not None]
+    return max(known) if known else None
+
+def is_full_read(est_rows):
+    # Small (or never analyzed) tables are read in key order instead of sampled
+    return est_rows is None or est_rows <= SAMPLE_ROWS
+
+def sample_query(schema, table, columns, key_columns, dbtype, est_rows, side_rows=None):
+    # Rows of a repeatable page sample of about SAMPLE_ROWS rows; the first SAMPLE_ROWS in key order for small tables.
+    # est_rows is the shared estimate; side_rows, this server's own estimate, sizes PostgreSQL's sample
+    # (SQL Server sizes TABLESAMPLE ... ROWS from its own statistics)
+    select = ', '.join(quote_ident(c, dbtype) for c in columns)
+    keys = ', '.join(quote_ident(c, dbtype) for c in key_columns)
+    source = f"{quote_ident(schema, dbtype)}.{quote_ident(table, dbtype)}"
+    if is_full_read(est_rows):
+        if dbtype == 'sql':
+            return f"SELECT TOP ({SAMPLE_ROWS}) {select} FROM {source} ORDER BY {keys}"
+        return f"SELECT {select} FROM {source} ORDER BY {keys} LIMIT {SAMPLE_ROWS}"
+    if dbtype == 'sql':
+        return (f"SELECT TOP ({SAMPLE_ROWS}) {select} FROM {source} "
+                f"TABLESAMPLE ({2 * SAMPLE_ROWS} ROWS) REPEATABLE ({SAMPLE_SEED})")
+    rows = side_rows if side_rows else est_rows
+    percent = min(100.0, 200.0 * SAMPLE_ROWS / rows)
+    return (f"SELECT {select} FROM {source} TABLESAMPLE SYSTEM ({percent:.6f}) "
+            f"REPEATABLE ({SAMPLE_SEED}) LIMIT {SAMPLE_ROWS}")
+
+def lookup_batches(keys, key_width):
+    # Key batches that stay under the parameter limit
+    size = max(1, min(SAMPLE_BATCH_ROWS, SAMPLE_MAX_PARAMS // max(key_width, 1)))
+    for start in range(0, len(keys), size):
+        yield keys[start:start + size]
+
+def lookup_query(schema, table, columns, key_columns, n_keys, dbtype):
+    # SELECT of columns for n_keys keys, with one placeholder per key value (? for pyodbc, %s for psycopg2)
+    text = (f"SELECT {', '.join(quote_ident(c, dbtype) for c in columns)} "
+            f"FROM {quote_ident(schema, dbtype)}.{quote_ident(table, dbtype)} WHERE ")
+    keys = [quote_ident(c, dbtype) for c in key_columns]
+    if dbtype == 'pg':
+        # psycopg2 reads % as a placeholder marker
+        text, keys, mark = text.replace('%', '%%'), [k.replace('%', '%%') for k in keys], '%s'
+    else:
+        mark = '?'
+    if len(keys) == 1:
+        return text + f"{keys[0]} IN ({', '.join([mark] * n_keys)})"
+    if dbtype == 'pg':
+        row = '(' + ', '.join([mark] * len(keys)) + ')'
+        return text + f"({', '.join(keys)}) IN ({', '.join([row] * n_keys)})"
+    row = '(' + ' AND '.join(f"{k} = {mark}" for k in keys) + ')'
+    return text + ' OR '.join([row] * n_keys)
+
+def normalize_value(value, cls):
+    # Comparable form of a fetched value: drivers differ in the Python types they return
+    if value is None:
+        return None
+    if cls == 'guid':
+        return str(value).lower()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, Decimal):
+        return value.normalize()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str) and cls == 'text':
+        return value.rstrip()  # char(n) padding
+    return value
+
+def values_equal(cls, a, b):
+    # Normalized values equal, within the float and datetime tolerances of profiles.py
+    if a is None or b is None:
+        return a is None and b is None
+    if cls == 'float' and isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= PROFILE_FLOAT_TOLERANCE * max(abs(a), abs(b), 1e-300)
+    if cls == 'temporal' and isinstance(a, datetime.datetime) and isinstance(b, datetime.datetime):
+        return abs(a - b) <= PROFILE_TIME_TOLERANCE
+    return a == b
+
+def difference_bound(sampled, differing, population=None):
+    # Upper confidence bound on the share of differing rows in a table of population rows
+    if not sampled:
+        return None
+    if population is not None and sampled >= population:
+        return differing / sampled  # the whole table was compared
+    z = statistics.NormalDist().inv_cdf((1 + SAMPLE_CONFIDENCE) / 2)
+    p = differing / sampled
+    spread = z * math.sqrt(p * (1 - p) / sampled + z * z / (4 * sampled * sampled))
+    if population is not None and population > 1:
+        spread *= math.sqrt((population - sampled) / (population - 1))
+    return min(1.0, (p + z * z / (2 * sampled) + spread) / (1 + z * z / sampled))
+
+def prefix_text(sampled, differing):
+    # A key-ordered read that hit SAMPLE_ROWS is the start of the table, not a random sample: no bound
+    return (f"{differing} of {sampled} rows differ among the first {SAMPLE_ROWS} keys in key order; "
+            f"the table is larger than its row estimate, so no bound is given for the rest")
+
+def bound_text(sampled, differing, population=None):
+    bound = difference_bound(sampled, differing, population)
+    if bound is None:
+        return 'No rows sampled'
+    if population is not None and sampled >= population:
+        return f"{differing} of {sampled} rows differ (whole table compared)"
+    total = f" of ~{population:,} rows" if population else ''
+    return f"{differing} of {sampled} sampled rows differ; at most {bound:.2%}{total} differ ({SAMPLE_CONFIDENCE:.0%} confidence)"
@@ -0,0 +1,48 @@
+# sequences.py
+
+# Identity/sequence consistency for the Sequences tab.
+#
+# A PostgreSQL sequence that is behind the data it feeds makes the next INSERT
+# fail with a duplicate key. SQL Server identities and the sequences behind PG
+# serial/identity columns (or nextval() defaults) are each read with one
+# catalog query, and the highest key of every sequence-fed PG column is read
+# with MAX() probes: several tables per statement, each probe an index seek
+# when the column is indexed (as identity keys usually are).
+from profiles import quote_ident
+
+# MAX() probes per statement
+SEQUENCE_PROBE_BATCH = 50
+
+def probe_query(targets, dbtype):
+    # One row with the highest (lowest, for descending sequences) value of each (schema, table, column, descending)
+    parts = []
+    for schema, table, column, descending in targets:
+        agg = 'MIN' if descending else 'MAX'
+        parts.append(f"(SELECT {agg}({quote_ident(column, dbtype)}) FROM {quote_ident(schema, dbtype)}.{quote_ident(table, dbtype)})")
+    return f"SELECT {', '.join(parts)}"
+
+def next_value(seq):
+    # Value the next nextval() returns; last_value is None until the sequence is first used
+    if seq['last_value'] is None:
+        return seq['start_value']
+    return seq['last_value'] + seq['increment']
+
+def setval_sql(seq, max_key):
+    return f"SELECT setval('{seq['sequence']}', {max_key})"
+
+def compare_sequence(sql, seq, max_key):
+    # (Status, Reason) for an identity column and the PG sequence feeding the same column
+    if seq['increment'] is None or (seq['last_value'] is None and seq['start_value'] is None):
+        return 'MISMATCH', 'Sequence state not readable (needs SELECT or USAGE on the sequence)'
+    upward = seq['increment'] > 0
+    nxt = next_value(seq)
+    failures, notes = [], []
+    if max_key is not None and (nxt <= max_key if upward else nxt >= max_key):
+        failures.append(f"Sequence behind data: next value {nxt}, highest key {max_key}; fix with {setval_sql(seq, max_key)}")
+    if sql is not None:
+        if sql['last_value'] is not None and (nxt <= sql['last_value'] if upward else nxt >= sql['last_value']):
+            notes.append(f"Next value {nxt} is not past the SQL Server identity ({sql['last_value']})")
+        if sql['increment'] is not None and sql['increment'] != seq['increment']:
+            notes.append(f"Increment differs: {sql['increment']} vs {seq['increment']}")
+    reason = '; '.join(failures + notes)
+    return ('MISMATCH' if failures else 'MATCHED'), reason or f"Next value {nxt} is past the highest key"
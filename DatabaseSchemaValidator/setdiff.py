@@ -0,0 +1,101 @@
+# setdiff.py
+
+# Grouped set difference for the table-wise tabs (Constraints, Indexes, Triggers).
+#
+# group_names() reads a side's records once into {(schema, table): {name: kinds}},
+# keeping only base tables, so names are deduplicated as they are grouped.
+# grouped_set_diff() then walks the union of tables once and splits each table's
+# names into matched, missing in PG and extra in PG with set operations on match
+# keys; an optional related() predicate (prefix or containment matching of
+# truncated names) is only tried for the keys left over. Each table diff carries
+# the sorted names for the per-table summary row and the matched/missing/extra
+# names for per-object detail rows.
+
+def group_names(records, allowed_tables=None, name_of=None, kind_of=None):
+    # {(schema, table): {name: set of kinds}} for annotated records of allowed_tables (None: all tables)
+    groups = {}
+    for rec in records:
+        key = (rec['_schema'], rec['_table'])
+        if allowed_tables is not None and key not in allowed_tables:
+            continue
+        name = name_of(rec) if name_of else rec.get('name', '')
+        kinds = groups.setdefault(key, {}).setdefault(name, set())
+        if kind_of:
+            kinds.add(kind_of(rec))
+    return groups
+
+def count_names(groups):
+    # Distinct names over all tables of group_names() output (the Overview totals)
+    return sum(len(names) for names in groups.values())
+
+def keyed_names(names, match_key):
+    # {match key: [names]} for the names of one table
+    keyed = {}
+    for name in sorted(names):
+        keyed.setdefault(match_key(name, names[name]), []).append(name)
+    return keyed
+
+def grouped_set_diff(sql_groups, pg_groups, match_key=None, related=None):
+    # Yields one diff per (schema, table), in key order:
+    # {'key', 'sql_names', 'pg_names' (sorted), 'sql_kinds', 'pg_kinds' ({kind: count}),
+    #  'matched' ([(sql_name, pg_name)]), 'missing' and 'extra' (sorted names)}
+    match_key = match_key or (lambda name, kinds: name)
+    empty = {}
+    for key in sorted(set(sql_groups) | set(pg_groups)):
+        sql_names = sql_groups.get(key, empty)
+        pg_names = pg_groups.get(key, empty)
+        sql_keyed = keyed_names(sql_names, match_key)
+        pg_keyed = keyed_names(pg_names, match_key)
+        sql_keys, pg_keys = set(sql_keyed), set(pg_keyed)
+        pairs = {k: k for k in sql_keys & pg_keys}
+        missing_keys, extra_keys = sql_keys - pg_keys, pg_keys - sql_keys
+        if related and (missing_keys or extra_keys):
+            # A key with a related key anywhere on the other side counts as present
+            pg_sorted, sql_sorted = sorted(pg_keys), sorted(sql_keys)
+            for k in sorted(missing_keys):
+                other = next((p for p in pg_sorted if related(k, p)), None)
+                if other is not None:
+                    pairs[k] = other
+                    missing_keys.discard(k)
+            for k in sorted(extra_keys):
+                if any(related(s, k) for s in sql_sorted):
+                    extra_keys.discard(k)
+        matched = []
+        for k in sorted(pairs):
+            matched.extend(pair_names(sql_keyed[k], pg_keyed[pairs[k]]))
+        yield {
+            'key': key,
+            'sql_names': sorted(sql_names),
+            'pg_names': sorted(pg_names),
+            'sql_kinds': kind_counts(sql_names),
+            'pg_kinds': kind_counts(pg_names),
+            'matched': matched,
+            'missing': sorted(n for k in missing_keys for n in sql_keyed[k]),
+            'extra': sorted(n for k in extra_keys for n in pg_keyed[k]),
+        }
+
+def pair_names(sql_names, pg_names):
+    # Pairs names sharing a match key in order; surplus names on either side pair with the other side's last name
+    n = max(len(sql_names), len(pg_names))
+    return [(sql_names[min(i, len(sql_names) - 1)], pg_names[min(i, len(pg_names) - 1)]) for i in range(n)]
+
+def kind_counts(names):
+    # {kind: number of distinct names of that kind}
+    counts = {}
+    for kinds in names.values():
+        for kind in kinds:
+            counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+DETAIL_COLUMNS = ['schema', 'table', 'sql_name', 'pg_name', 'Status']
+
+def detail_rows(diffs):
+    # One row per object of each table diff: MATCHED, MISSING in PG or EXTRA in PG
+    for diff in diffs:
+        schema, table = diff['key']
+        for sql_name, pg_name in diff['matched']:
+            yield {'schema': schema, 'table': table, 'sql_name': sql_name, 'pg_name': pg_name, 'Status': 'MATCHED'}
+        for name in diff['missing']:
+            yield {'schema': schema, 'table': table, 'sql_name': name, 'pg_name': '', 'Status': 'MISSING in PG'}
+        for name in diff['extra']:
+            yield {'schema': schema, 'table': table, 'sql_name': '', 'pg_name': name, 'Status': 'EXTRA in PG'}
@@ -0,0 +1,148 @@
+# streaming.py
+
+# Sorted-merge comparison for catalog-scale tabs.
+#
+# Instead of extracting complete SQL and PG lists and joining them through dict
+# indexes, both sides are read in match-key order from the server (ORDER BY on
+# the normalized key, binary collation) in fetchmany() batches and joined with
+# merge_join(), one key at a time. Compare rows go straight into a RowSpool, a
+# list-like store backed by a temporary file, so neither the inputs nor the
+# output of the comparison are held in memory.
+#
+# Server and Python ordering can disagree on unusual names (non-ASCII case
+# folding, whitespace other than spaces); key_runs() checks the order as it
+# reads and raises SortOrderError, and callers fall back to the in-memory path.
+import os
+import pickle
+import tempfile
+import threading
+from itertools import islice
+
+# Rows per fetchmany() round trip on the streaming extract cursors
+STREAM_BATCH_ROWS = 5000
+
+# Compare rows kept in memory before a RowSpool pickles them to its file
+SPOOL_BATCH_ROWS = 2000
+
+class SortOrderError(Exception):
+    # Input of merge_join was not in key order
+    pass
+
+def fetch_batches(cursor, batch_rows=None):
+    # Yield the rows of an executed cursor as fetchmany() lists
+    batch_rows = batch_rows or STREAM_BATCH_ROWS
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield rows
+
+def key_runs(records, key, side):
+    # Group consecutive records with the same key: yields (key, [records])
+    run_key, run = None, []
+    for rec in records:
+        k = key(rec)
+        if run and k != run_key:
+            if k < run_key:
+                raise SortOrderError(f"{side} rows are not in match-key order ({run_key!r} came before {k!r})")
+            yield run_key, run
+            run = []
+        run_key = k
+        run.append(rec)
+    if run:
+        yield run_key, run
+
+def merge_join(sql_records, pg_records, key):
+    # Full outer join of two key-sorted iterables: yields (sql, pg), None for the missing side.
+    # A key repeated on one side pairs its last rows (like the dict matchers); the rest are unpaired.
+    sql_runs = key_runs(sql_records, key, 'SQL Server')
+    pg_runs = key_runs(pg_records, key, 'PostgreSQL')
+    sql_key, sql_run = next(sql_runs, (None, None))
+    pg_key, pg_run = next(pg_runs, (None, None))
+    while sql_run is not None or pg_run is not None:
+        if pg_run is None or (sql_run is not None and sql_key < pg_key):
+            for sql in sql_run:
+                yield sql, None
+            sql_key, sql_run = next(sql_runs, (None, None))
+        elif sql_run is None or pg_key < sql_key:
+            for pg in pg_run:
+                yield None, pg
+            pg_key, pg_run = next(pg_runs, (None, None))
+        else:
+            for sql in sql_run[:-1]:
+                yield sql, None
+            yield sql_run[-1], pg_run[-1]
+            for pg in pg_run[:-1]:
+                yield None, pg
+            sql_key, sql_run = next(sql_runs, (None, None))
+            pg_key, pg_run = next(pg_runs, (None, None))
+
+class RowSpool:
+    # Append-only store of compare rows in a temporary file, in pickled batches.
+    # Behaves like the row lists the writers expect: append(), len() and repeated
+    # (also concurrent) iteration in insertion order.
+    def __init__(self, batch_rows=None):
+        self._file = tempfile.TemporaryFile()
+        self._lock = threading.Lock()
+        self._frames = []  # file offset of each pickled batch
+        self._batch = []
+        self._batch_rows = batch_rows or SPOOL_BATCH_ROWS
+        self._count = 0
+
+    def append(self, row):
+        self._batch.append(row)
+        self._count += 1
+        if len(self._batch) >= self._batch_rows:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            self._frames.append(self._file.tell())
+            pickle.dump(self._batch, self._file, pickle.HIGHEST_PROTOCOL)
+        self._batch = []
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        frames, tail = list(self._frames), list(self._batch)
+        for offset in frames:
+            with self._lock:
+                self._file.seek(offset)
+                rows = pickle.load(self._file)
+            yield from rows
+        yield from tail
+
+    def iter_range(self, start, stop):
+        # Rows [start, stop), reading from the batch that holds start onwards: every
+        # pickled batch holds exactly batch_rows rows, so it is found by its offset
+        frames, tail = list(self._frames), list(self._batch)
+        size = self._batch_rows
+        for index in range(start // size, len(frames)):
+            if index * size >= stop:
+                return
+            with self._lock:
+                self._file.seek(frames[index])
+                rows = pickle.load(self._file)
+            yield from rows[max(start - index * size, 0):stop - index * size]
+        base = len(frames) * size
+        yield from tail[max(start - base, 0):max(stop - base, 0)]
+
+    def close(self):
+        self._file.close()
+
+class RowRange:
+    # Re-iterable rows [start, stop) of a compare row list or RowSpool, without copying them
+    def __init__(self, rows, start, stop):
+        self.rows = rows
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        if isinstance(self.rows, RowSpool):
+            return self.rows.iter_range(self.start, self.stop)
+        return islice(iter(self.rows), self.start, self.stop)
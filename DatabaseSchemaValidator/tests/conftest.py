@@ -0,0 +1,8 @@
+# conftest.py
+
+# The validator's modules are imported by name from DatabaseSchemaValidator/, as the
+# app and the CLI do.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import pytest
+
+import SchemaValidatior
+from normalization import annotate, normalize_default
+from SchemaValidatior import column_differences, compare_columns
+
+def col(table, name, datatype, nullable='YES', default=None, dbtype='sql'):
+    return {'schema': 'dbo', 'table': table, 'name': name, 'datatype': datatype, 'nullable': nullable,
+            'default': default, 'fullname': f"dbo.{table}", 'dbtype': dbtype}
+
+@pytest.mark.parametrize('sql, pg, datatype', [
+    ('((0))', "'0'::integer", 'int'),
+    ('((-1))', "'-1'::integer", 'int'),
+    ("(N'abc')", "'abc'::character varying", 'nvarchar'),
+    ('(getdate())', 'now()', 'datetime'),
+    ('(newid())', 'gen_random_uuid()', 'uniqueidentifier'),
+    (None, None, 'int'),
+])
+def test_defaults_equal_after_normalization(sql, pg, datatype):
+    assert normalize_default(sql, datatype) == normalize_default(pg, datatype)
+
+def test_bit_defaults_compare_with_booleans():
+    assert normalize_default('((1))', 'bit') == normalize_default('true', 'boolean')
+    assert normalize_default('((0))', 'bit') != normalize_default('true', 'boolean')
+
+def test_column_differences():
+    assert column_differences(col('t', 'a', 'int', 'NO', '((0))'), col('t', 'a', 'integer', 'NO', '0', 'pg')) == ''
+    assert column_differences(col('t', 'a', 'int', 'NO'), col('t', 'a', 'text', 'YES', '5', 'pg')) == (
+        'Type differs: int vs text; Nullable differs: NO vs YES; Default differs: none vs 5')
+
+def test_sequence_defaults_are_left_to_the_sequences_tab():
+    assert column_differences(col('t', 'id', 'int', 'NO'), col('t', 'id', 'integer', 'NO', "nextval('t_id_seq'::regclass)", 'pg')) == ''
+
+def test_attribute_check_is_opt_in(monkeypatch):
+    sql = annotate([col('T', 'A_B', 'int', 'NO'), col('T', 'gone', 'int')])
+    pg = annotate([col('t', 'ab', 'integer', 'YES', dbtype='pg')])
+    assert [r['Status'] for r in compare_columns(sql, pg)] == ['MATCHED', 'MISSING in PG']
+    monkeypatch.setattr(SchemaValidatior, 'COMPARE_COLUMN_ATTRIBUTES', True)
+    rows = compare_columns(sql, pg)
+    assert [(r['Status'], r['Reason']) for r in rows] == [('MISMATCH', 'Nullable differs: NO vs YES'), ('MISSING in PG', '')]
@@ -0,0 +1,91 @@
+import datetime
+import decimal
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import dbreplay
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = None
+
+    def execute(self, sql, *params):
+        self.description = [('id', None, None, None, None, None, None), ('amount', None, None, None, None, None, None),
+                            ('at', None, None, None, None, None, None)]
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def capture_dir(tmp_path):
+    yield str(tmp_path)
+    dbreplay.configure()
+
+def no_driver():
+    raise AssertionError('replay must not connect')
+
+def test_replay_serves_recorded_rows(capture_dir):
+    rows = [(1, decimal.Decimal('1.50'), datetime.datetime(2026, 1, 1, 12, 30))]
+    dbreplay.configure('record', capture_dir)
+    conn = dbreplay.open_connection(lambda: FakeConnection(rows), 'sql', 'db1')
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, amount, at\n  FROM dbo.orders')
+    assert cursor.fetchall() == rows
+    conn.close()
+    dbreplay.configure('replay', capture_dir)
+    replayed = dbreplay.open_connection(no_driver, 'sql', 'db1').cursor()
+    replayed.execute('SELECT id,   amount, at FROM dbo.orders')
+    assert replayed.fetchall() == rows
+    assert [d[0] for d in replayed.description] == ['id', 'amount', 'at']
+    with pytest.raises(dbreplay.ReplayError, match='not recorded'):
+        replayed.execute('SELECT 2')
+
+def test_replay_without_capture_raises(capture_dir):
+    dbreplay.configure('replay', capture_dir)
+    with pytest.raises(FileNotFoundError):
+        dbreplay.open_connection(no_driver, 'pg', 'missing')
+
+def test_script_configures_the_module_the_validator_uses(tmp_path):
+    # python dbreplay.py replay: SchemaValidatior's connections must come from the capture,
+    # with no database driver importable
+    with open(tmp_path / 'pg_db1.json', 'w', encoding='utf-8') as f:
+        json.dump({'version': dbreplay.CAPTURE_VERSION, 'queries': [
+            {'sql': 'SELECT version()', 'params': None, 'columns': ['version'], 'rows': [['PostgreSQL 16']]}]}, f)
+    script = textwrap.dedent(f"""
+        import runpy, sys
+        sys.modules['pyodbc'] = sys.modules['psycopg2'] = None
+        sys.path.insert(0, {MODULE_DIR!r})
+        import SchemaValidatior
+        def main():
+            cursor = SchemaValidatior.get_postgres_connection('db1').cursor()
+            cursor.execute('SELECT version()')
+            print('served', cursor.fetchone()[0])
+        SchemaValidatior.main = main
+        sys.argv = ['dbreplay.py', 'replay', '--dir', {str(tmp_path)!r}]
+        runpy.run_path({os.path.join(MODULE_DIR, 'dbreplay.py')!r}, run_name='__main__')
+    """)
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert 'served PostgreSQL 16' in result.stdout
+    assert 'Connections: 1, round trips: 1, rows served: 1' in result.stdout
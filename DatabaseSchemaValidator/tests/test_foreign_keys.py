@@ -0,0 +1,49 @@
+from normalization import annotate
+from SchemaValidatior import match_foreign_keys
+
+def fk(name, columns='customer_id', ref_table='customers', ref_columns='id', on_update='no action',
+       on_delete='no action', table='orders', dbtype='sql'):
+    return {'schema': 'dbo', 'table': table, 'name': name, 'columns': columns, 'ref_schema': 'dbo',
+            'ref_table': ref_table, 'ref_columns': ref_columns, 'references': f"dbo.{ref_table} ({ref_columns})",
+            'on_update': on_update, 'on_delete': on_delete, 'dbtype': dbtype}
+
+def match(sql, pg):
+    return [(s and s['name'], p and p['name'], reason) for s, p, reason in match_foreign_keys(annotate(sql), annotate(pg))]
+
+def test_identical_keys_match():
+    assert match([fk('FK_Orders_Customers')], [fk('fk_orders_customers', dbtype='pg')]) == [
+        ('FK_Orders_Customers', 'fk_orders_customers', '')]
+
+def test_renamed_key_matches_on_signature():
+    assert match([fk('FK_Orders_Customers')], [fk('orders_customer_id_fkey', dbtype='pg')]) == [
+        ('FK_Orders_Customers', 'orders_customer_id_fkey', 'Renamed')]
+
+def test_column_names_normalized_like_columns_tab():
+    sql = [fk('FK_A', columns='CustomerID', ref_columns='ID')]
+    pg = [fk('fk_a', columns='customer_id', ref_columns='id', dbtype='pg')]
+    assert match(sql, pg) == [('FK_A', 'fk_a', '')]
+
+def test_key_differing_only_in_rules_is_reported():
+    sql = [fk('FK_A', on_delete='cascade')]
+    pg = [fk('fk_b', on_delete='no action', dbtype='pg')]
+    assert match(sql, pg) == [('FK_A', 'fk_b', 'ON DELETE differs: cascade vs no action')]
+
+def test_restrict_counts_as_no_action():
+    assert match([fk('FK_A')], [fk('fk_a', on_update='restrict', dbtype='pg')]) == [('FK_A', 'fk_a', '')]
+
+def test_same_name_different_columns_and_reference():
+    sql = [fk('FK_A', columns='customer_id', ref_table='customers')]
+    pg = [fk('fk_a', columns='client_id', ref_table='clients', dbtype='pg')]
+    assert match(sql, pg) == [('FK_A', 'fk_a', 'Columns differ: customer_id vs client_id; '
+                                               'References differ: dbo.customers (id) vs dbo.clients (id)')]
+
+def test_unmatched_keys_on_either_side():
+    sql = [fk('FK_A'), fk('FK_Lines', table='order_lines', columns='order_id', ref_table='orders')]
+    pg = [fk('fk_a', dbtype='pg'), fk('fk_x', table='invoices', columns='order_id', ref_table='orders', dbtype='pg')]
+    assert match(sql, pg) == [('FK_A', 'fk_a', ''), ('FK_Lines', None, ''), (None, 'fk_x', '')]
+
+def test_signature_match_wins_over_name_match():
+    # FK_A keeps its name in PG but changed structure; an identical key renamed fk_b exists
+    sql = [fk('FK_A')]
+    pg = [fk('fk_a', on_delete='cascade', dbtype='pg'), fk('fk_b', dbtype='pg')]
+    assert match(sql, pg) == [('FK_A', 'fk_b', 'Renamed'), (None, 'fk_a', '')]
@@ -0,0 +1,53 @@
+import statistics
+
+import pytest
+
+from sampling import (SAMPLE_CONFIDENCE, SAMPLE_ROWS, bound_text, difference_bound, is_full_read, prefix_text,
+                      sample_query, shared_estimate)
+
+Z = statistics.NormalDist().inv_cdf((1 + SAMPLE_CONFIDENCE) / 2)
+
+def test_bound_with_no_differences():
+    # Wilson upper bound at p = 0 is z^2 / (n + z^2)
+    assert difference_bound(1000, 0) == pytest.approx(Z * Z / (1000 + Z * Z))
+
+def test_bound_with_every_row_different():
+    assert difference_bound(1000, 1000) == pytest.approx(1.0)
+
+def test_bound_grows_with_differences():
+    bounds = [difference_bound(1000, d) for d in (0, 1, 10, 100)]
+    assert bounds == sorted(bounds)
+    assert all(d / 1000 <= b for d, b in zip((0, 1, 10, 100), bounds))
+
+def test_finite_population_correction_tightens_the_bound():
+    assert difference_bound(1000, 5, population=2000) < difference_bound(1000, 5, population=10 ** 9)
+    assert difference_bound(1000, 5, population=10 ** 9) == pytest.approx(difference_bound(1000, 5), rel=1e-3)
+
+def test_whole_table_is_exact():
+    assert difference_bound(200, 3, population=200) == pytest.approx(3 / 200)
+    assert bound_text(200, 3, 200) == '3 of 200 rows differ (whole table compared)'
+
+def test_no_rows():
+    assert difference_bound(0, 0) is None
+    assert bound_text(0, 0) == 'No rows sampled'
+
+def test_prefix_read_gives_no_bound():
+    assert 'no bound' in prefix_text(SAMPLE_ROWS, 2)
+    assert '%' not in prefix_text(SAMPLE_ROWS, 2)
+
+def test_shared_estimate_and_full_read():
+    assert shared_estimate(None, None) is None
+    assert shared_estimate(10, None) == 10
+    assert shared_estimate(10, 5000) == 5000
+    assert is_full_read(None) and is_full_read(SAMPLE_ROWS) and not is_full_read(SAMPLE_ROWS + 1)
+
+def test_pg_sample_sized_from_its_own_estimate():
+    est = 100 * SAMPLE_ROWS
+    own = sample_query('dbo', 't', ['id'], ['id'], 'pg', est, 10 * est)
+    shared = sample_query('dbo', 't', ['id'], ['id'], 'pg', est)
+    assert 'TABLESAMPLE SYSTEM (0.200000)' in own
+    assert 'TABLESAMPLE SYSTEM (2.000000)' in shared
+
+def test_small_tables_read_in_key_order():
+    assert sample_query('dbo', 't', ['id', 'v'], ['id'], 'sql', 10) == f'SELECT TOP ({SAMPLE_ROWS}) [id], [v] FROM [dbo].[t] ORDER BY [id]'
+    assert sample_query('dbo', 't', ['id'], ['id'], 'pg', None) == f'SELECT "id" FROM "dbo"."t" ORDER BY "id" LIMIT {SAMPLE_ROWS}'
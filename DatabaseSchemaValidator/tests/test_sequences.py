@@ -0,0 +1,42 @@
+from sequences import compare_sequence, next_value, probe_query, setval_sql
+
+def seq(last_value, increment=1, start_value=1, name='dbo.orders_id_seq'):
+    return {'sequence': name, 'last_value': last_value, 'increment': increment, 'start_value': start_value}
+
+def identity(last_value, increment=1):
+    return {'last_value': last_value, 'increment': increment}
+
+def test_next_value_equal_to_highest_key_is_a_mismatch():
+    # nextval() would return 100, which the table already holds
+    status, reason = compare_sequence(None, seq(99), 100)
+    assert status == 'MISMATCH'
+    assert reason == f"Sequence behind data: next value 100, highest key 100; fix with {setval_sql(seq(99), 100)}"
+
+def test_sequence_past_the_highest_key_matches():
+    assert compare_sequence(identity(100), seq(100), 100) == ('MATCHED', 'Next value 101 is past the highest key')
+
+def test_unused_sequence_starts_at_start_value():
+    assert next_value(seq(None, start_value=1)) == 1
+    assert compare_sequence(None, seq(None), 500)[0] == 'MISMATCH'
+    assert compare_sequence(None, seq(None, start_value=501), 500)[0] == 'MATCHED'
+
+def test_empty_table():
+    assert compare_sequence(None, seq(None), None)[0] == 'MATCHED'
+
+def test_descending_sequence_compares_against_the_lowest_key():
+    # Next value -10 is already taken; the one after, -11, is free
+    assert compare_sequence(None, seq(-9, increment=-1), -10)[0] == 'MISMATCH'
+    assert compare_sequence(None, seq(-10, increment=-1), -10)[0] == 'MATCHED'
+
+def test_sql_server_identity_differences_are_notes():
+    status, reason = compare_sequence(identity(200, increment=2), seq(150), 100)
+    assert status == 'MATCHED'
+    assert reason == 'Next value 151 is not past the SQL Server identity (200); Increment differs: 2 vs 1'
+
+def test_unreadable_sequence_state():
+    status, reason = compare_sequence(None, seq(None, increment=None, start_value=None), 10)
+    assert status == 'MISMATCH' and 'not readable' in reason
+
+def test_probe_query_reads_max_and_min_per_table():
+    assert probe_query([('dbo', 'orders', 'id', False), ('dbo', 'refunds', 'id', True)], 'pg') == (
+        'SELECT (SELECT MAX("id") FROM "dbo"."orders"), (SELECT MIN("id") FROM "dbo"."refunds")')
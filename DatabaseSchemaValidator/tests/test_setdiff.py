@@ -0,0 +1,71 @@
+import pytest
+
+import SchemaValidatior
+from instrumentation import RunTimings
+from setdiff import count_names, detail_rows, group_names, grouped_set_diff
+
+def rec(table, name, kind='PRIMARY KEY', schema='dbo'):
+    return {'_schema': schema, '_table': table, 'name': name, 'kind': kind}
+
+def test_group_names_deduplicates_and_filters_tables():
+    records = [rec('a', 'pk_a'), rec('a', 'pk_a', 'UNIQUE'), rec('a', 'ix_a'), rec('b', 'pk_b'), rec('view', 'x')]
+    groups = group_names(records, allowed_tables={('dbo', 'a'), ('dbo', 'b')}, kind_of=lambda r: r['kind'])
+    assert groups == {('dbo', 'a'): {'pk_a': {'PRIMARY KEY', 'UNIQUE'}, 'ix_a': {'PRIMARY KEY'}},
+                      ('dbo', 'b'): {'pk_b': {'PRIMARY KEY'}}}
+    assert count_names(groups) == 3
+
+def test_grouped_set_diff_splits_matched_missing_extra():
+    sql = group_names([rec('a', 'pk_a'), rec('a', 'ix_one'), rec('b', 'pk_b')])
+    pg = group_names([rec('a', 'pk_a'), rec('a', 'ix_two'), rec('c', 'pk_c')])
+    diffs = {d['key']: d for d in grouped_set_diff(sql, pg)}
+    assert list(diffs) == [('dbo', 'a'), ('dbo', 'b'), ('dbo', 'c')]
+    a = diffs[('dbo', 'a')]
+    assert (a['matched'], a['missing'], a['extra']) == ([('pk_a', 'pk_a')], ['ix_one'], ['ix_two'])
+    assert (diffs[('dbo', 'b')]['missing'], diffs[('dbo', 'b')]['pg_names']) == (['pk_b'], [])
+    assert diffs[('dbo', 'c')]['extra'] == ['pk_c']
+
+def test_grouped_set_diff_match_key_and_duplicate_keys():
+    # PK_A and pk__a share a match key; surplus names pair with the other side's last name
+    sql = group_names([rec('a', 'PK_A'), rec('a', 'pk__a')])
+    pg = group_names([rec('a', 'pka')])
+    diff = next(grouped_set_diff(sql, pg, match_key=lambda name, kinds: name.lower().replace('_', '')))
+    assert diff['matched'] == [('PK_A', 'pka'), ('pk__a', 'pka')]
+    assert diff['missing'] == [] and diff['extra'] == []
+
+def test_grouped_set_diff_related_only_for_leftovers():
+    sql = group_names([rec('a', 'ix_orders_customer_id'), rec('a', 'ix_gone')])
+    pg = group_names([rec('a', 'ix_orders_customer'), rec('a', 'ix_new')])
+    related = lambda s, p: s.startswith(p) or p.startswith(s)
+    diff = next(grouped_set_diff(sql, pg, related=related))
+    assert diff['matched'] == [('ix_orders_customer_id', 'ix_orders_customer')]
+    assert diff['missing'] == ['ix_gone'] and diff['extra'] == ['ix_new']
+
+def test_kind_counts_and_detail_rows():
+    sql = group_names([rec('a', 'pk_a'), rec('a', 'uq_a', 'UNIQUE')], kind_of=lambda r: r['kind'])
+    pg = group_names([rec('a', 'pk_a'), rec('a', 'fk_a', 'FOREIGN KEY')], kind_of=lambda r: r['kind'])
+    diffs = list(grouped_set_diff(sql, pg))
+    assert diffs[0]['sql_kinds'] == {'PRIMARY KEY': 1, 'UNIQUE': 1}
+    assert [(r['sql_name'], r['pg_name'], r['Status']) for r in detail_rows(diffs)] == [
+        ('pk_a', 'pk_a', 'MATCHED'), ('uq_a', '', 'MISSING in PG'), ('', 'fk_a', 'EXTRA in PG')]
+
+@pytest.mark.parametrize('builder, extract, label, sql_names, pg_names', [
+    ('build_indexes_tab', 'extract_indexes', 'indexes', ['ix_one'], ['ix_two']),
+    ('build_constraints_tab', 'extract_constraints', 'constraints', ['ck_one'], ['ck_two']),
+])
+def test_tablewise_status_equal_counts_different_names(monkeypatch, builder, extract, label, sql_names, pg_names):
+    # One object on each side, with unrelated names: counts are equal, the table is not matched
+    names = {'sql': sql_names, 'pg': pg_names}
+    monkeypatch.setattr(SchemaValidatior, 'base_table_keys', lambda conn, dbtype: {('dbo', 'a')})
+    monkeypatch.setattr(SchemaValidatior, extract, lambda conn, dbtype: [
+        {'schema': 'dbo', 'table': 'a', 'name': name, 'type': 'CHECK'} for name in names[dbtype]])
+    sheets, counts = getattr(SchemaValidatior, builder)(label.title(), label.title(), None, 'sql', 'pg', RunTimings(), 'db')
+    row, = sheets[0][1]
+    assert (row[f'sql_{label}_count'], row[f'pg_{label}_count']) == (1, 1)
+    assert row['Status'] == 'MISMATCH'
+    assert row['Reason'] == f"Missing in PG: {sql_names[0]} | Extra in PG: {pg_names[0]}"
+
+def test_constraint_match_key_pg_default_suffix():
+    # PG default names get a _default suffix; it goes before trailing digits are stripped
+    key = SchemaValidatior.constraint_match_key
+    assert key('col_3_default', {'default'}) == key('Col_3', {'default'})
+    assert key('pk_orders', {'primary key'}) == key('orders_pkey', {'primary key'})
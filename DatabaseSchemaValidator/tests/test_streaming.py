@@ -0,0 +1,72 @@
+import pytest
+
+from streaming import RowRange, RowSpool, SortOrderError, key_runs, merge_join
+
+def rec(key, tag=''):
+    return {'key': key, 'tag': tag}
+
+def joined(sql, pg):
+    # merge_join output as (sql tag, pg tag) with None for the missing side
+    return [(s and s['tag'], p and p['tag']) for s, p in merge_join(sql, pg, key=lambda r: r['key'])]
+
+def test_key_runs_groups_consecutive_keys():
+    runs = list(key_runs([rec(1, 'a'), rec(1, 'b'), rec(2, 'c')], key=lambda r: r['key'], side='SQL Server'))
+    assert [(k, [r['tag'] for r in run]) for k, run in runs] == [(1, ['a', 'b']), (2, ['c'])]
+
+def test_key_runs_rejects_out_of_order_input():
+    runs = key_runs([rec(2), rec(1)], key=lambda r: r['key'], side='PostgreSQL')
+    with pytest.raises(SortOrderError, match='PostgreSQL'):
+        list(runs)
+
+def test_merge_join_full_outer_join():
+    sql = [rec(1, 's1'), rec(2, 's2'), rec(4, 's4')]
+    pg = [rec(2, 'p2'), rec(3, 'p3'), rec(4, 'p4'), rec(5, 'p5')]
+    assert joined(sql, pg) == [('s1', None), ('s2', 'p2'), (None, 'p3'), ('s4', 'p4'), (None, 'p5')]
+
+def test_merge_join_empty_sides():
+    assert joined([], []) == []
+    assert joined([rec(1, 's1')], []) == [('s1', None)]
+    assert joined([], [rec(1, 'p1')]) == [(None, 'p1')]
+
+def test_merge_join_duplicate_keys_pair_last_rows():
+    # Like the dict matchers, a repeated key pairs its last rows; the others are unpaired
+    sql = [rec(1, 's1a'), rec(1, 's1b'), rec(2, 's2')]
+    pg = [rec(1, 'p1a'), rec(1, 'p1b'), rec(1, 'p1c')]
+    assert joined(sql, pg) == [('s1a', None), ('s1b', 'p1c'), (None, 'p1a'), (None, 'p1b'), ('s2', None)]
+
+@pytest.mark.parametrize('sql, pg, side', [
+    ([rec(1), rec(3), rec(2)], [rec(1), rec(2), rec(3)], 'SQL Server'),
+    ([rec(1), rec(2), rec(3)], [rec(3), rec(1)], 'PostgreSQL'),
+])
+def test_merge_join_raises_on_out_of_order_side(sql, pg, side):
+    with pytest.raises(SortOrderError, match=side):
+        joined(sql, pg)
+
+def test_merge_join_tuple_keys():
+    key = lambda r: r['key']
+    sql = [rec(('dbo', 'a'), 's'), rec(('dbo', 'b'), 's2')]
+    pg = [rec(('dbo', 'b'), 'p2')]
+    assert [(s and s['tag'], p and p['tag']) for s, p in merge_join(sql, pg, key)] == [('s', None), ('s2', 'p2')]
+
+@pytest.mark.parametrize('rows', [0, 1, 3, 7, 12])
+def test_row_range_of_spool_matches_list_slices(rows):
+    spool = RowSpool(batch_rows=3)
+    for i in range(rows):
+        spool.append({'n': i})
+    expected = [{'n': i} for i in range(rows)]
+    for start in range(rows + 1):
+        for stop in range(start, rows + 2):
+            assert list(RowRange(spool, start, stop)) == expected[start:stop]
+    spool.close()
+
+def test_row_range_reads_only_the_batches_it_covers(monkeypatch):
+    spool = RowSpool(batch_rows=2)
+    for i in range(10):
+        spool.append(i)
+    import streaming
+    loads = []
+    real_load = streaming.pickle.load
+    monkeypatch.setattr(streaming.pickle, 'load', lambda f: loads.append(1) or real_load(f))
+    assert list(RowRange(spool, 6, 9)) == [6, 7, 8]
+    assert len(loads) == 2
+    spool.close()